@@ -17,7 +17,20 @@ import signal
 import subprocess
 import time
 import re
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import zlib
+import sqlite3
+import struct
+import mmap
+import math
+import hashlib
+import secrets
+import socket
+import select
+import heapq
+import collections
+import contextlib
+import concurrent.futures
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 import urllib.request
 import urllib.error
 from pathlib import Path
@@ -26,6 +39,7 @@ from pathlib import Path
 PORT = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
 WALLET_API_URL = "http://127.0.0.1:10000/api/wallet"
 WALLET_API_PORT = 10000
+WALLET_API_ALT_PORT = 10001  # blue/green partner port: changing wallets without downtime
 BASE_DIR = Path(__file__).parent.absolute()
 
 # All private data (binaries, wallets, logs, node_data) stored in ~/.beam-light-wallet
@@ -182,55 +196,594 @@ PRICE_CACHE_TTL = 60  # Cache for 60 seconds
 import threading
 server_instance = None
 
-def shutdown_all():
-    """Shutdown all processes gracefully"""
-    global beam_beam_node_process, wallet_api_process
-    print("[SHUTDOWN] Stopping all services...")
+# Upstream wallet-api dispatcher
+# wallet-api is a single process, so every proxied call competes for it.
+# Calls are admitted by priority class: user-initiated transactions first,
+# background polling (tx_list, get_utxo, assets_list) last.
+UPSTREAM_MAX_INFLIGHT = 4
+UPSTREAM_PRIORITY_INTERACTIVE = 0
+UPSTREAM_PRIORITY_NORMAL = 1
+UPSTREAM_PRIORITY_BACKGROUND = 2
+UPSTREAM_PRIORITY_NAMES = {
+    UPSTREAM_PRIORITY_INTERACTIVE: "interactive",
+    UPSTREAM_PRIORITY_NORMAL: "normal",
+    UPSTREAM_PRIORITY_BACKGROUND: "background",
+}
+UPSTREAM_METHOD_PRIORITY = {
+    "tx_send": UPSTREAM_PRIORITY_INTERACTIVE,
+    "tx_split": UPSTREAM_PRIORITY_INTERACTIVE,
+    "tx_cancel": UPSTREAM_PRIORITY_INTERACTIVE,
+    "process_invoke_data": UPSTREAM_PRIORITY_INTERACTIVE,
+    "create_address": UPSTREAM_PRIORITY_INTERACTIVE,
+    "validate_address": UPSTREAM_PRIORITY_INTERACTIVE,
+    "tx_list": UPSTREAM_PRIORITY_BACKGROUND,
+    "get_utxo": UPSTREAM_PRIORITY_BACKGROUND,
+    "assets_list": UPSTREAM_PRIORITY_BACKGROUND,
+    "addr_list": UPSTREAM_PRIORITY_BACKGROUND,
+}
+# Seconds to wait for wallet-api per method (default applies to anything else)
+UPSTREAM_DEFAULT_TIMEOUT = 30
+UPSTREAM_METHOD_TIMEOUT = {
+    "wallet_status": 5,
+    "validate_address": 5,
+    "create_address": 10,
+    "tx_status": 10,
+    "tx_list": 20,
+    "get_utxo": 20,
+    "assets_list": 30,
+    "tx_send": 60,
+    "process_invoke_data": 60,
+    "invoke_contract": 60,
+}
+
+
+# Proxy responses are relayed in chunks of this size (bytes)
+PROXY_STREAM_CHUNK = 64 * 1024
+# Only gzip responses at least this large (when the client accepts gzip)
+PROXY_GZIP_MIN_BYTES = 1024
+PROXY_GZIP_LEVEL = 5
+
+
+def classify_upstream_call(method, params=None):
+    """Return the priority class for a JSON-RPC call to wallet-api"""
+    if method == "invoke_contract":
+        # Contract calls that build a transaction are user actions; views are polling
+        if is_contract_tx_call(params or {}):
+            return UPSTREAM_PRIORITY_INTERACTIVE
+        return UPSTREAM_PRIORITY_NORMAL
+    return UPSTREAM_METHOD_PRIORITY.get(method, UPSTREAM_PRIORITY_NORMAL)
+
+
+def upstream_timeout(method):
+    """Return the wallet-api timeout in seconds for a JSON-RPC method"""
+    return UPSTREAM_METHOD_TIMEOUT.get(method, UPSTREAM_DEFAULT_TIMEOUT)
+
+
+class UpstreamDispatcher:
+    """Bounded, priority-ordered admission of calls to wallet-api.
+
+    At most max_inflight calls run at once. Waiters are served lowest
+    priority value first, FIFO within a class. Background calls may never
+    take the last slot, so an interactive call always has room to run.
+    """
 
-    # Stop wallet-api
-    stop_wallet_api()
+    def __init__(self, max_inflight=UPSTREAM_MAX_INFLIGHT):
+        self.max_inflight = max(1, max_inflight)
+        self.inflight = 0
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (priority, seq)
+        self._seq = 0
+        self._stats = {
+            p: {"queued": 0, "inflight": 0, "completed": 0, "errors": 0,
+                "timeouts": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+            for p in UPSTREAM_PRIORITY_NAMES
+        }
+
+    def _limit_for(self, priority):
+        if priority >= UPSTREAM_PRIORITY_BACKGROUND and self.max_inflight > 1:
+            return self.max_inflight - 1
+        return self.max_inflight
+
+    def acquire(self, priority, timeout=None):
+        """Wait for a slot. Returns False if timeout elapsed while queued."""
+        started = time.time()
+        deadline = started + timeout if timeout else None
+        with self._cond:
+            self._seq += 1
+            entry = (priority, self._seq)
+            heapq.heappush(self._waiting, entry)
+            self._stats[priority]["queued"] += 1
+            try:
+                while not (self._waiting[0] == entry and self.inflight < self._limit_for(priority)):
+                    remaining = deadline - time.time() if deadline else None
+                    if remaining is not None and remaining <= 0:
+                        self._waiting.remove(entry)
+                        heapq.heapify(self._waiting)
+                        self._stats[priority]["timeouts"] += 1
+                        self._cond.notify_all()
+                        return False
+                    self._cond.wait(remaining)
+                heapq.heappop(self._waiting)
+                self.inflight += 1
+                stats = self._stats[priority]
+                stats["inflight"] += 1
+                waited = (time.time() - started) * 1000
+                stats["wait_ms_total"] += waited
+                stats["wait_ms_max"] = max(stats["wait_ms_max"], waited)
+            finally:
+                self._stats[priority]["queued"] -= 1
+            # The next waiter may also fit (e.g. interactive behind background)
+            self._cond.notify_all()
+        return True
+
+    def release(self, priority, error=False):
+        with self._cond:
+            self.inflight -= 1
+            stats = self._stats[priority]
+            stats["inflight"] -= 1
+            stats["completed"] += 1
+            if error:
+                stats["errors"] += 1
+            self._cond.notify_all()
+
+    def metrics(self):
+        """Snapshot of queue depth and per-class counters"""
+        with self._cond:
+            classes = {}
+            for priority, name in UPSTREAM_PRIORITY_NAMES.items():
+                stats = dict(self._stats[priority])
+                done = stats["completed"] or 1
+                stats["wait_ms_avg"] = round(stats.pop("wait_ms_total") / done, 2)
+                stats["wait_ms_max"] = round(stats["wait_ms_max"], 2)
+                classes[name] = stats
+            return {
+                "max_inflight": self.max_inflight,
+                "inflight": self.inflight,
+                "queue_depth": len(self._waiting),
+                "classes": classes,
+            }
+
+
+upstream_dispatcher = UpstreamDispatcher()
+
+
+WALLET_API_DRAIN_TIMEOUT = 10  # seconds an old instance may finish in-flight calls
 
-    # Stop beam-node
-    if beam_beam_node_process:
+
+class WalletApiTarget:
+    """The wallet-api port the proxy forwards to, switchable atomically.
+
+    Every upstream call holds a use() of the port it was sent to, so after a
+    blue/green switch the previous instance can be drained before it stops.
+    """
+
+    def __init__(self, port):
+        self._cond = threading.Condition()
+        self.port = port
+        self.inflight = collections.Counter()
+
+    @staticmethod
+    def url_for(port):
+        return f"http://127.0.0.1:{port}/api/wallet"
+
+    @property
+    def url(self):
+        return self.url_for(self.port)
+
+    @contextlib.contextmanager
+    def use(self):
+        with self._cond:
+            port = self.port
+            self.inflight[port] += 1
         try:
-            beam_beam_node_process.terminate()
-            beam_beam_node_process.wait(timeout=5)
-        except:
+            yield self.url_for(port)
+        finally:
+            with self._cond:
+                self.inflight[port] -= 1
+                self._cond.notify_all()
+
+    def switch(self, port):
+        """Point new calls at port; returns the previous port"""
+        with self._cond:
+            previous, self.port = self.port, port
+            return previous
+
+    def wait_drained(self, port, timeout=WALLET_API_DRAIN_TIMEOUT):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.inflight[port] <= 0, timeout)
+
+
+wallet_api_target = WalletApiTarget(WALLET_API_PORT)
+
+
+def call_wallet_api(method, params=None, priority=None, timeout=None, wallet=None):
+    """Call wallet-api through the dispatcher and return the JSON-RPC result.
+
+    With wallet given, the call goes to the instance serving that wallet (the
+    active one or its session) and fails if the wallet is not open.
+    Raises RuntimeError on JSON-RPC errors and urllib errors on transport failure.
+    """
+    owner = None
+    if wallet is not None:
+        owner = wallet_api_owner(wallet)
+        if owner is None:
+            raise RuntimeError(f"Wallet '{wallet}' is not open")
+    if priority is None:
+        priority = classify_upstream_call(method, params)
+    timeout = timeout or upstream_timeout(method)
+    body = {"jsonrpc": "2.0", "id": 1, "method": method}
+    if params is not None:
+        body["params"] = params
+    if not upstream_dispatcher.acquire(priority, timeout):
+        raise TimeoutError(f"wallet-api queue timeout for {method}")
+    failed = True
+    try:
+        with wallet_sessions.use(owner) if isinstance(owner, WalletSession) else wallet_api_target.use() as url:
+            req = urllib.request.Request(
+                url,
+                data=json.dumps(body).encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST"
+            )
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                data = json.loads(response.read())
+        if "error" in data:
+            raise RuntimeError(data["error"].get("message", "wallet-api error"))
+        failed = False
+        return data.get("result")
+    finally:
+        upstream_dispatcher.release(priority, error=failed)
+
+# ============================================
+# PROCESS REGISTRY
+# ============================================
+# wallet-api and beam-node are tracked by the Popen handles we own, backed by
+# persisted PIDs with their kernel start time so a restarted server still
+# recognises (and never confuses a recycled PID for) its children. Liveness
+# and port ownership are read from /proc instead of spawning pgrep/lsof;
+# without /proc (macOS) port owners and command lines come from lsof and ps.
+
+PROCESS_STATE_FILE = STATE_DIR / ".processes.json"
+PROC_ROOT = Path("/proc")
+TCP_LISTEN_STATE = "0A"
+
+
+def proc_start_time(pid):
+    """Start time of pid in clock ticks since boot (None without /proc)"""
+    try:
+        stat = (PROC_ROOT / str(pid) / "stat").read_text()
+        # Field 22; the command name in field 2 may itself contain spaces
+        return int(stat.rsplit(")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+
+
+def proc_cmdline(pid):
+    if not PROC_ROOT.exists():
+        try:
+            result = subprocess.run(["ps", "-o", "command=", "-p", str(pid)],
+                                    capture_output=True, text=True, timeout=5)
+            return result.stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    try:
+        return (PROC_ROOT / str(pid) / "cmdline").read_bytes().replace(b"\0", b" ").decode(errors="replace")
+    except OSError:
+        return ""
+
+
+def _listening_inodes(port):
+    """Socket inodes LISTENing on port, from /proc/net/tcp and tcp6"""
+    inodes = set()
+    for table in ("tcp", "tcp6"):
+        try:
+            with open(PROC_ROOT / "net" / table) as f:
+                next(f, None)
+                for line in f:
+                    fields = line.split()
+                    if len(fields) > 9 and fields[3] == TCP_LISTEN_STATE \
+                            and int(fields[1].rsplit(":", 1)[1], 16) == port:
+                        inodes.add(fields[9])
+        except OSError:
+            continue
+    return inodes
+
+
+def _pids_holding_sockets(inodes, candidates=None):
+    targets = {f"socket:[{inode}]" for inode in inodes}
+    pids = []
+    for pid in candidates if candidates is not None else (p.name for p in PROC_ROOT.iterdir() if p.name.isdigit()):
+        try:
+            fd_dir = PROC_ROOT / str(pid) / "fd"
+            if any(os.readlink(fd_dir / fd) in targets for fd in os.listdir(fd_dir)):
+                pids.append(int(pid))
+        except OSError:
+            continue
+    return pids
+
+
+def _lsof_port_listeners(port):
+    try:
+        result = subprocess.run(
+            ["lsof", "-ti", f"TCP:{port}", "-sTCP:LISTEN"],
+            capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return []
+    return [int(p) for p in result.stdout.split()] if result.returncode == 0 else []
+
+
+def find_port_listeners(port, candidates=None):
+    """PIDs LISTENing on a TCP port (not outgoing connections to it).
+
+    Reads /proc directly; candidates (e.g. our own children) are checked
+    before falling back to a scan of every process. Without /proc (macOS)
+    the answer comes from lsof.
+    """
+    if not (PROC_ROOT / "net" / "tcp").exists():
+        return _lsof_port_listeners(port)
+    inodes = _listening_inodes(port)
+    if not inodes:
+        return []
+    if candidates:
+        pids = _pids_holding_sockets(inodes, candidates)
+        if pids:
+            return pids
+    return _pids_holding_sockets(inodes)
+
+
+TERMINATE_GRACE = 5          # seconds between SIGTERM and SIGKILL
+TERMINATE_KILL_WAIT = 2      # seconds to wait for exit after SIGKILL
+PORT_RELEASE_TIMEOUT = 3
+TERMINATE_POLL_MAX = 0.1
+
+
+def _process_gone(pid, proc=None):
+    """True once pid has exited (reaping it when it is our child)"""
+    if proc is not None:
+        return proc.poll() is not None
+    try:
+        reaped, _ = os.waitpid(pid, os.WNOHANG)
+        if reaped == pid:
+            return True
+    except ChildProcessError:
+        pass  # not ours: a zombie of another parent counts as alive, like kill 0
+    return not pid_alive(pid)
+
+
+def _wait_processes(pending, deadline):
+    """Wait until every pid in pending ({pid: Popen or None}) exits or deadline passes.
+
+    Sleeps on pidfds where the kernel has them (woken the moment any target
+    exits), otherwise polls with a short exponential backoff. Returns the
+    pids still running.
+    """
+    pidfds = {}
+    if hasattr(os, "pidfd_open"):
+        for pid in pending:
             try:
-                beam_beam_node_process.kill()
-            except:
+                pidfds[pid] = os.pidfd_open(pid)
+            except OSError:
                 pass
-        beam_beam_node_process = None
-
-    # Also kill any orphaned processes
     try:
-        subprocess.run(["pkill", "-f", "wallet-api.*--port=10000"], capture_output=True)
-        subprocess.run(["pkill", "-f", "beam-node.*--port=10005"], capture_output=True)
-    except:
-        pass
+        delay = 0.005
+        while True:
+            pending = {pid: proc for pid, proc in pending.items() if not _process_gone(pid, proc)}
+            remaining = deadline - time.time()
+            if not pending or remaining <= 0:
+                return list(pending)
+            fds = [pidfds[pid] for pid in pending if pid in pidfds]
+            if fds and len(fds) == len(pending):
+                select.select(fds, [], [], remaining)
+            else:
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, TERMINATE_POLL_MAX)
+    finally:
+        for fd in pidfds.values():
+            os.close(fd)
+
+
+def terminate_processes(targets, grace=TERMINATE_GRACE, sig=signal.SIGTERM):
+    """Stop several processes at once; targets are Popen handles or PIDs.
+
+    Every target is signalled up front, then waited on together; whatever
+    is still running after grace seconds gets SIGKILL. Returns the PIDs
+    that survived even that (normally none).
+    """
+    owned = {proc.pid: proc for proc in list(process_registry.handles.values())}
+    pending = {}
+    for target in targets:
+        if target is None:
+            continue
+        if isinstance(target, subprocess.Popen):
+            pending[target.pid] = target
+        else:
+            pending.setdefault(int(target), owned.get(int(target)))
+    for pid in list(pending):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+        except PermissionError as e:
+            print(f"Cannot signal process {pid}: {e}")
+            del pending[pid]
+    if not pending:
+        return []
+
+    if sig == signal.SIGKILL:
+        return _wait_processes(pending, time.time() + TERMINATE_KILL_WAIT)
+    survivors = _wait_processes(pending, time.time() + grace)
+    for pid in survivors:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            print(f"Force killed process {pid}")
+        except ProcessLookupError:
+            pass
+    if survivors:
+        survivors = _wait_processes({pid: pending[pid] for pid in survivors},
+                                    time.time() + TERMINATE_KILL_WAIT)
+    return survivors
+
+
+def port_released(port):
+    """True when a listener could bind port again (bind probe, TIME_WAIT ignored)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            probe.bind(("", port))
+            return True
+        except OSError:
+            return False
+
+
+def wait_port_released(port, timeout=PORT_RELEASE_TIMEOUT):
+    deadline = time.time() + timeout
+    delay = 0.005
+    while not port_released(port):
+        if time.time() >= deadline:
+            print(f"Port {port} still in use after {timeout}s")
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, TERMINATE_POLL_MAX)
+    return True
+
+
+class ProcessRegistry:
+    """Child processes by role ("wallet-api", "beam-node")"""
+
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.handles = {}  # role -> Popen (this server run)
+        self.records = {}  # role -> {"pid", "start_time", "port"}
+        try:
+            if state_file.exists():
+                self.records = json.loads(state_file.read_text())
+        except Exception as e:
+            print(f"Warning: Could not load process registry: {e}")
+
+    def _save(self):
+        try:
+            tmp = self.state_file.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.records))
+            tmp.replace(self.state_file)
+        except OSError as e:
+            print(f"Warning: Could not save process registry: {e}")
+
+    def register(self, role, proc, port=None):
+        with self.lock:
+            self.handles[role] = proc
+            self.records[role] = {"pid": proc.pid, "start_time": proc_start_time(proc.pid), "port": port}
+            self._save()
+
+    def forget(self, role):
+        with self.lock:
+            self.handles.pop(role, None)
+            if self.records.pop(role, None) is not None:
+                self._save()
+
+    def handle(self, role):
+        return self.handles.get(role)
+
+    def _record_alive(self, record):
+        if not pid_alive(record["pid"]):
+            return False
+        start = proc_start_time(record["pid"])
+        # Without /proc there is no fingerprint to compare; trust the PID
+        return start is None or record.get("start_time") is None or start == record["start_time"]
+
+    def pid(self, role, port=None, binary=None):
+        """PID of the live process for role, or None.
+
+        Order: our Popen handle (poll), the persisted record (kill 0 + start
+        time), then whoever LISTENs on the role's port if its command line
+        names the expected binary - for processes started before this
+        server that it never recorded.
+        """
+        with self.lock:
+            proc = self.handles.get(role)
+            record = self.records.get(role)
+        if proc is not None:
+            if proc.poll() is None:
+                return proc.pid
+            self.forget(role)
+        elif record is not None:
+            if self._record_alive(record):
+                return record["pid"]
+            self.forget(role)
+
+        if port is not None:
+            for pid in find_port_listeners(port):
+                if binary is None or binary in proc_cmdline(pid):
+                    return pid
+        return None
+
+    def status(self):
+        with self.lock:
+            roles = dict(self.records)
+            handles = dict(self.handles)
+        return {role: {**rec, "owned": role in handles,
+                       "exit_code": handles[role].poll() if role in handles else None}
+                for role, rec in roles.items()}
+
+
+process_registry = ProcessRegistry(PROCESS_STATE_FILE)
+
+
+def shutdown_all():
+    """Shutdown all processes gracefully"""
+    global beam_beam_node_process, wallet_api_process
+    print("[SHUTDOWN] Stopping all services...")
+    service_supervisor.release_all()
+
+    # Stop wallet-api (and any extra wallet sessions) and beam-node together,
+    # including orphans from an earlier run
+    wallet_sessions.close_all()
+    terminate_processes([beam_beam_node_process, wallet_api_process,
+                         get_wallet_api_pid(), get_beam_node_pid()])
+    beam_beam_node_process = None
+    stop_wallet_api()
+    process_registry.forget("wallet-api")
+    process_registry.forget("beam-node")
 
     print("[SHUTDOWN] All services stopped")
 
 
 def get_wallet_api_pid():
     """Get wallet-api PID if running"""
-    try:
-        result = subprocess.run(
-            ["pgrep", "-f", "wallet-api.*--port=10000"],
-            capture_output=True, text=True
-        )
-        if result.returncode == 0:
-            return int(result.stdout.strip().split()[0])
-    except:
-        pass
+    return process_registry.pid("wallet-api", wallet_api_target.port, "wallet-api")
+
+
+def wallet_api_owner(wallet_name):
+    """The wallet-api serving wallet_name: its WalletSession, ("active", pid), or None if not open.
+
+    Compare two results to tell whether the wallet changed hands in between.
+    """
+    session = wallet_sessions.sessions.get(wallet_name)
+    if session is not None and session.proc.poll() is None:
+        return session
+    if wallet_name == get_active_wallet_name():
+        pid = get_wallet_api_pid()
+        if pid:
+            return ("active", pid)
     return None
 
 
-def is_wallet_api_running():
-    """Check if wallet-api is responding"""
+def is_wallet_api_running(port=None):
+    """Check if wallet-api is responding (on the proxy target unless port is given)"""
     try:
         req = urllib.request.Request(
-            WALLET_API_URL,
+            WalletApiTarget.url_for(port) if port else wallet_api_target.url,
             data=json.dumps({"jsonrpc": "2.0", "id": 1, "method": "wallet_status"}).encode(),
             headers={"Content-Type": "application/json"},
             method="POST"
@@ -251,32 +804,159 @@ def list_wallets():
     return sorted(wallets)
 
 
-def kill_process_on_port(port):
-    """Kill any process LISTENING on the specified port (not outgoing connections)"""
+def get_active_wallet_name():
+    """Active wallet name, falling back to the state file after a server restart"""
+    if active_wallet:
+        return active_wallet
+    state_file = STATE_DIR / ".active_wallet"
+    if state_file.exists():
+        return state_file.read_text().strip() or None
+    return None
+
+
+# ============================================
+# CONTRACT VIEW CACHE
+# ============================================
+# Read-only invoke_contract results only change when a block lands (or when
+# this wallet sends a tx to the contract), so identical views within a block
+# are answered without running the shader again.
+
+CONTRACT_VIEW_HEIGHT_TTL = 2      # seconds between wallet_status height checks
+CONTRACT_VIEW_MAX_ENTRIES = 500
+CONTRACT_TX_MEMORY = 100          # built transactions remembered until submitted
+
+
+def _contract_args_cid(args):
+    match = re.search(r"(?:^|,)cid=([0-9a-fA-F]{64})", args or "")
+    return match.group(1).lower() if match else None
+
+
+def _contract_args_field(args, name):
+    match = re.search(rf"(?:^|,){name}=([^,]*)", args or "")
+    return match.group(1).strip() if match else None
+
+
+def is_contract_tx_call(params):
+    """invoke_contract params that build a transaction rather than read state"""
+    if params.get("create_tx") or params.get("createTx"):
+        return True
+    args = params.get("args", "")
+    action = _contract_args_field(args, "action") or ""
+    return _contract_args_field(args, "role") == "manager" and "view" not in action
+
+
+def _raw_data_digest(raw_data):
     try:
-        # Use lsof with -sTCP:LISTEN to only find processes listening on the port
-        # This prevents killing beam-node which has outgoing connections to peers on port 10000
-        result = subprocess.run(
-            ["lsof", "-ti", f"TCP:{port}", "-sTCP:LISTEN"],
-            capture_output=True, text=True, timeout=5
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            pids = result.stdout.strip().split('\n')
-            for pid in pids:
-                try:
-                    pid = int(pid.strip())
-                    os.kill(pid, signal.SIGTERM)
-                    print(f"Killed process {pid} on port {port}")
-                    time.sleep(1)
-                    # Force kill if still running
-                    try:
-                        os.kill(pid, 0)  # Check if still alive
-                        os.kill(pid, signal.SIGKILL)
-                        print(f"Force killed process {pid}")
-                    except ProcessLookupError:
-                        pass  # Process already dead
-                except (ValueError, ProcessLookupError):
-                    pass
+        data = bytes(raw_data) if isinstance(raw_data, list) else json.dumps(raw_data, sort_keys=True).encode()
+    except (TypeError, ValueError):
+        data = json.dumps(raw_data, sort_keys=True).encode()
+    return hashlib.sha1(data).digest()
+
+
+class ContractViewCache:
+    """invoke_contract view results keyed by (wallet, cid, args), valid for one height"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # key -> result
+        self.height = 0
+        self.height_checked = 0
+        self.built = collections.OrderedDict()  # raw_data digest -> cid, until process_invoke_data
+        self.hits = 0
+        self.misses = 0
+
+    def current_height(self):
+        """wallet-api tip height, re-read at most every CONTRACT_VIEW_HEIGHT_TTL seconds"""
+        if time.time() - self.height_checked < CONTRACT_VIEW_HEIGHT_TTL:
+            return self.height
+        status = call_wallet_api("wallet_status", priority=UPSTREAM_PRIORITY_NORMAL) or {}
+        height = int(status.get("current_height") or 0)
+        with self.lock:
+            if height != self.height:
+                self.entries.clear()
+                self.height = height
+            self.height_checked = time.time()
+        return height
+
+    @staticmethod
+    def key(args, wallet=None):
+        cid = _contract_args_cid(args)
+        normalized = ",".join(sorted(p.strip() for p in (args or "").split(",") if p.strip()))
+        return wallet or get_active_wallet_name(), cid, normalized
+
+    def get(self, key):
+        """(cached result or None, height the lookup was made at)"""
+        height = self.current_height()
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                self.hits += 1
+            return result, height
+
+    @staticmethod
+    def cacheable(result):
+        # Anything carrying a transaction is a one-off, never a view
+        return not (isinstance(result, dict) and ("raw_data" in result or "txid" in result))
+
+    def put(self, key, height, result):
+        if not self.cacheable(result):
+            return
+        with self.lock:
+            if height != self.height:
+                return  # a block landed while the view ran
+            self.entries[key] = result
+            while len(self.entries) > CONTRACT_VIEW_MAX_ENTRIES:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, cid):
+        with self.lock:
+            for key in [k for k in self.entries if k[1] == cid]:
+                del self.entries[key]
+
+    def tx_built(self, cid, raw_data=None):
+        """A transaction was built for this contract: remember it until it is submitted"""
+        if raw_data is not None:
+            with self.lock:
+                self.built[_raw_data_digest(raw_data)] = cid
+                while len(self.built) > CONTRACT_TX_MEMORY:
+                    self.built.popitem(last=False)
+        self.invalidate(cid)
+
+    def tx_submitted(self, raw_data=None):
+        """process_invoke_data: drop the views of the contract the data belongs to"""
+        with self.lock:
+            cid = self.built.pop(_raw_data_digest(raw_data), None) if raw_data is not None else None
+            if cid is None:
+                # Not built through this proxy: any contract may be affected
+                self.entries.clear()
+                return
+        self.invalidate(cid)
+
+    def metrics(self):
+        with self.lock:
+            return {"entries": len(self.entries), "height": self.height,
+                    "hits": self.hits, "misses": self.misses}
+
+
+contract_view_cache = ContractViewCache()
+
+
+def kill_process_on_port(port, grace=1):
+    """Kill any process LISTENING on the specified port (not outgoing connections).
+
+    Returns once the listeners have exited and the port can be bound again.
+    """
+    try:
+        # Only LISTEN sockets: beam-node has outgoing connections to peers on port 10000
+        own = [r["pid"] for r in list(process_registry.records.values()) if r.get("port") == port]
+        pids = find_port_listeners(port, own)
+        if pids:
+            print(f"Killing process(es) {', '.join(map(str, pids))} on port {port}")
+            terminate_processes(pids, grace=grace)
+            wait_port_released(port)
             return True
     except Exception as e:
         print(f"Error killing process on port {port}: {e}")
@@ -290,18 +970,19 @@ def stop_wallet_api():
     pid = get_wallet_api_pid()
     if pid:
         try:
-            os.kill(pid, signal.SIGKILL)
-            time.sleep(0.2)
-        except ProcessLookupError:
-            pass
+            terminate_processes([pid], sig=signal.SIGKILL)
         except Exception as e:
             print(f"Error killing wallet-api: {e}")
 
     wallet_api_process = None
     active_wallet = None
+    service_supervisor.release("wallet-api")
+    process_registry.forget("wallet-api")
 
-    # Also kill any process using the wallet API port
-    kill_process_on_port(WALLET_API_PORT)
+    # Also kill any process using either wallet API port
+    for port in (WALLET_API_PORT, WALLET_API_ALT_PORT):
+        kill_process_on_port(port)
+    wallet_api_target.switch(WALLET_API_PORT)
 
     state_file = STATE_DIR / ".active_wallet"
     if state_file.exists():
@@ -312,16 +993,7 @@ def stop_wallet_api():
 
 def get_beam_node_pid():
     """Get beam-node PID if running"""
-    try:
-        result = subprocess.run(
-            ["pgrep", "-f", f"beam-node.*--port={LOCAL_NODE_PORT}"],
-            capture_output=True, text=True
-        )
-        if result.returncode == 0:
-            return int(result.stdout.strip().split()[0])
-    except:
-        pass
-    return None
+    return process_registry.pid("beam-node", LOCAL_NODE_PORT, "beam-node")
 
 
 def is_node_running():
@@ -329,78 +1001,155 @@ def is_node_running():
     return get_beam_node_pid() is not None
 
 
-def get_node_sync_status():
-    """Get local node sync status from node API or by parsing logs"""
-    if not is_node_running():
-        return {"running": False, "synced": False, "height": 0, "progress": 0}
+class LogTailer:
+    """Incremental reader of a growing log file.
 
-    try:
-        # Read from node log file to get sync progress
-        # Use tail to read last N lines efficiently
-        log_file = LOGS_DIR / "beam-node.log"
-        if log_file.exists():
-            # Use subprocess to efficiently get relevant lines
-            result = subprocess.run(
-                ["grep", "-E", "My Tip:|Updating node:|Initial Tip:|fully synchronized", str(log_file)],
-                capture_output=True, text=True, timeout=5
-            )
-            lines = result.stdout.strip().split('\n')[-50:]  # Last 50 matching lines
-
-            current_height = 0
-            target_height = 0
-            progress = 0
-            synced = False
-
-            for line in reversed(lines):
-                # Look for "Updating node: X% (current/total)" format
-                match = re.search(r'Updating node:\s*(\d+)%\s*\((\d+)/(\d+)\)', line)
-                if match:
-                    progress = int(match.group(1))
-                    current_height = int(match.group(2))
-                    target_height = int(match.group(3))
-                    if progress == 100:
-                        synced = True
-                    break
+    Remembers the byte offset and inode between calls, so each read only
+    returns what was appended since the last one. A truncated or replaced
+    file (new process, log rotation) is read again from the start.
+    """
 
-                # Look for "My Tip" which shows current synced height
-                if "My Tip:" in line:
-                    match = re.search(r'My Tip:\s*(\d+)', line)
-                    if match:
-                        current_height = int(match.group(1))
-                        # If we see My Tip, node is synced to at least this height
-                        if current_height > 3000000:  # Reasonable mainnet height
-                            synced = True
-                            progress = 100
-
-                # Look for "Initial Tip" which shows starting state
-                if current_height == 0 and "Initial Tip:" in line:
-                    match = re.search(r'Initial Tip:\s*(\d+)', line)
-                    if match:
-                        current_height = int(match.group(1))
-
-                # Look for sync complete messages
-                if "fully synchronized" in line.lower():
-                    synced = True
-                    progress = 100
-                    break
+    def __init__(self, path, from_end=False):
+        self.path = Path(path)
+        self.offset = 0
+        self.inode = None
+        self.partial = ""
+        self.generation = 0  # bumped whenever the file is read again from the start
+        if from_end:
+            try:
+                st = self.path.stat()
+                self.offset, self.inode = st.st_size, st.st_ino
+            except OSError:
+                pass
 
-            # If we found Updating node: 100%, consider it synced
-            if progress >= 100:
-                synced = True
+    def read_lines(self):
+        """Complete lines appended since the previous call"""
+        try:
+            st = self.path.stat()
+        except OSError:
+            return []
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            self.offset, self.inode, self.partial = 0, st.st_ino, ""
+            self.generation += 1
+        if st.st_size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        text = self.partial + data.decode(errors="replace")
+        lines = text.split("\n")
+        self.partial = lines.pop()
+        return lines
+
+
+NODE_LOG_BOOTSTRAP_BYTES = 4 * 1024 * 1024  # history read when first opening an existing log
+NODE_UPDATING_RE = re.compile(r'Updating node:\s*(\d+)%\s*\((\d+)/(\d+)\)')
+NODE_MY_TIP_RE = re.compile(r'My Tip:\s*(\d+)')
+NODE_INITIAL_TIP_RE = re.compile(r'Initial Tip:\s*(\d+)')
+NODE_SYNCED_HEIGHT = 3000000  # a "My Tip" above this is a synced mainnet node
+
+
+class NodeSyncTracker:
+    """Sync progress of the local node, kept current from beam-node.log.
+
+    Only bytes appended since the last call are parsed, so a status call
+    costs the same however large the (never rotated) log has grown. A
+    truncated log - the node was restarted - resets the state.
+    """
 
+    def __init__(self, log_file):
+        self.lock = threading.Lock()
+        self.tail = LogTailer(log_file)
+        self.generation = None
+        self._reset()
+
+    def _reset(self):
+        self.height = 0
+        self.target = 0
+        self.progress = 0
+        self.synced = False
+
+    def _parse(self, line):
+        match = NODE_UPDATING_RE.search(line)
+        if match:
+            # "Updating node: X% (current/total)"
+            self.progress = int(match.group(1))
+            self.height = int(match.group(2))
+            self.target = int(match.group(3))
+            self.synced = self.progress >= 100
+            return
+        match = NODE_MY_TIP_RE.search(line)
+        if match:
+            # Current synced height
+            self.height = int(match.group(1))
+            if self.height > NODE_SYNCED_HEIGHT:
+                self.synced = True
+                self.progress = 100
+            return
+        match = NODE_INITIAL_TIP_RE.search(line)
+        if match:
+            # Starting state, until something newer is known
+            if self.height == 0:
+                self.height = int(match.group(1))
+            return
+        if "fully synchronized" in line.lower():
+            self.synced = True
+            self.progress = 100
+
+    def refresh(self):
+        tail = self.tail
+        if self.generation is None:
+            # First look at an existing log: only its recent history matters
+            try:
+                st = tail.path.stat()
+            except OSError:
+                return
+            tail.offset, tail.inode = max(0, st.st_size - NODE_LOG_BOOTSTRAP_BYTES), st.st_ino
+            started_mid_file = tail.offset > 0
+            lines = tail.read_lines()
+            if started_mid_file and tail.offset > 0:
+                lines = lines[1:]
+            self.generation = tail.generation
+        else:
+            lines = tail.read_lines()
+            if tail.generation != self.generation:
+                self._reset()
+                self.generation = tail.generation
+        for line in lines:
+            self._parse(line)
+
+    def status(self):
+        with self.lock:
+            self.refresh()
             return {
                 "running": True,
-                "synced": synced,
-                "height": current_height,
-                "target": target_height,
-                "progress": progress
+                "synced": self.synced,
+                "height": self.height,
+                "target": self.target,
+                "progress": self.progress
             }
+
+
+node_sync_tracker = NodeSyncTracker(LOGS_DIR / "beam-node.log")
+
+
+def get_node_sync_status():
+    """Get local node sync status from the node log (parsed incrementally)"""
+    if not is_node_running():
+        return {"running": False, "synced": False, "height": 0, "progress": 0}
+
+    try:
+        return node_sync_tracker.status()
     except Exception as e:
         print(f"Error getting node status: {e}")
 
     return {"running": True, "synced": False, "height": 0, "progress": 0}
 
 
+BEAM_NODE_STOP_GRACE = 2
+
+
 def stop_beam_node():
     """Stop running beam-node process"""
     global beam_beam_node_process, node_mode
@@ -408,15 +1157,14 @@ def stop_beam_node():
     pid = get_beam_node_pid()
     if pid:
         try:
-            os.kill(pid, signal.SIGTERM)
-            time.sleep(2)
-            if get_beam_node_pid():
-                os.kill(pid, signal.SIGKILL)
+            terminate_processes([pid], grace=BEAM_NODE_STOP_GRACE)
             print(f"Stopped beam-node (PID: {pid})")
         except Exception as e:
             print(f"Error stopping node: {e}")
 
     beam_beam_node_process = None
+    service_supervisor.release("beam-node")
+    process_registry.forget("beam-node")
 
     # Also kill any process using the node port
     kill_process_on_port(LOCAL_NODE_PORT)
@@ -429,6 +1177,224 @@ def stop_beam_node():
     return True
 
 
+# ============================================
+# BEAM-NODE SCHEDULING
+# ============================================
+# During fast sync beam-node saturates CPU and disk and the UI, the proxy and
+# wallet-api stall behind it. The node therefore runs under a scheduling
+# profile: nice level, I/O priority and optionally a CPU set. It is applied
+# right after spawn and can be changed while the node runs. Linux applies all
+# three per thread, so every task of the process is updated. Raising the
+# priority again (lower nice) needs CAP_SYS_NICE; without it the change only
+# takes effect when the node is restarted.
+
+NODE_PRIORITY_FILE = STATE_DIR / ".node_priority.json"
+IOPRIO_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_SET_SYSCALL = {"x86_64": 251, "amd64": 251, "aarch64": 30, "arm64": 30, "i386": 289, "i686": 289, "armv7l": 314}
+
+
+def _responsive_cpus():
+    """Every CPU but the first when there are enough to spare one for the UI"""
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    return cpus[1:] if len(cpus) > 2 else None
+
+
+NODE_PRIORITY_PROFILES = {
+    # Full speed: the scheduling beam-node has always had
+    "sync_fast": {"nice": 0, "io_class": "best-effort", "io_level": 4, "cpus": None},
+    # Node yields CPU and disk to serve.py and wallet-api
+    "responsive": {"nice": 10, "io_class": "best-effort", "io_level": 7, "cpus": "spare"},
+}
+NODE_PRIORITY_DEFAULT = "sync_fast"
+
+
+def _ioprio_set(tid, io_class, io_level):
+    """ioprio_set(2) through libc, else the ionice tool. Raises OSError."""
+    value = (IOPRIO_CLASSES[io_class] << IOPRIO_CLASS_SHIFT) | (io_level if io_class != "idle" else 0)
+    nr = IOPRIO_SET_SYSCALL.get(platform.machine().lower())
+    if PLATFORM == "linux" and nr is not None:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.syscall(nr, IOPRIO_WHO_PROCESS, tid, value) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return
+    import shutil
+    if not shutil.which("ionice"):
+        raise OSError("I/O priority is not supported on this platform")
+    args = ["ionice", "-c", str(IOPRIO_CLASSES[io_class])]
+    if io_class != "idle":
+        args += ["-n", str(io_level)]
+    subprocess.run(args + ["-p", str(tid)], check=True, capture_output=True, timeout=5)
+
+
+class NodePriority:
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.profile = NODE_PRIORITY_DEFAULT
+        self.settings = dict(NODE_PRIORITY_PROFILES[NODE_PRIORITY_DEFAULT])
+        self.last_applied = None
+        try:
+            if state_file.exists():
+                saved = json.loads(state_file.read_text())
+                self.profile = saved.get("profile", self.profile)
+                self.settings.update(saved.get("settings", {}))
+        except Exception as e:
+            print(f"Warning: Could not load node priority: {e}")
+
+    def _save(self):
+        try:
+            self.state_file.write_text(json.dumps({"profile": self.profile, "settings": self.settings}))
+        except OSError as e:
+            print(f"Warning: Could not save node priority: {e}")
+
+    @staticmethod
+    def validate(settings):
+        """Normalized copy of settings; raises ValueError"""
+        out = {}
+        nice = settings.get("nice", 0)
+        if not isinstance(nice, int) or not -20 <= nice <= 19:
+            raise ValueError("nice must be an integer from -20 to 19")
+        out["nice"] = nice
+        io_class = settings.get("io_class", "best-effort")
+        if io_class not in IOPRIO_CLASSES:
+            raise ValueError(f"io_class must be one of {', '.join(IOPRIO_CLASSES)}")
+        out["io_class"] = io_class
+        io_level = settings.get("io_level", 4)
+        if not isinstance(io_level, int) or not 0 <= io_level <= 7:
+            raise ValueError("io_level must be an integer from 0 to 7")
+        out["io_level"] = io_level
+        cpus = settings.get("cpus")
+        if cpus not in (None, "spare") and not (isinstance(cpus, list) and cpus
+                                                and all(isinstance(c, int) and c >= 0 for c in cpus)):
+            raise ValueError('cpus must be null, "spare" or a list of CPU numbers')
+        out["cpus"] = cpus
+        return out
+
+    def configure(self, profile=None, settings=None):
+        """Select a named profile, or custom settings (profile "custom")"""
+        if profile is not None:
+            if profile not in NODE_PRIORITY_PROFILES:
+                raise ValueError(f"Unknown profile '{profile}'")
+            new = dict(NODE_PRIORITY_PROFILES[profile])
+        else:
+            profile = "custom"
+            new = self.validate({**self.settings, **(settings or {})})
+        with self.lock:
+            self.profile, self.settings = profile, new
+            self._save()
+
+    def apply(self, pid):
+        """Apply the current settings to every thread of pid; returns per-setting outcome"""
+        with self.lock:
+            settings = dict(self.settings)
+        try:
+            tids = [int(t) for t in os.listdir(PROC_ROOT / str(pid) / "task")]
+        except OSError:
+            tids = [pid]  # no /proc: the process only
+        cpus = _responsive_cpus() if settings["cpus"] == "spare" else settings["cpus"]
+        if cpus is None and hasattr(os, "sched_getaffinity"):
+            cpus = sorted(os.sched_getaffinity(0))  # undo an earlier restriction
+        result = {}
+        for name, op in (
+            ("nice", lambda tid: os.setpriority(os.PRIO_PROCESS, tid, settings["nice"])),
+            ("io", lambda tid: _ioprio_set(tid, settings["io_class"], settings["io_level"])),
+            ("cpus", (lambda tid: os.sched_setaffinity(tid, cpus)) if hasattr(os, "sched_setaffinity") else None),
+        ):
+            if op is None:
+                result[name] = "unsupported"
+                continue
+            try:
+                for tid in tids:
+                    try:
+                        op(tid)
+                    except ProcessLookupError:
+                        pass  # thread exited meanwhile
+                result[name] = "ok"
+            except (OSError, subprocess.SubprocessError) as e:
+                # e.g. lowering nice again needs CAP_SYS_NICE
+                result[name] = f"failed: {e}"
+        self.last_applied = {"pid": pid, "at": time.time(), "result": result}
+        print(f"[node priority] {self.profile} applied to beam-node (PID: {pid}): {result}")
+        return result
+
+    def current(self, pid):
+        """Scheduling actually in effect for pid's main thread"""
+        info = {}
+        try:
+            info["nice"] = os.getpriority(os.PRIO_PROCESS, pid)
+        except OSError:
+            pass
+        if hasattr(os, "sched_getaffinity"):
+            try:
+                info["cpus"] = sorted(os.sched_getaffinity(pid))
+            except OSError:
+                pass
+        return info
+
+    def status(self, pid=None):
+        return {
+            "profile": self.profile,
+            "settings": self.settings,
+            "profiles": NODE_PRIORITY_PROFILES,
+            "last_applied": self.last_applied,
+            "current": self.current(pid) if pid else None,
+        }
+
+
+node_priority = NodePriority(NODE_PRIORITY_FILE)
+
+
+BEAM_NODE_READY_TIMEOUT = 10
+# Tip loaded from the database / listening for peers
+BEAM_NODE_READY_RE = re.compile(r"Initial Tip:|My Tip:|[Ll]istening")
+BEAM_NODE_CORRUPT_RE = re.compile(r"orruption|1row change failed")
+BEAM_NODE_BIND_RE = re.compile(r"[Aa]ddress already in use|[Bb]ind failed|EADDRINUSE")
+
+
+def wait_for_beam_node_ready(proc, log_file, timeout=BEAM_NODE_READY_TIMEOUT):
+    """Follow a freshly started beam-node's log until it is ready or fails.
+
+    Returns (state, detail) where state is "ready", "corrupt" (database
+    corruption logged - the caller recovers) or "failed". A node that is
+    still running silently at the timeout counts as ready, as it may just
+    be loading a large database.
+    """
+    tail = LogTailer(log_file)
+    deadline = time.time() + timeout
+    delay = READY_PROBE_INITIAL
+
+    def scan(lines):
+        for line in lines:
+            if BEAM_NODE_CORRUPT_RE.search(line):
+                return "corrupt", line.strip()
+            if BEAM_NODE_BIND_RE.search(line):
+                return "failed", f"beam-node could not bind port {LOCAL_NODE_PORT}: {line.strip()}"
+            if BEAM_NODE_READY_RE.search(line):
+                return "ready", None
+        return None
+
+    while True:
+        found = scan(tail.read_lines())
+        if found:
+            return found
+        exit_code = proc.poll()
+        if exit_code is not None:
+            found = scan(tail.read_lines() + [tail.partial])
+            if found and found[0] != "ready":
+                return found
+            return "failed", f"beam-node exited immediately with code {exit_code}."
+        if tcp_port_open(LOCAL_NODE_PORT):
+            return "ready", None
+        if time.time() >= deadline:
+            return "ready", None
+        time.sleep(delay)
+        delay = min(delay * 2, READY_PROBE_MAX)
+
+
 def start_beam_node(owner_key=None, password=None):
     """Start local beam-node with fast_sync"""
     global beam_beam_node_process, node_mode
@@ -438,8 +1404,6 @@ def start_beam_node(owner_key=None, password=None):
 
     # Stop existing node and kill any process on the port
     stop_beam_node()
-    kill_process_on_port(LOCAL_NODE_PORT)
-    time.sleep(1)  # Give port time to be released
 
     LOGS_DIR.mkdir(exist_ok=True)
     NODE_DATA_DIR.mkdir(exist_ok=True)
@@ -471,64 +1435,66 @@ def start_beam_node(owner_key=None, password=None):
         if not os.access(str(BEAM_NODE_BINARY), os.X_OK):
             return {"error": f"beam-node binary is not executable: {BEAM_NODE_BINARY}. Try: chmod +x {BEAM_NODE_BINARY}"}
 
+        job_step("Starting node")
         print(f"[start_beam_node] cmd: {' '.join(cmd)}")
         print(f"[start_beam_node] cwd: {NODE_DATA_DIR}")
 
-        with open(log_file, "w") as lf:
-            beam_beam_node_process = subprocess.Popen(
-                cmd,
-                stdout=lf,
-                stderr=subprocess.STDOUT,
-                cwd=str(NODE_DATA_DIR)  # Store node.db in node_data directory
-            )
-
-        # Wait a moment and check if started
-        time.sleep(3)
-        if is_node_running():
+        def spawn():
+            global beam_beam_node_process
+            with open(log_file, "w") as lf:
+                beam_beam_node_process = subprocess.Popen(
+                    cmd,
+                    stdout=lf,
+                    stderr=subprocess.STDOUT,
+                    cwd=str(NODE_DATA_DIR)  # Store node.db in node_data directory
+                )
+            process_registry.register("beam-node", beam_beam_node_process, LOCAL_NODE_PORT)
+            node_priority.apply(beam_beam_node_process.pid)
+            return beam_beam_node_process
+
+        proc = spawn()
+        state, detail = wait_for_beam_node_ready(proc, log_file)
+
+        # Auto-recover from database corruption as soon as it is logged
+        recovered = False
+        if state == "corrupt":
+            print("[start_beam_node] Database corruption detected, deleting node.db and retrying...")
+            job_step("Recovering node database")
+            try:
+                terminate_processes([proc])
+                for f in NODE_DATA_DIR.glob("node.db*"):
+                    f.unlink()
+                print("[start_beam_node] Deleted corrupted node database, retrying...")
+                proc = spawn()
+                state, detail = wait_for_beam_node_ready(proc, log_file)
+                recovered = True
+            except Exception as re:
+                state, detail = "failed", f"{detail} Recovery failed: {re}"
+
+        if state == "ready":
             node_mode = "local"
-            (STATE_DIR / ".node.pid").write_text(str(beam_beam_node_process.pid))
+            (STATE_DIR / ".node.pid").write_text(str(proc.pid))
             (STATE_DIR / ".node_mode").write_text("local")
-            print(f"Started beam-node (PID: {beam_beam_node_process.pid})")
-            return {"success": True, "pid": beam_beam_node_process.pid}
-        else:
-            # Check if process exited immediately (common with Gatekeeper blocks)
-            exit_code = beam_beam_node_process.poll()
-            error_msg = ""
-            if log_file.exists():
-                log_content = log_file.read_text()
-                error_msg = log_content[-500:] if log_content else ""
-            if exit_code is not None:
-                error_msg = f"beam-node exited immediately with code {exit_code}. {error_msg}"
-                if exit_code == -9 or exit_code == 137:
-                    error_msg += " (Killed - possibly macOS Gatekeeper. Try: xattr -dr com.apple.quarantine " + str(BEAM_NODE_BINARY) + ")"
-
-            # Auto-recover from database corruption
-            if "orruption" in error_msg or "1row change failed" in error_msg:
-                print("[start_beam_node] Database corruption detected, deleting node.db and retrying...")
-                try:
-                    for f in NODE_DATA_DIR.glob("node.db*"):
-                        f.unlink()
-                    print("[start_beam_node] Deleted corrupted node database, retrying...")
-                    time.sleep(1)
-                    with open(log_file, "w") as lf:
-                        beam_beam_node_process = subprocess.Popen(
-                            cmd, stdout=lf, stderr=subprocess.STDOUT,
-                            cwd=str(NODE_DATA_DIR)
-                        )
-                    time.sleep(3)
-                    if is_node_running():
-                        node_mode = "local"
-                        (STATE_DIR / ".node.pid").write_text(str(beam_beam_node_process.pid))
-                        (STATE_DIR / ".node_mode").write_text("local")
-                        print(f"Started beam-node after recovery (PID: {beam_beam_node_process.pid})")
-                        return {"success": True, "pid": beam_beam_node_process.pid, "recovered": True}
-                except Exception as re:
-                    error_msg += f" Recovery failed: {re}"
-
-            if not error_msg:
-                error_msg = "Node failed to start - check logs"
-            print(f"[start_beam_node] FAILED: {error_msg}")
-            return {"error": error_msg}
+            print(f"Started beam-node{' after recovery' if recovered else ''} (PID: {proc.pid})")
+            service_supervisor.expect("beam-node", start_beam_node, owner_key, password)
+            result = {"success": True, "pid": proc.pid}
+            if recovered:
+                result["recovered"] = True
+            return result
+
+        if proc.poll() is None:
+            terminate_processes([proc])
+        error_msg = detail or ""
+        if log_file.exists():
+            log_content = log_file.read_text(errors="replace")
+            error_msg = f"{error_msg} {log_content[-500:]}".strip()
+        exit_code = proc.poll()
+        if exit_code == -9 or exit_code == 137:
+            error_msg += " (Killed - possibly macOS Gatekeeper. Try: xattr -dr com.apple.quarantine " + str(BEAM_NODE_BINARY) + ")"
+        if not error_msg:
+            error_msg = "Node failed to start - check logs"
+        print(f"[start_beam_node] FAILED: {error_msg}")
+        return {"error": error_msg}
 
     except PermissionError as e:
         return {"error": f"Permission denied running beam-node: {e}. Try: chmod +x {BEAM_NODE_BINARY}"}
@@ -537,7 +1503,10 @@ def start_beam_node(owner_key=None, password=None):
 
 
 def switch_to_local_node(password, wallet_name=None):
-    """Switch wallet-api to use local node with owner key (seamless)
+    """Switch wallet-api to use local node with owner key.
+
+    Not seamless: exporting the owner key and restarting on the new node
+    both need wallet.db, so wallet-api is down until the switch completes.
 
     Args:
         password: Wallet password
@@ -565,8 +1534,8 @@ def switch_to_local_node(password, wallet_name=None):
 
     # Step 2: Stop any existing node
     print(f"[switch_to_local_node] === STEP 2: Stopping existing node ===")
+    job_step("Stopping node")
     stop_beam_node()
-    time.sleep(1)
     print(f"[switch_to_local_node] Node running after stop? {is_node_running()}")
 
     # Step 3: Start node with owner key
@@ -583,13 +1552,8 @@ def switch_to_local_node(password, wallet_name=None):
         if "error" in node_result:
             return node_result
 
-    # Step 4: Wait for node to initialize
-    print(f"[switch_to_local_node] === STEP 4: Waiting 3s for node ===")
-    time.sleep(3)
-    print(f"[switch_to_local_node] Node running after wait? {is_node_running()}")
-
-    # Step 5: Start wallet-api with local node
-    print(f"[switch_to_local_node] === STEP 5: Starting wallet-api with {LOCAL_NODE_ADDR} ===")
+    # Step 4: Start wallet-api with local node
+    print(f"[switch_to_local_node] === STEP 4: Starting wallet-api with {LOCAL_NODE_ADDR} ===")
     result = start_wallet_api(target_wallet, password, LOCAL_NODE_ADDR)
     print(f"[switch_to_local_node] start_wallet_api result: {result}")
     print(f"[switch_to_local_node] Node running after wallet-api start? {is_node_running()}")
@@ -607,7 +1571,9 @@ def switch_to_local_node(password, wallet_name=None):
 def fast_switch_node(mode, node_addr=None):
     """Fast node switch — just restart wallet-api with different node address.
     Local node must already be running for 'local' mode.
-    Uses stored password so no client password needed."""
+    Uses stored password so no client password needed.
+    The same wallet stays open, so this is a stop-then-start restart:
+    wallet calls fail until the new instance is ready."""
     global node_mode, active_password
 
     # Save wallet name before start_wallet_api clears it via stop_wallet_api
@@ -624,7 +1590,7 @@ def fast_switch_node(mode, node_addr=None):
     else:
         target_node = node_addr or DEFAULT_NODE
 
-    # Just restart wallet-api with new node address
+    # Same wallet.db: the running wallet-api has to stop before the new one opens it
     result = start_wallet_api(wallet_name, active_password, target_node)
 
     if result.get("success"):
@@ -634,67 +1600,714 @@ def fast_switch_node(mode, node_addr=None):
     return result
 
 
-def start_wallet_api(wallet_name, password, node_addr=None):
-    """Start wallet-api for given wallet"""
-    global wallet_api_process, active_wallet
+WALLET_API_READY_TIMEOUT = 15
+READY_PROBE_INITIAL = 0.005   # seconds; doubled after every failed probe
+READY_PROBE_MAX = 0.25
 
-    wallet_path = WALLETS_DIR / wallet_name / "wallet.db"
-    if not wallet_path.exists():
-        return {"error": f"Wallet '{wallet_name}' not found"}
 
-    if not WALLET_API_BINARY.exists():
-        return {"error": f"wallet-api binary not found at {WALLET_API_BINARY}"}
+def tcp_port_open(port, host="127.0.0.1", timeout=0.2):
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
 
-    # Stop existing wallet-api and kill any process on the port
-    stop_wallet_api()
-    kill_process_on_port(WALLET_API_PORT)
-    time.sleep(1)  # Give port time to be released
 
-    LOGS_DIR.mkdir(exist_ok=True)
+def wallet_api_log_error(lines):
+    """Map wallet-api log lines to a startup error message, if any"""
+    for line in lines:
+        if "File is not a database" in line or "invalid password" in line.lower():
+            return "Invalid password"
+        if "EXCEPTION" in line:
+            return line.split("EXCEPTION:")[-1].strip()[:100] or "wallet-api exception"
+    return None
+
 
-    log_file = LOGS_DIR / f"{wallet_name}_api.log"
-    node = node_addr or DEFAULT_NODE
+def wait_for_wallet_api_ready(proc, port, log_file, timeout=WALLET_API_READY_TIMEOUT):
+    """Block until wallet-api accepts connections, exits, or logs a failure.
+
+    Returns None when ready, otherwise an error message. The port is probed
+    with a plain TCP connect on exponential backoff; in between, the process
+    is polled for an early exit and the new log lines are scanned.
+    """
+    tail = LogTailer(log_file)
+    deadline = time.time() + timeout
+    delay = READY_PROBE_INITIAL
+    while True:
+        error = wallet_api_log_error(tail.read_lines())
+        if error:
+            return error
+        exit_code = proc.poll()
+        if exit_code is not None:
+            return wallet_api_log_error(tail.read_lines() + [tail.partial]) or \
+                f"wallet-api exited with code {exit_code}"
+        if tcp_port_open(port) and is_wallet_api_running(port):
+            return None
+        if time.time() >= deadline:
+            return "Wallet API failed to start (timeout)"
+        time.sleep(delay)
+        delay = min(delay * 2, READY_PROBE_MAX)
+
+
+def spawn_wallet_api(wallet_name, password, node_addr, port):
+    """Launch a wallet-api process; returns (Popen, log file)"""
+    wallet_path = WALLETS_DIR / wallet_name / "wallet.db"
+    LOGS_DIR.mkdir(exist_ok=True)
+    # The partner instance of a blue/green pair may share the wallet: keep logs apart
+    suffix = "" if port == WALLET_API_PORT else f"_{port}"
+    log_file = LOGS_DIR / f"{wallet_name}_api{suffix}.log"
 
     cmd = [
         str(WALLET_API_BINARY),
         f"--wallet_path={wallet_path}",
         f"--pass={password}",
-        f"--node_addr={node}",
-        f"--port={WALLET_API_PORT}",
+        f"--node_addr={node_addr or DEFAULT_NODE}",
+        f"--port={port}",
         "--use_http=1",
         "--enable_assets",
         "--enable_lelantus"
     ]
+    with open(log_file, "w") as lf:
+        proc = subprocess.Popen(
+            cmd,
+            stdout=lf,
+            stderr=subprocess.STDOUT,
+            cwd=str(BASE_DIR)
+        )
+    return proc, log_file
 
-    try:
-        with open(log_file, "w") as lf:
-            wallet_api_process = subprocess.Popen(
-                cmd,
-                stdout=lf,
-                stderr=subprocess.STDOUT,
-                cwd=str(BASE_DIR)
-            )
 
-        for _ in range(15):
-            time.sleep(1)
-            if is_wallet_api_running():
-                active_wallet = wallet_name
-                (STATE_DIR / ".active_wallet").write_text(wallet_name)
-                return {"success": True, "wallet": wallet_name}
+def retire_wallet_api(proc, port):
+    """Stop a replaced wallet-api once its in-flight calls have finished"""
+    if not wallet_api_target.wait_drained(port):
+        print(f"[wallet-api] Drain timeout on port {port}, stopping anyway")
+    if proc is not None and proc.poll() is None:
+        terminate_processes([proc])
+    else:
+        kill_process_on_port(port)
+    print(f"[wallet-api] Retired instance on port {port}")
+
 
-        if log_file.exists():
-            log_content = log_file.read_text()
-            if "File is not a database" in log_content or "invalid password" in log_content.lower():
-                return {"error": "Invalid password"}
-            if "EXCEPTION" in log_content:
-                return {"error": log_content.split("EXCEPTION:")[-1].strip()[:100]}
+def start_wallet_api(wallet_name, password, node_addr=None, blue_green=False):
+    """Start wallet-api for given wallet.
+
+    With blue_green=True and an instance already serving a different
+    wallet, the replacement starts on the partner port, the proxy switches
+    over once it is ready, and the old instance is drained and stopped in
+    the background. If the replacement fails, the old instance keeps
+    serving.
+
+    Only changing to a different wallet is seamless. Restarting the same
+    wallet (node switches, re-unlock, after export_owner_key) stops the
+    running instance first, because two wallet-api processes must not
+    share one wallet.db; wallet calls fail until the new one is ready.
+    """
+    global wallet_api_process, active_wallet
+
+    wallet_path = WALLETS_DIR / wallet_name / "wallet.db"
+    if not wallet_path.exists():
+        return {"error": f"Wallet '{wallet_name}' not found"}
 
-        return {"error": "Wallet API failed to start (timeout)"}
+    if not WALLET_API_BINARY.exists():
+        return {"error": f"wallet-api binary not found at {WALLET_API_BINARY}"}
+
+    old_port = wallet_api_target.port
+    if blue_green and is_wallet_api_running() and wallet_name != active_wallet:
+        port = WALLET_API_ALT_PORT if old_port == WALLET_API_PORT else WALLET_API_PORT
+        old_process = wallet_api_process
+        kill_process_on_port(port)  # stale instance from an earlier run
+    else:
+        blue_green = False
+        port = WALLET_API_PORT
+        # Stop existing wallet-api and kill any process on the port
+        stop_wallet_api()
+
+    try:
+        job_step("Starting wallet-api")
+        proc, log_file = spawn_wallet_api(wallet_name, password, node_addr, port)
+        if not blue_green:
+            wallet_api_process = proc
+            process_registry.register("wallet-api", proc, port)
+
+        job_step("Waiting for wallet-api")
+        error = wait_for_wallet_api_ready(proc, port, log_file)
+        if error is not None:
+            if blue_green and proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            return {"error": error}
+
+        if blue_green:
+            wallet_api_target.switch(port)
+            wallet_api_process = proc
+            process_registry.register("wallet-api", proc, port)
+            threading.Thread(target=retire_wallet_api, args=(old_process, old_port), daemon=True).start()
+        active_wallet = wallet_name
+        (STATE_DIR / ".active_wallet").write_text(wallet_name)
+        service_supervisor.expect("wallet-api", start_wallet_api, wallet_name, password, node_addr)
+        return {"success": True, "wallet": wallet_name}
 
     except Exception as e:
         return {"error": str(e)}
 
 
+# ============================================
+# LIFECYCLE JOBS
+# ============================================
+# Unlock, node switch, rescan, create and restore take from seconds to
+# minutes. Their endpoints only validate input and queue a job; the work
+# runs on a single worker (these operations start and stop the same
+# processes, so they must not overlap) and reports its current step, which
+# clients follow via GET /api/jobs/<id> or the /api/events stream. The
+# result is only returned to the creator, who presents the job token from
+# the 202 in X-Job-Token.
+
+LIFECYCLE_JOBS_KEEP = 50         # finished jobs kept for polling
+LIFECYCLE_SECRET_FIELDS = ("seed_phrase",)  # handed out once, to the job's creator
+EVENT_STREAM_BACKLOG = 200       # events a reconnecting client can catch up on
+EVENT_STREAM_KEEPALIVE = 15
+
+
+class EventStream:
+    """Numbered in-memory event log fanned out to Server-Sent Events clients"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.events = collections.deque(maxlen=EVENT_STREAM_BACKLOG)
+        self.seq = 0
+
+    def publish(self, kind, data):
+        with self.cond:
+            self.seq += 1
+            self.events.append((self.seq, kind, data))
+            self.cond.notify_all()
+
+    def wait(self, after, timeout):
+        """Events with a sequence number above after; empty on timeout"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > after, timeout)
+            return [e for e in self.events if e[0] > after]
+
+
+event_stream = EventStream()
+
+
+class LifecycleJob:
+    def __init__(self, kind, target):
+        self.id = secrets.token_hex(8)
+        self.token = secrets.token_urlsafe(16)  # only the creator learns it, from the 202
+        self.kind = kind
+        self.target = target  # () -> (result dict, HTTP status)
+        self.state = "queued"
+        self.steps = []
+        self.result = None
+        self.status = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self, with_result=True):
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "state": self.state,
+            "step": self.steps[-1]["name"] if self.steps else None,
+            "steps": list(self.steps),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if with_result and self.finished_at is not None:
+            data["result"] = self.result
+            data["status"] = self.status
+        return data
+
+
+class LifecycleJobs:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = collections.OrderedDict()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="lifecycle")
+        self.local = threading.local()
+        # Held by running jobs and by every synchronous handler that starts or
+        # stops wallet-api, beam-node or a session, so those never interleave
+        self.process_lock = threading.RLock()
+
+    def submit(self, kind, target):
+        job = LifecycleJob(kind, target)
+        with self.lock:
+            self.jobs[job.id] = job
+            finished = [j for j in self.jobs.values() if j.finished_at is not None]
+            for old in finished[:max(0, len(finished) - LIFECYCLE_JOBS_KEEP)]:
+                del self.jobs[old.id]
+        self._publish(job)
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def busy(self):
+        """True while any job is queued or running"""
+        with self.lock:
+            return any(j.finished_at is None for j in self.jobs.values())
+
+    def read(self, job, token):
+        """Job status, with its result only for the holder of the job token.
+
+        Secret fields are removed from the result once they have been read.
+        """
+        if not token or not secrets.compare_digest(job.token, token):
+            return job.to_dict(with_result=False)
+        with self.lock:
+            data = job.to_dict()
+            if job.finished_at is not None:
+                job.result = {k: v for k, v in job.result.items() if k not in LIFECYCLE_SECRET_FIELDS}
+        return data
+
+    def _publish(self, job):
+        # The result can hold secrets (a new wallet's seed phrase): only the
+        # job endpoint returns it, to the job's creator, never the broadcast stream
+        event_stream.publish("job", job.to_dict(with_result=False))
+
+    def step(self, name):
+        job = getattr(self.local, "job", None)
+        if job is None:
+            return
+        job.steps.append({"name": name, "at": time.time()})
+        self._publish(job)
+
+    def _run(self, job):
+        self.local.job = job
+        job.state = "running"
+        self._publish(job)
+        try:
+            with self.process_lock:
+                job.result, job.status = job.target()
+        except Exception as e:
+            job.result, job.status = {"error": str(e)}, 500
+        finally:
+            self.local.job = None
+        job.state = "done" if job.result.get("success") else "failed"
+        job.finished_at = time.time()
+        print(f"[jobs] {job.kind} {job.id} {job.state}")
+        self._publish(job)
+
+
+lifecycle_jobs = LifecycleJobs()
+
+
+def job_step(name):
+    """Report progress of the lifecycle job running on this thread (no-op elsewhere)"""
+    lifecycle_jobs.step(name)
+
+
+def _result_status(result):
+    return 401 if "password" in result.get("error", "").lower() else (200 if "success" in result else 500)
+
+
+def run_unlock(wallet_name, password, node_addr=None):
+    global active_password
+    if wallet_name in wallet_sessions.sessions:
+        # Two wallet-api processes must not share one wallet.db
+        return {"error": f"Wallet '{wallet_name}' is open in a session; close it first"}, 409
+    # If node_mode is local and no explicit node_addr, use switch_to_local_node
+    # which properly exports owner key and starts node with it
+    if node_mode == "local" and not node_addr:
+        print(f"[handle_unlock] Local mode detected, using switch_to_local_node...")
+        result = switch_to_local_node(password, wallet_name)
+    else:
+        result = start_wallet_api(wallet_name, password, node_addr, blue_green=True)
+    if result.get("success"):
+        active_password = password
+    return result, _result_status(result)
+
+
+def run_node_switch(mode, password, wallet_name=None, node_addr=None):
+    if wallet_name and wallet_name != active_wallet and wallet_name in wallet_sessions.sessions:
+        return {"error": f"Wallet '{wallet_name}' is open in a session; close it first"}, 409
+    if mode == "local" and is_node_running():
+        # Fast path: local node already running, just restart wallet-api
+        result = fast_switch_node("local")
+    elif mode == "public":
+        # Fast path: just restart wallet-api with public node
+        result = fast_switch_node("public", node_addr)
+    else:
+        # Fallback: full switch (start node from scratch)
+        result = switch_to_local_node(password, wallet_name)
+    return result, 200 if result.get("success") else 400
+
+
+def run_create(wallet_name, password):
+    result = create_wallet(wallet_name, password)
+    return result, 200 if "success" in result else 400
+
+
+def run_restore(wallet_name, password, seed_phrase):
+    result = restore_wallet(wallet_name, password, seed_phrase)
+    if result.get("success"):
+        # Don't trigger rescan here - it takes too long
+        # The unlock step will start wallet-api, and user can trigger rescan later
+        result["message"] = "Wallet restored successfully. Use Settings > Rescan if balances appear incorrect."
+        print(f"[restore] Wallet restored: {wallet_name}")
+    return result, 200 if "success" in result else 400
+
+
+def run_node_restart():
+    """Restart the local node with its current parameters (and scheduling)"""
+    entry = service_supervisor.expected.get("beam-node")
+    result = start_beam_node(*(entry[1] if entry else ()))
+    return result, 200 if result.get("success") else 500
+
+
+def run_rescan(wallet_name, password):
+    result = rescan_wallet(wallet_name, password)
+    return result, 200 if "success" in result else 400
+
+
+# ============================================
+# PROCESS SUPERVISOR
+# ============================================
+# wallet-api and beam-node can die long after a successful start. Once a
+# start succeeds the service is "expected"; the supervisor thread checks it
+# every few seconds and restarts it from the same parameters, backing off
+# exponentially while restarts keep failing. An explicit stop (lock, node
+# switch, shutdown) releases the service again. Checks pause while a
+# lifecycle job is queued or running, and restarts are themselves queued as
+# lifecycle jobs, so they never overlap an unlock or a node switch.
+
+SUPERVISOR_INTERVAL = 5
+SUPERVISOR_BACKOFF_INITIAL = 2
+SUPERVISOR_BACKOFF_MAX = 300
+SUPERVISOR_STABLE_AFTER = 120        # seconds up before the backoff resets
+SUPERVISOR_UNRESPONSIVE_CHECKS = 3   # failed port probes before a live wallet-api counts as hung
+
+
+class ServiceSupervisor:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()  # .restarting on the job thread during our own restarts
+        self.expected = {}  # role -> (restart function, args)
+        self.stats = {}     # role -> health counters, kept across releases
+
+    def _stats(self, role):
+        return self.stats.setdefault(role, {
+            "state": "stopped",
+            "crashes": 0,
+            "restarts": 0,
+            "last_exit_code": None,
+            "last_crash": None,
+            "last_error": None,
+            "started_at": None,
+            "next_restart": None,
+            "backoff": SUPERVISOR_BACKOFF_INITIAL,
+            "unresponsive": 0,
+        })
+
+    def expect(self, role, restart, *args):
+        """Supervise role from now on; restart(*args) brings it back"""
+        with self.lock:
+            self.expected[role] = (restart, args)
+            st = self._stats(role)
+            st.update(state="running", started_at=time.time(), next_restart=None, unresponsive=0)
+
+    def release(self, role):
+        """Stop supervising role (explicit stop). Ignored for the supervisor's own restarts."""
+        if getattr(self.local, "restarting", False):
+            return
+        with self.lock:
+            if self.expected.pop(role, None) is not None:
+                self._stats(role).update(state="stopped", next_restart=None)
+
+    def release_all(self):
+        for role in list(self.expected):
+            self.release(role)
+
+    def _exit_code(self, role, port, binary):
+        """None while the service is alive, else its exit code ("unknown" if not ours)"""
+        proc = process_registry.handle(role)
+        if proc is not None:
+            code = proc.poll()
+            if code is not None:
+                return code
+            return None
+        return None if process_registry.pid(role, port, binary) else "unknown"
+
+    def _check(self, role):
+        if role == "wallet-api":
+            port = wallet_api_target.port
+            code = self._exit_code(role, port, "wallet-api")
+            if code is None:
+                st = self._stats(role)
+                st["unresponsive"] = 0 if tcp_port_open(port) else st["unresponsive"] + 1
+                if st["unresponsive"] >= SUPERVISOR_UNRESPONSIVE_CHECKS:
+                    pid = get_wallet_api_pid()
+                    print(f"[supervisor] wallet-api (PID: {pid}) not accepting connections, killing it")
+                    if pid:
+                        try:
+                            os.kill(pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                    return "unresponsive"
+            return code
+        return self._exit_code(role, LOCAL_NODE_PORT, "beam-node")
+
+    def _restart(self, role):
+        """Queue the restart behind any lifecycle job submitted in the meantime"""
+        self._stats(role)["state"] = "restarting"
+        lifecycle_jobs.submit(f"restart_{role}", lambda: self._run_restart(role))
+
+    def _run_restart(self, role):
+        st = self._stats(role)
+        with self.lock:
+            entry = self.expected.get(role)
+        if entry is None:
+            return {"success": True, "message": f"{role} was released"}, 200
+        port = wallet_api_target.port if role == "wallet-api" else LOCAL_NODE_PORT
+        if self._exit_code(role, port, role) is None:
+            # A job queued before this one already brought it back
+            st.update(state="running", started_at=time.time(), next_restart=None)
+            return {"success": True, "message": f"{role} is already running"}, 200
+        restart, args = entry
+        st["restarts"] += 1
+        print(f"[supervisor] Restarting {role} (attempt {st['restarts']})")
+        self.local.restarting = True
+        try:
+            result = restart(*args)
+        except Exception as e:
+            result = {"error": str(e)}
+        finally:
+            self.local.restarting = False
+        with self.lock:
+            if role not in self.expected:
+                return result, _result_status(result)  # released while we were restarting
+            if result.get("success"):
+                st.update(state="running", started_at=time.time(), next_restart=None,
+                          unresponsive=0, last_error=None)
+                self.expected[role] = entry
+                print(f"[supervisor] {role} is back")
+            else:
+                st.update(state="backoff", last_error=result.get("error"),
+                          next_restart=time.time() + st["backoff"])
+                st["backoff"] = min(st["backoff"] * 2, SUPERVISOR_BACKOFF_MAX)
+                print(f"[supervisor] {role} restart failed: {result.get('error')}")
+        return result, _result_status(result)
+
+    def tick(self):
+        if lifecycle_jobs.busy():
+            return  # the job may be stopping or replacing these services on purpose
+        now = time.time()
+        for role in list(self.expected):
+            st = self._stats(role)
+            if st["state"] == "running":
+                code = self._check(role)
+                if code is None:
+                    if now - (st["started_at"] or now) > SUPERVISOR_STABLE_AFTER:
+                        st["backoff"] = SUPERVISOR_BACKOFF_INITIAL
+                    continue
+                st.update(state="backoff", crashes=st["crashes"] + 1, last_exit_code=code,
+                          last_crash=now, next_restart=now + st["backoff"])
+                print(f"[supervisor] {role} died (exit code {code}), restarting in {st['backoff']}s")
+                st["backoff"] = min(st["backoff"] * 2, SUPERVISOR_BACKOFF_MAX)
+            elif st["state"] == "backoff" and now >= st["next_restart"]:
+                self._restart(role)
+
+    def run(self):
+        while True:
+            time.sleep(SUPERVISOR_INTERVAL)
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[supervisor] Check failed: {e}")
+
+    def status(self):
+        with self.lock:
+            return {role: {**st, "supervised": role in self.expected}
+                    for role, st in self.stats.items()}
+
+
+service_supervisor = ServiceSupervisor()
+
+
+# ============================================
+# MULTI-WALLET SESSIONS
+# ============================================
+# Besides the active wallet (ports 10000/10001), further wallets can be kept
+# unlocked in their own wallet-api on a managed port range. /api/wallet
+# calls carrying the session token in X-Wallet-Session are routed to that
+# instance; idle sessions are evicted, least recently used first.
+
+WALLET_SESSION_PORTS = range(10010, 10020)
+WALLET_SESSION_MAX = 4
+WALLET_SESSION_IDLE_TIMEOUT = 1800
+WALLET_SESSION_SWEEP_INTERVAL = 60
+
+
+class WalletSession:
+    def __init__(self, wallet, port, proc, password):
+        self.wallet = wallet
+        self.port = port
+        self.proc = proc
+        self.token = secrets.token_urlsafe(24)
+        self.salt = secrets.token_bytes(16)
+        self.password_digest = hashlib.sha256(self.salt + password.encode()).digest()
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.inflight = 0
+
+    @property
+    def url(self):
+        return WalletApiTarget.url_for(self.port)
+
+    def password_matches(self, password):
+        return secrets.compare_digest(self.password_digest,
+                                      hashlib.sha256(self.salt + password.encode()).digest())
+
+    def to_dict(self):
+        return {
+            "wallet": self.wallet,
+            "port": self.port,
+            "alive": self.proc.poll() is None,
+            "created_at": self.created_at,
+            "idle_seconds": round(time.time() - self.last_used, 1),
+            "inflight": self.inflight,
+        }
+
+
+class WalletSessionPool:
+    """Up to WALLET_SESSION_MAX extra wallet-api instances, one per wallet, in LRU order"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open_lock = threading.Lock()  # one spawn at a time
+        self.sessions = collections.OrderedDict()  # wallet -> WalletSession, oldest use first
+
+    def _stop(self, *sessions):
+        for session in sessions:
+            process_registry.forget(f"session:{session.wallet}")
+        terminate_processes([s.proc for s in sessions if s.proc.poll() is None])
+        for session in sessions:
+            print(f"[sessions] Closed wallet-api for '{session.wallet}' on port {session.port}")
+
+    def _evict_for_room(self):
+        """Free a slot by closing the least recently used idle session"""
+        with self.lock:
+            if len(self.sessions) < WALLET_SESSION_MAX:
+                return True
+            victim = next((s for s in self.sessions.values() if s.inflight == 0), None)
+            if victim is None:
+                return False
+            del self.sessions[victim.wallet]
+        self._stop(victim)
+        return True
+
+    def open(self, wallet, password, node_addr=None):
+        """Session for wallet, starting its wallet-api if needed. Raises ValueError."""
+        with self.open_lock:
+            with self.lock:
+                session = self.sessions.get(wallet)
+            if session and session.proc.poll() is None:
+                if not session.password_matches(password):
+                    raise ValueError("Invalid password")
+                self.touch(session)
+                return session
+            if session:
+                self.close(wallet)
+
+            if not self._evict_for_room():
+                raise ValueError("All wallet sessions are busy")
+            with self.lock:
+                used = {s.port for s in self.sessions.values()}
+            port = next((p for p in WALLET_SESSION_PORTS if p not in used and not tcp_port_open(p)), None)
+            if port is None:
+                raise ValueError("No free wallet session port")
+
+            proc, log_file = spawn_wallet_api(wallet, password, node_addr, port)
+            process_registry.register(f"session:{wallet}", proc, port)
+            error = wait_for_wallet_api_ready(proc, port, log_file)
+            session = WalletSession(wallet, port, proc, password)
+            if error is not None:
+                self._stop(session)
+                raise ValueError(error)
+            with self.lock:
+                self.sessions[wallet] = session
+            print(f"[sessions] Opened wallet-api for '{wallet}' on port {port}")
+            return session
+
+    def touch(self, session):
+        with self.lock:
+            session.last_used = time.time()
+            if session.wallet in self.sessions:
+                self.sessions.move_to_end(session.wallet)
+
+    def resolve(self, token=None):
+        """Session the token was issued for, or None when no token is given.
+
+        Raises KeyError when a token is present but matches no live session.
+        """
+        if not token:
+            return None
+        with self.lock:
+            session = next((s for s in self.sessions.values()
+                            if secrets.compare_digest(s.token, token)), None)
+        if session is None or session.proc.poll() is not None:
+            raise KeyError("Unknown or closed wallet session")
+        return session
+
+    @contextlib.contextmanager
+    def use(self, session):
+        with self.lock:
+            session.inflight += 1
+        self.touch(session)
+        try:
+            yield session.url
+        finally:
+            with self.lock:
+                session.inflight -= 1
+
+    def close(self, wallet):
+        with self.lock:
+            session = self.sessions.pop(wallet, None)
+        if session:
+            self._stop(session)
+        return session is not None
+
+    def close_all(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        if sessions:
+            self._stop(*sessions)
+
+    def sweep(self):
+        """Close sessions idle for longer than WALLET_SESSION_IDLE_TIMEOUT (or dead)"""
+        now = time.time()
+        with self.lock:
+            expired = [w for w, s in self.sessions.items()
+                       if s.proc.poll() is not None
+                       or (s.inflight == 0 and now - s.last_used > WALLET_SESSION_IDLE_TIMEOUT)]
+        for wallet in expired:
+            self.close(wallet)
+        return len(expired)
+
+    def status(self):
+        with self.lock:
+            return [s.to_dict() for s in self.sessions.values()]
+
+
+wallet_sessions = WalletSessionPool()
+
+
+def wallet_session_sweep_loop():
+    """Background worker evicting idle wallet sessions"""
+    while True:
+        time.sleep(WALLET_SESSION_SWEEP_INTERVAL)
+        try:
+            with lifecycle_jobs.process_lock:
+                wallet_sessions.sweep()
+        except Exception as e:
+            print(f"[sessions] Sweep failed: {e}")
+
+
 def create_wallet(wallet_name, password):
     """Create a new wallet using beam-wallet CLI"""
     if not WALLET_CLI_BINARY.exists():
@@ -708,6 +2321,7 @@ def create_wallet(wallet_name, password):
     wallet_dir.mkdir(parents=True, exist_ok=True)
     wallet_path = wallet_dir / "wallet.db"
 
+    job_step("Creating wallet")
     cmd = [
         str(WALLET_CLI_BINARY),
         "init",
@@ -773,6 +2387,7 @@ def restore_wallet(wallet_name, password, seed_phrase):
     words = seed_phrase.strip().split()
     formatted_seed = ';'.join(words) + ';'
 
+    job_step("Restoring wallet from seed")
     cmd = [
         str(WALLET_CLI_BINARY),
         "restore",
@@ -819,11 +2434,12 @@ def export_owner_key(wallet_name, password):
     if not wallet_path.exists():
         return {"error": f"Wallet '{wallet_name}' not found"}
 
+    job_step("Exporting owner key")
+
     # Stop wallet-api to release database lock
     was_running = wallet_api_process is not None
     if was_running:
         stop_wallet_api()
-        time.sleep(1)
 
     cmd = [
         str(WALLET_CLI_BINARY),
@@ -876,11 +2492,12 @@ def delete_wallet(wallet_name):
         return {"error": f"Wallet '{wallet_name}' not found"}
 
     # Don't delete active wallet
-    if active_wallet == wallet_name:
+    if active_wallet == wallet_name or wallet_name in wallet_sessions.sessions:
         return {"error": "Cannot delete active wallet. Lock it first."}
 
     try:
         import shutil
+        close_tx_index(wallet_name)
         shutil.rmtree(wallet_dir)
         return {"success": True, "message": f"Wallet '{wallet_name}' deleted"}
     except Exception as e:
@@ -908,10 +2525,10 @@ def rescan_wallet(wallet_name, password):
 
     # Step 2: Restart local node with owner key
     print(f"[rescan] Restarting local node with owner key...")
+    job_step("Restarting node with owner key")
 
     # Stop existing node using the proper function (doesn't kill all nodes)
     stop_beam_node()
-    time.sleep(1)
 
     # Start node with owner key
     node_binary = BASE_DIR / "binaries" / PLATFORM / "beam-node"
@@ -940,32 +2557,2289 @@ def rescan_wallet(wallet_name, password):
                 stderr=subprocess.STDOUT,
                 cwd=str(NODE_DATA_DIR)  # Store node.db in node_data directory
             )
+        process_registry.register("beam-node", beam_beam_node_process, LOCAL_NODE_PORT)
+        node_priority.apply(beam_beam_node_process.pid)
 
         # Wait for node to start
-        time.sleep(3)
+        state, detail = wait_for_beam_node_ready(beam_beam_node_process, node_log)
+
+        # Check if node started
+        if state != "ready":
+            if beam_beam_node_process.poll() is None:
+                terminate_processes([beam_beam_node_process])
+            print(f"[rescan] Node failed to start: {detail}")
+            # Fall back to local node without owner key
+            return start_wallet_api(wallet_name, password, LOCAL_NODE_ADDR)
+
+        print(f"[rescan] Node started with owner key, PID: {beam_beam_node_process.pid}")
+
+    except Exception as e:
+        print(f"[rescan] Failed to start node: {e}")
+        return start_wallet_api(wallet_name, password, LOCAL_NODE_ADDR)
+
+    # Step 3: Connect wallet-api to local node
+    print(f"[rescan] Starting wallet-api with local node...")
+    result = start_wallet_api(wallet_name, password, LOCAL_NODE_ADDR)
+
+    if result.get("success"):
+        result["message"] = "Wallet connected to local node. Rescan in progress..."
+        result["rescan"] = True
+
+    return result
+
+
+# ============================================
+# LOCAL TRANSACTION INDEX
+# ============================================
+# Per-wallet SQLite index of tx_list, synced incrementally from the
+# wallet-api serving that wallet (the active one or its session) and served
+# from /api/tx with cursor pagination and filters. Only an unlocked wallet
+# is served: the active one, or a session wallet to the holder of its
+# X-Wallet-Session token. The index file of a closed wallet stays on disk
+# for the next unlock but is never read while the wallet is locked.
+
+TX_INDEX_FILE = "tx_index.db"
+TX_INDEX_PAGE_SIZE = 100
+TX_INDEX_SYNC_INTERVAL = 15  # seconds between background syncs
+TX_INDEX_FULL_RESYNC = 600   # walk the whole tx_list at least this often
+TX_INDEX_MAX_LIMIT = 500
+TX_FINAL_STATUSES = (2, 3, 4)    # Cancelled, Completed, Failed
+TX_PENDING_STATUSES = (0, 1, 5)  # Pending, In Progress, Registering
+# Fields that change every block without the tx itself changing
+TX_VOLATILE_FIELDS = ("confirmations",)
+
+
+class TxIndex:
+    """SQLite-backed transaction index for one wallet"""
+
+    def __init__(self, wallet_name):
+        self.wallet_name = wallet_name
+        self.path = WALLETS_DIR / wallet_name / TX_INDEX_FILE
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS txs (
+                tx_id TEXT PRIMARY KEY,
+                create_time INTEGER NOT NULL DEFAULT 0,
+                height INTEGER NOT NULL DEFAULT 0,
+                status INTEGER NOT NULL DEFAULT 0,
+                asset_id INTEGER NOT NULL DEFAULT 0,
+                value INTEGER NOT NULL DEFAULT 0,
+                fee INTEGER NOT NULL DEFAULT 0,
+                income INTEGER NOT NULL DEFAULT 0,
+                sender TEXT,
+                receiver TEXT,
+                tx_type INTEGER,
+                digest TEXT NOT NULL,
+                raw TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS txs_time ON txs (create_time DESC, tx_id DESC);
+            CREATE INDEX IF NOT EXISTS txs_status ON txs (status, create_time DESC);
+            CREATE INDEX IF NOT EXISTS txs_sender ON txs (sender);
+            CREATE INDEX IF NOT EXISTS txs_receiver ON txs (receiver);
+            CREATE TABLE IF NOT EXISTS tx_assets (
+                tx_id TEXT NOT NULL,
+                asset_id INTEGER NOT NULL,
+                PRIMARY KEY (asset_id, tx_id)
+            );
+            CREATE TABLE IF NOT EXISTS tx_contracts (
+                tx_id TEXT NOT NULL,
+                cid TEXT NOT NULL,
+                PRIMARY KEY (cid, tx_id)
+            );
+            CREATE TABLE IF NOT EXISTS asset_stats (
+                asset_id INTEGER PRIMARY KEY,
+                tx_count INTEGER NOT NULL,
+                completed INTEGER NOT NULL,
+                pending INTEGER NOT NULL,
+                failed INTEGER NOT NULL,
+                received INTEGER NOT NULL,
+                sent INTEGER NOT NULL,
+                fees INTEGER NOT NULL,
+                first_time INTEGER,
+                last_time INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self.db.commit()
+        self.last_sync = 0
+        self.last_full_sync = float(self._get_meta("last_full_sync") or 0)
+        self.sync_error = None
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def _get_meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @staticmethod
+    def _digest(tx):
+        stable = {k: v for k, v in tx.items() if k not in TX_VOLATILE_FIELDS}
+        return hashlib.sha1(json.dumps(stable, sort_keys=True).encode()).hexdigest(), stable
+
+    @staticmethod
+    def _refs(tx):
+        """Assets and contract ids a transaction touches"""
+        assets = {int(tx.get("asset_id") or 0)}
+        cids = set()
+        for a in tx.get("assets") or []:
+            if isinstance(a, dict) and "asset_id" in a:
+                assets.add(int(a["asset_id"]))
+        for inv in tx.get("invoke_data") or []:
+            if not isinstance(inv, dict):
+                continue
+            if inv.get("contract_id"):
+                cids.add(inv["contract_id"])
+            for amt in inv.get("amounts") or []:
+                if isinstance(amt, dict) and "asset_id" in amt:
+                    assets.add(int(amt["asset_id"]))
+        return assets, cids
+
+    def _upsert(self, tx, digest, stable):
+        tx_id = tx["txId"]
+        self.db.execute("""
+            INSERT OR REPLACE INTO txs
+                (tx_id, create_time, height, status, asset_id, value, fee, income,
+                 sender, receiver, tx_type, digest, raw)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            tx_id, int(tx.get("create_time") or 0), int(tx.get("height") or 0),
+            int(tx.get("status") or 0), int(tx.get("asset_id") or 0),
+            int(tx.get("value") or 0), int(tx.get("fee") or 0), 1 if tx.get("income") else 0,
+            tx.get("sender"), tx.get("receiver"), tx.get("tx_type"),
+            digest, json.dumps(stable)
+        ))
+        assets, cids = self._refs(tx)
+        self.db.execute("DELETE FROM tx_assets WHERE tx_id = ?", (tx_id,))
+        self.db.execute("DELETE FROM tx_contracts WHERE tx_id = ?", (tx_id,))
+        self.db.executemany("INSERT OR IGNORE INTO tx_assets (tx_id, asset_id) VALUES (?, ?)",
+                            [(tx_id, a) for a in assets])
+        self.db.executemany("INSERT OR IGNORE INTO tx_contracts (tx_id, cid) VALUES (?, ?)",
+                            [(tx_id, c) for c in cids])
+
+    def _rebuild_stats(self):
+        self.db.execute("DELETE FROM asset_stats")
+        self.db.execute(f"""
+            INSERT INTO asset_stats
+            SELECT asset_id,
+                   COUNT(*),
+                   SUM(status = 3),
+                   SUM(status IN {TX_PENDING_STATUSES}),
+                   SUM(status IN (2, 4)),
+                   SUM(CASE WHEN status = 3 AND income = 1 THEN value ELSE 0 END),
+                   SUM(CASE WHEN status = 3 AND income = 0 THEN value ELSE 0 END),
+                   SUM(CASE WHEN status = 3 AND income = 0 THEN fee ELSE 0 END),
+                   MIN(create_time),
+                   MAX(create_time)
+            FROM txs GROUP BY asset_id
+        """)
+
+    def sync(self):
+        """Pull new and changed transactions from wallet-api.
+
+        tx_list is walked newest first and the walk stops at the first page
+        that is entirely known and final. A full walk still runs every
+        TX_INDEX_FULL_RESYNC seconds in case wallet-api ordering differs.
+        """
+        wallet = self.wallet_name
+        owner = wallet_api_owner(wallet)
+        if owner is None:
+            raise RuntimeError(f"Wallet '{wallet}' is not open")
+        with self.lock:
+            known = dict(self.db.execute("SELECT tx_id, digest FROM txs").fetchall())
+            full = not known or time.time() - self.last_full_sync > TX_INDEX_FULL_RESYNC
+            changed = 0
+            seen = set()
+            skip = 0
+            while True:
+                batch = call_wallet_api("tx_list", {"skip": skip, "count": TX_INDEX_PAGE_SIZE},
+                                        priority=UPSTREAM_PRIORITY_BACKGROUND, wallet=wallet) or []
+                settled = True
+                for tx in batch:
+                    if not isinstance(tx, dict) or not tx.get("txId"):
+                        continue
+                    seen.add(tx["txId"])
+                    digest, stable = self._digest(tx)
+                    if known.get(tx["txId"]) != digest:
+                        self._upsert(tx, digest, stable)
+                        changed += 1
+                        settled = False
+                    elif tx.get("status") not in TX_FINAL_STATUSES:
+                        settled = False
+                if len(batch) < TX_INDEX_PAGE_SIZE or (settled and not full):
+                    break
+                skip += TX_INDEX_PAGE_SIZE
+
+            # Pending txs older than the point where the walk stopped
+            if not full:
+                stale = self.db.execute(
+                    f"SELECT tx_id FROM txs WHERE status IN {TX_PENDING_STATUSES}"
+                ).fetchall()
+                for row in stale:
+                    if row["tx_id"] in seen:
+                        continue
+                    try:
+                        tx = call_wallet_api("tx_status", {"txId": row["tx_id"]},
+                                             priority=UPSTREAM_PRIORITY_BACKGROUND, wallet=wallet)
+                    except RuntimeError:
+                        continue
+                    if isinstance(tx, dict) and tx.get("txId"):
+                        digest, stable = self._digest(tx)
+                        if known.get(tx["txId"]) != digest:
+                            self._upsert(tx, digest, stable)
+                            changed += 1
+            elif known:
+                # A full walk is authoritative: drop txs wallet-api no longer reports
+                gone = [(tx_id,) for tx_id in known if tx_id not in seen]
+                if gone:
+                    self.db.executemany("DELETE FROM txs WHERE tx_id = ?", gone)
+                    self.db.executemany("DELETE FROM tx_assets WHERE tx_id = ?", gone)
+                    self.db.executemany("DELETE FROM tx_contracts WHERE tx_id = ?", gone)
+                    changed += len(gone)
+
+            if wallet_api_owner(wallet) != owner:
+                # Another wallet (or a restarted instance) answered part of the walk
+                self.db.rollback()
+                raise RuntimeError(f"Wallet '{wallet}' changed during sync")
+            if changed:
+                self._rebuild_stats()
+            now = time.time()
+            if full:
+                self.last_full_sync = now
+                self._set_meta("last_full_sync", now)
+            self._set_meta("last_sync", now)
+            self.db.commit()
+            self.last_sync = now
+            self.sync_error = None
+            return changed
+
+    def query(self, asset=None, status=None, counterparty=None, cid=None,
+              time_from=None, time_to=None, cursor=None, limit=50):
+        """Return one page of transactions, newest first, plus the next cursor"""
+        where, args = [], []
+        if asset is not None:
+            where.append("tx_id IN (SELECT tx_id FROM tx_assets WHERE asset_id = ?)")
+            args.append(int(asset))
+        if status:
+            where.append(f"status IN ({','.join('?' * len(status))})")
+            args.extend(int(s) for s in status)
+        if counterparty:
+            where.append("(sender = ? OR receiver = ?)")
+            args.extend([counterparty, counterparty])
+        if cid:
+            where.append("tx_id IN (SELECT tx_id FROM tx_contracts WHERE cid = ?)")
+            args.append(cid)
+        if time_from is not None:
+            where.append("create_time >= ?")
+            args.append(int(time_from))
+        if time_to is not None:
+            where.append("create_time <= ?")
+            args.append(int(time_to))
+        if cursor:
+            ts, _, tx_id = cursor.partition(":")
+            where.append("(create_time < ? OR (create_time = ? AND tx_id < ?))")
+            args.extend([int(ts), int(ts), tx_id])
+        limit = max(1, min(int(limit), TX_INDEX_MAX_LIMIT))
+        sql = "SELECT tx_id, create_time, raw FROM txs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY create_time DESC, tx_id DESC LIMIT ?"
+        args.append(limit + 1)
+
+        with self.lock:
+            rows = self.db.execute(sql, args).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['create_time']}:{rows[-1]['tx_id']}"
+        return [json.loads(r["raw"]) for r in rows], next_cursor
+
+    def last_synced_at(self):
+        """Time of the last sync, including ones from earlier server runs"""
+        with self.lock:
+            return float(self._get_meta("last_sync") or 0)
+
+    def aggregates(self):
+        with self.lock:
+            rows = self.db.execute("SELECT * FROM asset_stats ORDER BY asset_id").fetchall()
+        return {str(r["asset_id"]): {k: r[k] for k in r.keys() if k != "asset_id"} for r in rows}
+
+
+tx_indexes = {}
+tx_indexes_lock = threading.Lock()
+
+
+def get_tx_index(wallet_name):
+    """Return the open TxIndex for a wallet, creating it on first use"""
+    with tx_indexes_lock:
+        index = tx_indexes.get(wallet_name)
+        if index is None:
+            index = TxIndex(wallet_name)
+            tx_indexes[wallet_name] = index
+        return index
+
+
+def close_tx_index(wallet_name):
+    with tx_indexes_lock:
+        index = tx_indexes.pop(wallet_name, None)
+    if index:
+        index.close()
+
+
+tx_index_sync_started = threading.Event()
+
+
+def tx_index_sync_loop():
+    """Background worker keeping queried tx indexes of open wallets up to date"""
+    while True:
+        time.sleep(TX_INDEX_SYNC_INTERVAL)
+        with tx_indexes_lock:
+            indexes = list(tx_indexes.values())
+        for index in indexes:
+            if wallet_api_owner(index.wallet_name) is None:
+                continue
+            try:
+                changed = index.sync()
+                if changed:
+                    print(f"[tx_index] {index.wallet_name}: {changed} transaction(s) updated")
+            except Exception as e:
+                index.sync_error = str(e)
+
+
+def ensure_tx_index_sync():
+    """Start the background sync on the first /api/tx query"""
+    with tx_indexes_lock:
+        if tx_index_sync_started.is_set():
+            return
+        tx_index_sync_started.set()
+    threading.Thread(target=tx_index_sync_loop, daemon=True).start()
+
+
+# ============================================
+# UTXO INDEX
+# ============================================
+# Full UTXO set of a wallet, paged out of get_utxo (from the wallet-api
+# serving that wallet) once per new block, with per-asset statistics
+# maintained by applying coin deltas. Only wallets that /api/utxo was asked
+# about are kept in sync, and only while unlocked: the coins of a wallet
+# that closed are dropped on the next sync pass.
+
+UTXO_INDEX_PAGE_SIZE = 1000
+UTXO_INDEX_SYNC_INTERVAL = 20  # seconds between height checks
+UTXO_INDEX_MAX_LIMIT = 1000
+UTXO_STATUS_AVAILABLE = 1
+# Upper bounds (groth, exclusive) of the coin size histogram buckets
+UTXO_SIZE_BUCKETS = [
+    (100000, "<0.001"),
+    (1000000, "0.001-0.01"),
+    (10000000, "0.01-0.1"),
+    (100000000, "0.1-1"),
+    (1000000000, "1-10"),
+    (10000000000, "10-100"),
+    (100000000000, "100-1000"),
+    (None, ">=1000"),
+]
+# Blocks until maturity (one block per minute)
+UTXO_MATURITY_BUCKETS = [(0, "mature"), (60, "<1h"), (1440, "<1d"), (None, ">1d")]
+
+
+def _bucket_label(value, buckets):
+    for bound, label in buckets:
+        if bound is None or value < bound or (bound == 0 and value <= 0):
+            return label
+    return buckets[-1][1]
+
+
+class UtxoIndex:
+    """In-memory UTXO set for one wallet with precomputed per-asset analysis"""
+
+    def __init__(self, wallet_name):
+        self.wallet_name = wallet_name
+        self.lock = threading.RLock()
+        self.coins = {}       # coin id -> utxo dict
+        self.by_asset = {}    # asset id -> list of coin ids, largest first
+        self.stats = {}       # asset id -> counters and size histogram
+        self.maturity = {}    # asset id -> maturity bucket counts
+        self.height = 0
+        self.last_sync = 0
+        self.sync_error = None
+
+    @staticmethod
+    def _coin_key(utxo):
+        return utxo.get("id") or f"{utxo.get('asset_id', 0)}:{utxo.get('amount')}:{utxo.get('createTxId')}"
+
+    @staticmethod
+    def _fingerprint(utxo):
+        return (utxo.get("asset_id", 0), utxo.get("amount", 0), utxo.get("status"),
+                utxo.get("maturity", 0), utxo.get("spentTxId"))
+
+    def _account(self, utxo, sign):
+        """Add (sign=1) or remove (sign=-1) one coin's contribution to its asset stats"""
+        asset = int(utxo.get("asset_id") or 0)
+        amount = int(utxo.get("amount") or 0)
+        status = utxo.get("status")
+        stats = self.stats.setdefault(asset, {
+            "count": 0, "amount": 0, "available_count": 0, "available_amount": 0,
+            "by_status": {}, "size_histogram": {}
+        })
+        stats["count"] += sign
+        stats["amount"] += sign * amount
+        key = str(status)
+        stats["by_status"][key] = stats["by_status"].get(key, 0) + sign
+        if status == UTXO_STATUS_AVAILABLE:
+            stats["available_count"] += sign
+            stats["available_amount"] += sign * amount
+            label = _bucket_label(amount, UTXO_SIZE_BUCKETS)
+            stats["size_histogram"][label] = stats["size_histogram"].get(label, 0) + sign
+        if stats["count"] == 0:
+            del self.stats[asset]
+        return asset
+
+    def _refresh_asset(self, asset, ids):
+        """Re-sort one asset's coins and recompute what cannot be kept as a delta"""
+        if not ids:
+            self.by_asset.pop(asset, None)
+            return
+        ids.sort(key=lambda cid: self.coins[cid].get("amount", 0), reverse=True)
+        self.by_asset[asset] = ids
+        stats = self.stats.get(asset)
+        if stats is not None:
+            available = [self.coins[cid]["amount"] for cid in ids
+                         if self.coins[cid].get("status") == UTXO_STATUS_AVAILABLE]
+            stats["largest_available"] = available[0] if available else 0
+            stats["size_histogram"] = {k: v for k, v in stats["size_histogram"].items() if v}
+            stats["by_status"] = {k: v for k, v in stats["by_status"].items() if v}
+
+    def _refresh_maturity(self):
+        maturity = {}
+        for utxo in self.coins.values():
+            if utxo.get("status") != UTXO_STATUS_AVAILABLE and utxo.get("status") != 2:
+                continue  # only available and maturing coins
+            asset = int(utxo.get("asset_id") or 0)
+            blocks_left = int(utxo.get("maturity") or 0) - self.height
+            label = _bucket_label(blocks_left, UTXO_MATURITY_BUCKETS)
+            buckets = maturity.setdefault(asset, {})
+            buckets[label] = buckets.get(label, 0) + 1
+        self.maturity = maturity
+
+    def sync(self, force=False):
+        """Reload the UTXO set if the chain height moved; apply only the differences"""
+        wallet = self.wallet_name
+        owner = wallet_api_owner(wallet)
+        if owner is None:
+            raise RuntimeError(f"Wallet '{wallet}' is not open")
+        status = call_wallet_api("wallet_status", priority=UPSTREAM_PRIORITY_BACKGROUND, wallet=wallet) or {}
+        height = int(status.get("current_height") or 0)
+        with self.lock:
+            if not force and self.last_sync and height == self.height:
+                return 0
+
+            fresh = {}
+            skip = 0
+            while True:
+                batch = call_wallet_api("get_utxo", {"skip": skip, "count": UTXO_INDEX_PAGE_SIZE},
+                                        priority=UPSTREAM_PRIORITY_BACKGROUND, wallet=wallet) or []
+                for utxo in batch:
+                    if isinstance(utxo, dict):
+                        fresh[self._coin_key(utxo)] = utxo
+                if len(batch) < UTXO_INDEX_PAGE_SIZE:
+                    break
+                skip += UTXO_INDEX_PAGE_SIZE
+            if wallet_api_owner(wallet) != owner:
+                # Another wallet (or a restarted instance) answered part of the walk
+                raise RuntimeError(f"Wallet '{wallet}' changed during sync")
+
+            touched = set()
+            for key in list(self.coins):
+                old = self.coins[key]
+                new = fresh.get(key)
+                if new is None or self._fingerprint(new) != self._fingerprint(old):
+                    touched.add(self._account(old, -1))
+                    del self.coins[key]
+            for key, utxo in fresh.items():
+                if key not in self.coins:
+                    touched.add(self._account(utxo, 1))
+                    self.coins[key] = utxo
+            if touched:
+                grouped = {asset: [] for asset in touched}
+                for key, utxo in self.coins.items():
+                    ids = grouped.get(int(utxo.get("asset_id") or 0))
+                    if ids is not None:
+                        ids.append(key)
+                for asset, ids in grouped.items():
+                    self._refresh_asset(asset, ids)
+
+            self.height = height
+            self._refresh_maturity()
+            self.last_sync = time.time()
+            self.sync_error = None
+            return len(touched)
+
+    def query(self, asset=None, status=None, offset=0, limit=100):
+        """One page of coins, largest first, optionally for a single asset"""
+        offset = max(0, int(offset))
+        limit = max(1, min(int(limit), UTXO_INDEX_MAX_LIMIT))
+        with self.lock:
+            if asset is not None:
+                ids = self.by_asset.get(int(asset), [])
+            else:
+                ids = [cid for a in sorted(self.by_asset) for cid in self.by_asset[a]]
+            if status is not None:
+                ids = [cid for cid in ids if self.coins[cid].get("status") in status]
+            return [self.coins[cid] for cid in ids[offset:offset + limit]], len(ids)
+
+    def analysis(self):
+        with self.lock:
+            return {
+                str(asset): dict(stats, maturity=self.maturity.get(asset, {}))
+                for asset, stats in sorted(self.stats.items())
+            }
+
+
+utxo_indexes = {}
+utxo_indexes_lock = threading.Lock()
+
+
+def get_utxo_index(wallet_name):
+    """Return the UtxoIndex for a wallet, creating it on first use"""
+    with utxo_indexes_lock:
+        index = utxo_indexes.get(wallet_name)
+        if index is None:
+            index = UtxoIndex(wallet_name)
+            utxo_indexes[wallet_name] = index
+        return index
+
+
+utxo_index_sync_started = threading.Event()
+
+
+def utxo_index_sync_loop():
+    """Background worker refreshing queried UTXO indexes of open wallets on new blocks"""
+    while True:
+        time.sleep(UTXO_INDEX_SYNC_INTERVAL)
+        with utxo_indexes_lock:
+            indexes = list(utxo_indexes.values())
+        for index in indexes:
+            if wallet_api_owner(index.wallet_name) is None:
+                with utxo_indexes_lock:
+                    if utxo_indexes.get(index.wallet_name) is index:
+                        del utxo_indexes[index.wallet_name]
+                continue
+            try:
+                index.sync()
+            except Exception as e:
+                index.sync_error = str(e)
+
+
+def ensure_utxo_index_sync():
+    """Start the background sync on the first /api/utxo query"""
+    with utxo_indexes_lock:
+        if utxo_index_sync_started.is_set():
+            return
+        utxo_index_sync_started.set()
+    threading.Thread(target=utxo_index_sync_loop, daemon=True).start()
+
+
+# ============================================
+# ASSET CATALOGUE
+# ============================================
+# Parsed assets_list metadata keyed by asset id, merged with
+# config/assets.json, persisted under DATA_DIR and served from /api/assets.
+
+ASSET_CATALOG_FILE = DATA_DIR / "asset_catalog.json"
+ASSET_CONFIG_FILE = BASE_DIR / "config" / "assets.json"
+ASSET_CATALOG_REFRESH_INTERVAL = 30  # seconds between height checks
+ASSET_ICON_KEYS = ("OPT_ICON_URL", "OPT_LOGO_URL", "OPT_FAVICON_URL", "ICON")
+
+
+def parse_asset_metadata(meta_str):
+    """Parse a 'STD:SCH_VER=1;N=Name;UN=SYM;...' metadata string into a dict"""
+    result = {}
+    if not meta_str or not isinstance(meta_str, str):
+        return result
+    if meta_str.startswith("STD:"):
+        meta_str = meta_str[4:]
+    for pair in meta_str.split(";"):
+        key, sep, value = pair.partition("=")
+        if key.strip() and sep:
+            result[key.strip()] = value.strip()
+    return result
+
+
+class AssetCatalog:
+    """Asset metadata catalogue refreshed only when the chain moves"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.assets = {}     # asset id -> catalogue entry
+        self.raw_meta = {}   # asset id -> raw metadata string last parsed
+        self.config = {}
+        self.height = 0
+        self.count = 0
+        self.etag = None
+        self.payload = b"{}"
+        self.last_check = 0
+        self.sync_error = None
+        self._load()
+
+    def _load(self):
+        try:
+            if ASSET_CONFIG_FILE.exists():
+                self.config = {int(k): v for k, v in json.loads(ASSET_CONFIG_FILE.read_text()).items()}
+        except Exception as e:
+            print(f"Warning: Could not load {ASSET_CONFIG_FILE}: {e}")
+        try:
+            if ASSET_CATALOG_FILE.exists():
+                saved = json.loads(ASSET_CATALOG_FILE.read_text())
+                self.height = saved.get("height", 0)
+                self.raw_meta = {int(k): v for k, v in saved.get("raw_meta", {}).items()}
+                self.assets = {int(k): v for k, v in saved.get("assets", {}).items()}
+                self.count = len(self.assets)
+        except Exception as e:
+            print(f"Warning: Could not load asset catalogue: {e}")
+        # Configured assets are served even before the first refresh
+        for aid in self.config:
+            if aid not in self.assets:
+                self.assets[aid] = self._entry(aid, {})
+        self._publish()
+
+    def _entry(self, aid, asset):
+        raw = asset.get("metadata")
+        meta = asset.get("metadata_pairs") or (raw if isinstance(raw, dict) else parse_asset_metadata(raw))
+        name = meta.get("N") or f"Asset #{aid}"
+        default_symbol = name.split(" ")[0][:10] if meta.get("N") else f"CA{aid}"
+        entry = {
+            "asset_id": aid,
+            "metadata": meta,
+            "metadata_pairs": meta,
+            "emission": asset.get("emission", 0),
+            "lockHeight": asset.get("lockHeight"),
+            "name": name,
+            "symbol": meta.get("UN") or meta.get("SN") or default_symbol,
+            "decimals": 8,
+            "icon": next((meta[k] for k in ASSET_ICON_KEYS if meta.get(k)), None),
+            "verified": False,
+        }
+        # config/assets.json wins for display fields
+        entry.update(self.config.get(aid, {}))
+        entry["asset_id"] = aid
+        return entry
+
+    def _publish(self):
+        """Serialize once per change so requests only copy bytes"""
+        body = {str(aid): self.assets[aid] for aid in sorted(self.assets)}
+        self.payload = json.dumps({"height": self.height, "assets": body}).encode()
+        self.etag = '"' + hashlib.sha1(self.payload).hexdigest()[:20] + '"'
+
+    def _save(self):
+        tmp = ASSET_CATALOG_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "height": self.height,
+            "raw_meta": {str(k): v for k, v in self.raw_meta.items()},
+            "assets": {str(k): v for k, v in self.assets.items()},
+        }))
+        tmp.replace(ASSET_CATALOG_FILE)
+
+    def refresh(self, force=False):
+        """Re-read assets_list if the height moved; re-parse only changed entries"""
+        status = call_wallet_api("wallet_status", priority=UPSTREAM_PRIORITY_BACKGROUND) or {}
+        height = int(status.get("current_height") or 0)
+        self.last_check = time.time()
+        if not force and height == self.height and self.raw_meta:
+            return 0
+
+        response = call_wallet_api("assets_list", {"refresh": True},
+                                   priority=UPSTREAM_PRIORITY_BACKGROUND) or {}
+        assets = response.get("assets", []) if isinstance(response, dict) else response
+        with self.lock:
+            changed = 0
+            for asset in assets:
+                aid = asset.get("asset_id")
+                if aid is None:
+                    continue
+                raw = json.dumps([asset.get("metadata"), asset.get("emission"), asset.get("lockHeight")])
+                if self.raw_meta.get(aid) == raw:
+                    continue
+                self.raw_meta[aid] = raw
+                self.assets[aid] = self._entry(aid, asset)
+                changed += 1
+            self.height = height
+            if changed or len(assets) != self.count:
+                self.count = len(assets)
+                self._publish()
+                self._save()
+            self.sync_error = None
+            return changed
+
+    def get(self, aid):
+        return self.assets.get(int(aid))
+
+
+asset_catalog = AssetCatalog()
+
+
+def asset_catalog_refresh_loop():
+    """Background worker keeping the asset catalogue current"""
+    while True:
+        if get_active_wallet_name():
+            try:
+                changed = asset_catalog.refresh()
+                if changed:
+                    print(f"[assets] {changed} asset(s) updated at height {asset_catalog.height}")
+            except Exception as e:
+                asset_catalog.sync_error = str(e)
+        time.sleep(ASSET_CATALOG_REFRESH_INTERVAL)
+
+
+# ============================================
+# DEX POOL SNAPSHOT AND QUOTING
+# ============================================
+# pools_view is executed once per new block; quotes and routes are then
+# computed in memory from the snapshot instead of invoking the AMM shader.
+
+DEX_POOLS_REFRESH_INTERVAL = 15  # seconds between height checks
+DEX_QUOTE_DEFAULT_HOPS = 3
+DEX_QUOTE_MAX_HOPS = 4
+DEX_QUOTE_MAX_EXPANSIONS = 5000  # pool hops evaluated per quote, whatever the graph size
+# Trade fee by pool kind (matches the quote logic in the frontend)
+DEX_POOL_FEES = {0: 0.003, 1: 0.0005, 2: 0.01}
+
+
+def dex_pool_fee(kind):
+    return DEX_POOL_FEES.get(kind, DEX_POOL_FEES[2])
+
+
+def dex_amount_out(amount_in, reserve_in, reserve_out, fee):
+    """Constant-product output for one pool, in groth"""
+    if amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0:
+        return 0
+    amount_in_with_fee = amount_in * (1 - fee)
+    return int((amount_in_with_fee * reserve_out) // (reserve_in + amount_in_with_fee))
+
+
+class DexPoolCache:
+    """Latest pools_view snapshot indexed by asset pair"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pools = []      # pools with liquidity on both sides
+        self.by_pair = {}    # (low aid, high aid) -> [pool, ...]
+        self.neighbors = {}  # aid -> {other aid, ...}
+        self.height = 0
+        self.last_refresh = 0
+        self.sync_error = None
+        self.listeners = []  # callables(pools, height) run after each new snapshot
+
+    def refresh(self, force=False):
+        """Re-run pools_view if the chain height moved. Returns True on a new snapshot."""
+        status = call_wallet_api("wallet_status", priority=UPSTREAM_PRIORITY_BACKGROUND) or {}
+        height = int(status.get("current_height") or 0)
+        if not force and self.last_refresh and height == self.height:
+            return False
+
+        params = {"args": f"action=pools_view,cid={DEX_CONTRACT_ID}", "create_tx": False}
+        if DEX_SHADER:
+            params["contract"] = DEX_SHADER
+        result = call_wallet_api("invoke_contract", params, priority=UPSTREAM_PRIORITY_BACKGROUND) or {}
+        output = result.get("output", result) if isinstance(result, dict) else result
+        if isinstance(output, str):
+            output = json.loads(output)
+        all_pools = output.get("res", []) if isinstance(output, dict) else []
+
+        pools, by_pair, neighbors = [], {}, {}
+        for pool in all_pools:
+            if not (pool.get("tok1", 0) > 0 and pool.get("tok2", 0) > 0):
+                continue
+            aid1, aid2 = pool["aid1"], pool["aid2"]
+            pools.append(pool)
+            by_pair.setdefault((min(aid1, aid2), max(aid1, aid2)), []).append(pool)
+            neighbors.setdefault(aid1, set()).add(aid2)
+            neighbors.setdefault(aid2, set()).add(aid1)
+
+        with self.lock:
+            self.pools, self.by_pair, self.neighbors = pools, by_pair, neighbors
+            self.height = height
+            self.last_refresh = time.time()
+            self.sync_error = None
+        for listener in self.listeners:
+            try:
+                listener(pools, height)
+            except Exception as e:
+                print(f"[dex] Snapshot listener failed: {e}")
+        return True
+
+    def ensure_fresh(self):
+        if not self.last_refresh:
+            self.refresh()
+
+    def _best_hop(self, pair_pools, aid_in, amount_in):
+        """Best pool of a pair for this input amount -> (amount_out, hop)"""
+        best = (0, None)
+        for pool in pair_pools:
+            forward = pool["aid1"] == aid_in
+            reserve_in = pool["tok1"] if forward else pool["tok2"]
+            reserve_out = pool["tok2"] if forward else pool["tok1"]
+            fee = dex_pool_fee(pool.get("kind"))
+            out = dex_amount_out(amount_in, reserve_in, reserve_out, fee)
+            if out > best[0]:
+                best = (out, {
+                    "aid_in": aid_in,
+                    "aid_out": pool["aid2"] if forward else pool["aid1"],
+                    "kind": pool.get("kind"),
+                    "amount_in": amount_in,
+                    "amount_out": out,
+                    "fee_rate": fee,
+                    "spot_rate": reserve_out / reserve_in,
+                })
+        return best
+
+    def quote(self, aid_from, aid_to, amount_in, max_hops=DEX_QUOTE_DEFAULT_HOPS, alternatives=3):
+        """Best route from aid_from to aid_to over at most max_hops pools.
+
+        Searched hop by hop: a partial route is dropped when an earlier or
+        parallel one already reached the same asset with at least as much,
+        so each hop keeps at most one route per asset. Every route into
+        aid_to is a candidate; alternatives are the runners-up among them.
+        At most DEX_QUOTE_MAX_EXPANSIONS pool hops are evaluated.
+        """
+        max_hops = max(1, min(int(max_hops), DEX_QUOTE_MAX_HOPS))
+        with self.lock:
+            by_pair, neighbors = self.by_pair, self.neighbors
+        routes = []
+
+        if aid_from != aid_to and amount_in > 0:
+            best_at = {aid_from: amount_in}  # asset -> most reached so far
+            frontier = {aid_from: (amount_in, [], {aid_from})}
+            expansions = 0
+            for _ in range(max_hops):
+                reached = {}
+                for aid, (amount, path, visited) in frontier.items():
+                    for nxt in neighbors.get(aid, ()):
+                        if nxt in visited or expansions >= DEX_QUOTE_MAX_EXPANSIONS:
+                            continue
+                        expansions += 1
+                        out, hop = self._best_hop(by_pair[(min(aid, nxt), max(aid, nxt))], aid, amount)
+                        if not out:
+                            continue
+                        if nxt == aid_to:
+                            routes.append((out, path + [hop]))
+                        elif out > best_at.get(nxt, 0):
+                            best_at[nxt] = out
+                            reached[nxt] = (out, path + [hop], visited | {nxt})
+                frontier = reached
+                if not frontier:
+                    break
+        routes.sort(key=lambda r: r[0], reverse=True)
+
+        def describe(amount_out, path):
+            ideal = float(amount_in)
+            for hop in path:
+                ideal *= hop["spot_rate"] * (1 - hop["fee_rate"])
+            return {
+                "amount_out": amount_out,
+                "hops": len(path),
+                "route": path,
+                "price_impact": round(1 - amount_out / ideal, 6) if ideal else None,
+            }
+
+        best = describe(*routes[0]) if routes else None
+        return {
+            "from": aid_from,
+            "to": aid_to,
+            "amount_in": amount_in,
+            "amount_out": best["amount_out"] if best else 0,
+            "best": best,
+            "alternatives": [describe(*r) for r in routes[1:1 + alternatives]],
+            "height": self.height,
+        }
+
+
+# Price-impact curves over the pool snapshot
+DEX_IMPACT_MAX_POINTS = 256
+DEX_IMPACT_DEFAULT_POINTS = 32
+
+
+def dex_impact_sizes(sizes=None, size_min=None, size_max=None, points=DEX_IMPACT_DEFAULT_POINTS):
+    """Input-size vector: explicit sizes, or log-spaced points between min and max (groth)"""
+    if sizes:
+        return [float(v) for v in sorted({int(s) for s in sizes if int(s) > 0})[:DEX_IMPACT_MAX_POINTS]]
+    size_min, size_max = int(size_min), int(size_max)
+    points = max(2, min(int(points), DEX_IMPACT_MAX_POINTS))
+    if size_min <= 0 or size_max <= size_min:
+        raise ValueError("need 0 < min < max")
+    ratio = (size_max / size_min) ** (1 / (points - 1))
+    return [float(round(size_min * ratio ** i)) for i in range(points)]
+
+
+def dex_impact_curves(pools, sizes, aid_filter=None):
+    """Output, effective price and slippage for every pool and direction.
+
+    Plain Python loops (serve.py is stdlib-only, there is no vector math):
+    the fee-scaled size grid and the reciprocal sizes are computed once per
+    fee class and reused by every pool and both directions, so each curve
+    costs one multiply-divide per point plus two multiplies.
+    """
+    inverse_sizes = [1 / s for s in sizes]
+    scaled_by_fee = {}
+    curves = []
+    for pool in pools:
+        fee = dex_pool_fee(pool.get("kind"))
+        scaled = scaled_by_fee.get(fee)
+        if scaled is None:
+            keep = 1 - fee
+            scaled = scaled_by_fee[fee] = [s * keep for s in sizes]
+        for forward in (True, False):
+            aid_in = pool["aid1"] if forward else pool["aid2"]
+            aid_out = pool["aid2"] if forward else pool["aid1"]
+            if aid_filter and (aid_in, aid_out) != aid_filter:
+                continue
+            reserve_in = float(pool["tok1"] if forward else pool["tok2"])
+            reserve_out = float(pool["tok2"] if forward else pool["tok1"])
+            spot = reserve_out / reserve_in
+            inverse_spot = reserve_in / reserve_out
+            amount_out = [int(v * reserve_out // (reserve_in + v)) for v in scaled]
+            effective = [out * inv for out, inv in zip(amount_out, inverse_sizes)]
+            curves.append({
+                "aid_in": aid_in,
+                "aid_out": aid_out,
+                "kind": pool.get("kind"),
+                "fee_rate": fee,
+                "reserve_in": int(reserve_in),
+                "reserve_out": int(reserve_out),
+                "spot_price": spot,
+                "amount_out": amount_out,
+                "effective_price": [round(p, 12) for p in effective],
+                "slippage": [round(1 - p * inverse_spot, 8) for p in effective],
+            })
+    return curves
+
+
+dex_pool_cache = DexPoolCache()
+
+
+# ============================================
+# DEX POOL HISTORY RECORDER
+# ============================================
+# One fixed-width binary file per pool under DATA_DIR/dex_history, with a
+# record appended for every new block seen by the pool snapshot cache.
+
+DEX_HISTORY_DIR = DATA_DIR / "dex_history"
+# height, unix time, tok1, tok2, ctl (LP supply) - 32 bytes per sample
+DEX_HISTORY_RECORD = struct.Struct("<IIQQQ")
+DEX_HISTORY_BUCKETS = {"1h": 3600, "1d": 86400}
+DEX_HISTORY_MAX_BUCKETS = 2000
+SECONDS_PER_YEAR = 365 * 86400
+
+
+class PoolHistoryRecorder:
+    """Appends pool reserve samples and answers downsampled range queries"""
+
+    def __init__(self, directory=DEX_HISTORY_DIR):
+        self.dir = directory
+        self.lock = threading.Lock()
+        self.last = {}  # pool file name -> (height, time) of the last record
+
+    @staticmethod
+    def pool_name(aid1, aid2, kind):
+        return f"{int(aid1)}_{int(aid2)}_{int(kind)}.bin"
+
+    def _tail(self, path):
+        """(height, time) of the last record in path, (0, 0) when empty.
+
+        A record torn by a crash mid-append is cut off first, so the next
+        append starts on a record boundary.
+        """
+        if not path.exists():
+            return 0, 0
+        rec = DEX_HISTORY_RECORD
+        with open(path, "r+b") as f:
+            size = f.seek(0, os.SEEK_END)
+            whole = size - size % rec.size
+            if whole != size:
+                print(f"[dex_history] {path.name}: dropping {size - whole} byte(s) of a torn record")
+                f.truncate(whole)
+            if not whole:
+                return 0, 0
+            f.seek(whole - rec.size)
+            return rec.unpack(f.read(rec.size))[:2]
+
+    def record(self, pools, height):
+        """Snapshot listener: append one sample per pool for a new height"""
+        now = int(time.time())
+        with self.lock:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            for pool in pools:
+                name = self.pool_name(pool["aid1"], pool["aid2"], pool.get("kind", 0))
+                path = self.dir / name
+                if name not in self.last:
+                    self.last[name] = self._tail(path)
+                last_height, last_time = self.last[name]
+                if height <= last_height:
+                    continue
+                # The query binary-searches the time column: never let a clock
+                # step backwards make it decrease
+                ts = max(now, last_time)
+                with open(path, "ab") as f:
+                    f.write(DEX_HISTORY_RECORD.pack(
+                        height, ts, int(pool["tok1"]), int(pool["tok2"]), int(pool.get("ctl", 0))
+                    ))
+                self.last[name] = (height, ts)
+
+    def pools(self):
+        if not self.dir.exists():
+            return []
+        result = []
+        for path in sorted(self.dir.glob("*.bin")):
+            aid1, aid2, kind = (int(x) for x in path.stem.split("_"))
+            result.append({"aid1": aid1, "aid2": aid2, "kind": kind,
+                           "samples": path.stat().st_size // DEX_HISTORY_RECORD.size})
+        return result
+
+    def query(self, aid1, aid2, kind, time_from, time_to, bucket_seconds):
+        """Downsample samples in [time_from, time_to] into fixed time buckets.
+
+        Per bucket: price (aid2 per aid1) open/high/low/close, closing reserves
+        and LP supply, estimated volume in aid1 units (reserve movement while
+        LP supply is unchanged) and fee APR from the growth of sqrt(k) per LP token.
+        """
+        path = self.dir / self.pool_name(aid1, aid2, kind)
+        if not path.exists() or path.stat().st_size < DEX_HISTORY_RECORD.size:
+            return []
+        rec = DEX_HISTORY_RECORD
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            count = len(mm) // rec.size
+            time_at = lambda i: rec.unpack_from(mm, i * rec.size)[1]
+
+            # Binary search on the (monotonic) time column
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if time_at(mid) < time_from:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            start = max(0, lo - 1)  # one earlier sample to diff the first bucket against
+
+            buckets = []
+            current = None
+            prev = None
+            # unpack_from reads records in place; slicing mm would copy the range
+            for height, ts, tok1, tok2, ctl in (rec.unpack_from(mm, off)
+                                                for off in range(start * rec.size, count * rec.size, rec.size)):
+                if ts > time_to:
+                    break
+                if ts >= time_from:
+                    key = ts - ts % bucket_seconds
+                    price = tok2 / tok1 if tok1 else 0.0
+                    growth = math.sqrt(tok1 * tok2) / ctl if ctl else 0.0
+                    if current is None or current["time"] != key:
+                        if len(buckets) >= DEX_HISTORY_MAX_BUCKETS:
+                            break
+                        current = {"time": key, "open": price, "high": price, "low": price,
+                                   "volume_aid1_est": 0, "samples": 0,
+                                   "_growth_start": prev[5] if prev else growth,
+                                   "_time_start": prev[1] if prev else ts}
+                        buckets.append(current)
+                    current.update(close=price, height=height, tok1=tok1, tok2=tok2, ctl=ctl,
+                                   _growth_end=growth, _time_end=ts)
+                    current["high"] = max(current["high"], price)
+                    current["low"] = min(current["low"], price)
+                    current["samples"] += 1
+                    if prev and prev[4] == ctl:
+                        current["volume_aid1_est"] += abs(tok1 - prev[2])
+                    prev = (height, ts, tok1, tok2, ctl, growth)
+                else:
+                    prev = (height, ts, tok1, tok2, ctl,
+                            math.sqrt(tok1 * tok2) / ctl if ctl else 0.0)
+
+        for b in buckets:
+            g0, g1 = b.pop("_growth_start"), b.pop("_growth_end")
+            t0, t1 = b.pop("_time_start"), b.pop("_time_end")
+            b["fee_apr"] = round((g1 / g0 - 1) * SECONDS_PER_YEAR / (t1 - t0), 6) if g0 and t1 > t0 else None
+        return buckets
+
+
+pool_history = PoolHistoryRecorder()
+dex_pool_cache.listeners.append(pool_history.record)
+
+
+def dex_pool_refresh_loop():
+    """Background worker re-reading pools_view once per new block"""
+    while True:
+        if get_active_wallet_name():
+            try:
+                dex_pool_cache.refresh()
+            except Exception as e:
+                dex_pool_cache.sync_error = str(e)
+        time.sleep(DEX_POOLS_REFRESH_INTERVAL)
+
+
+# ============================================
+# EXPLORER API GATEWAY
+# ============================================
+# /api/explorer/* is forwarded to the healthiest configured explorer backend,
+# hedged to the next one when the first is slow, and cached: finalized
+# blocks and kernel lookups never change, the chain tip expires quickly.
+
+NODES_CONFIG_FILE = BASE_DIR / "config" / "nodes.json"
+DEFAULT_EXPLORER_API = "https://explorer.0xmx.net/api"
+
+
+def load_explorer_backends():
+    """Explorer base URLs: BEAM_EXPLORER_BACKENDS (comma list) or config/nodes.json"""
+    override = os.environ.get("BEAM_EXPLORER_BACKENDS")
+    if override:
+        return [u.strip().rstrip("/") for u in override.split(",") if u.strip()]
+    try:
+        mainnet = json.loads(NODES_CONFIG_FILE.read_text())["mainnet"]
+        urls = [n["url"].rstrip("/") for n in mainnet.get("explorerNodes", []) if n.get("url")]
+        primary = mainnet.get("explorer", "").rstrip("/")
+        if primary and primary not in urls:
+            urls.insert(0, primary)
+        return urls or [DEFAULT_EXPLORER_API]
+    except Exception:
+        return [DEFAULT_EXPLORER_API]
+
+
+EXPLORER_REQUEST_TIMEOUT = 8     # per backend attempt
+EXPLORER_TOTAL_TIMEOUT = 15      # whole request across hedges and failovers
+EXPLORER_HEDGE_MIN = 0.3         # seconds before a hedge may start
+EXPLORER_HEDGE_MAX = 1.5
+EXPLORER_FAILURE_COOLDOWN = 30   # seconds a failed backend is ranked last
+EXPLORER_CACHE_MAX_ENTRIES = 2000
+EXPLORER_CACHE_MAX_BYTES = 32 * 1024 * 1024
+EXPLORER_TIP_TTL = 5             # /status and anything near the tip
+EXPLORER_DEFAULT_TTL = 15
+EXPLORER_FINALITY_DEPTH = 10     # blocks below the tip treated as final
+EXPLORER_NUMERIC_PARAMS = {"height", "hMax", "hMin", "n", "nMax", "count"}
+
+
+class ExplorerBackend:
+    """Health score for one explorer: latency and error rate EWMAs"""
+
+    def __init__(self, url):
+        self.url = url
+        self.lock = threading.Lock()  # hedged attempts record from worker threads
+        self.latency = 0.5   # seconds, EWMA
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_failure = 0
+        self.last_error = None
+
+    def score(self):
+        with self.lock:
+            penalty = 100 if time.time() - self.last_failure < EXPLORER_FAILURE_COOLDOWN else 0
+            return self.latency * (1 + 4 * self.error_rate) + penalty
+
+    def record(self, latency=None, error=None):
+        with self.lock:
+            self.requests += 1
+            if error is None:
+                self.latency = 0.7 * self.latency + 0.3 * latency
+                self.error_rate *= 0.8
+            else:
+                self.failures += 1
+                self.error_rate = 0.8 * self.error_rate + 0.2
+                self.last_failure = time.time()
+                self.last_error = str(error)
+
+    def status(self):
+        with self.lock:
+            return {
+                "url": self.url,
+                "latency_ms": round(self.latency * 1000, 1),
+                "error_rate": round(self.error_rate, 3),
+                "requests": self.requests,
+                "failures": self.failures,
+                "cooling_down": time.time() - self.last_failure < EXPLORER_FAILURE_COOLDOWN,
+                "last_error": self.last_error,
+            }
+
+
+class ExplorerGateway:
+    """Failover, hedging and LRU caching in front of the explorer backends"""
+
+    def __init__(self, urls):
+        self.backends = [ExplorerBackend(u) for u in urls]
+        self.lock = threading.Lock()
+        self.cache = collections.OrderedDict()  # path -> (status, body, expires_at or None)
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.tip_height = 0
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="explorer")
+
+    def ranked(self, preferred=None):
+        with self.lock:
+            backends = sorted(self.backends, key=lambda b: b.score())
+        if preferred:
+            preferred = preferred.rstrip("/")
+            for b in backends:
+                if b.url == preferred and b.score() < 100:
+                    backends.remove(b)
+                    backends.insert(0, b)
+                    break
+        return backends
+
+    def serves(self, preferred):
+        """Whether data from these backends stands in for the client's chosen explorer"""
+        return not preferred or preferred.rstrip("/") in {b.url for b in self.backends}
+
+    # ---- cache ----
+
+    @staticmethod
+    def validate(path):
+        """Reject numeric query parameters that are not numbers (ValueError)"""
+        from urllib.parse import urlparse, parse_qs
+        for name, values in parse_qs(urlparse(path).query).items():
+            if name in EXPLORER_NUMERIC_PARAMS and not all(v.lstrip("-").isdigit() for v in values):
+                raise ValueError(f"Invalid {name}: must be an integer")
+
+    def _ttl(self, path, body):
+        """None = immutable, otherwise seconds to keep the response"""
+        from urllib.parse import urlparse, parse_qs
+        parsed = urlparse(path)
+        query = parse_qs(parsed.query)
+        endpoint = parsed.path.rstrip("/")
+        if endpoint == "/status":
+            try:
+                self.tip_height = max(self.tip_height, int(json.loads(body).get("height", 0)))
+            except (ValueError, AttributeError):
+                pass
+            return EXPLORER_TIP_TTL
+        final = self.tip_height - EXPLORER_FINALITY_DEPTH
+        if endpoint == "/block":
+            if "kernel" in query or "hash" in query:
+                return None
+            height = query.get("height", [""])[0]
+            if height.isdigit() and self.tip_height and int(height) <= final:
+                return None
+            return EXPLORER_TIP_TTL
+        if endpoint == "/hdrs":
+            h_max = query.get("hMax", [None])[0]
+            if h_max and self.tip_height and h_max.isdigit() and int(h_max) <= final:
+                return None
+            return EXPLORER_TIP_TTL
+        return EXPLORER_DEFAULT_TTL
+
+    def _cache_get(self, path):
+        with self.lock:
+            entry = self.cache.get(path)
+            if entry is None:
+                return None
+            status, body, expires = entry
+            if expires is not None and expires < time.time():
+                del self.cache[path]
+                self.cache_bytes -= len(body)
+                return None
+            self.cache.move_to_end(path)
+            return status, body
+
+    def _cache_put(self, path, status, body, ttl):
+        with self.lock:
+            old = self.cache.pop(path, None)
+            if old:
+                self.cache_bytes -= len(old[1])
+            self.cache[path] = (status, body, None if ttl is None else time.time() + ttl)
+            self.cache_bytes += len(body)
+            while self.cache and (len(self.cache) > EXPLORER_CACHE_MAX_ENTRIES
+                                  or self.cache_bytes > EXPLORER_CACHE_MAX_BYTES):
+                _, evicted = self.cache.popitem(last=False)
+                self.cache_bytes -= len(evicted[1])
+
+    # ---- upstream ----
+
+    def _get(self, backend, path):
+        started = time.time()
+        req = urllib.request.Request(backend.url + path, headers={"User-Agent": "BEAM-LightWallet/1.0"})
+        try:
+            with urllib.request.urlopen(req, timeout=EXPLORER_REQUEST_TIMEOUT) as response:
+                body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            if e.code < 500:
+                # A definitive answer (e.g. not found): the backend itself is healthy
+                backend.record(latency=time.time() - started)
+                return e.code, e.read()
+            backend.record(error=e)
+            raise
+        except Exception as e:
+            backend.record(error=e)
+            raise
+        backend.record(latency=time.time() - started)
+        return status, body
+
+    def _hedge_delay(self, backend):
+        return min(EXPLORER_HEDGE_MAX, max(EXPLORER_HEDGE_MIN, 2 * backend.latency))
+
+    def fetch(self, path, preferred=None):
+        """Return (status, body, backend url or 'cache') for an explorer path+query.
+
+        Raises ValueError for malformed numeric parameters, before any backend is asked.
+        """
+        self.validate(path)
+        cached = self._cache_get(path)
+        if cached:
+            self.hits += 1
+            return cached[0], cached[1], "cache"
+        self.misses += 1
+
+        pending = self.ranked(preferred)
+        running = {}
+        errors = []
+        deadline = time.time() + EXPLORER_TOTAL_TIMEOUT
+
+        def launch():
+            backend = pending.pop(0)
+            running[self.executor.submit(self._get, backend, path)] = backend
+
+        launch()
+        while running and time.time() < deadline:
+            # Hedge: if the current attempt is slow, also ask the next backend
+            timeout = None
+            if pending:
+                timeout = self._hedge_delay(next(iter(running.values())))
+            done, _ = concurrent.futures.wait(
+                running, timeout=min(timeout or EXPLORER_TOTAL_TIMEOUT, max(0, deadline - time.time())),
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            if not done:
+                if pending:
+                    launch()
+                continue
+            for future in done:
+                backend = running.pop(future)
+                try:
+                    status, body = future.result()
+                except Exception as e:
+                    errors.append(f"{backend.url}: {e}")
+                    if pending:
+                        launch()
+                    continue
+                if status == 200:
+                    self._cache_put(path, status, body, self._ttl(path, body))
+                return status, body, backend.url
+        raise urllib.error.URLError("All explorer backends failed: " + "; ".join(errors or ["timeout"]))
+
+    def status(self):
+        with self.lock:
+            cache = {"entries": len(self.cache), "bytes": self.cache_bytes,
+                     "hits": self.hits, "misses": self.misses}
+        return {"backends": [b.status() for b in self.ranked()], "cache": cache,
+                "tip_height": self.tip_height}
+
+
+explorer_gateway = ExplorerGateway(load_explorer_backends())
+
+
+def fetch_explorer_json(path):
+    """GET a JSON document from the explorer through the gateway"""
+    status, body, _ = explorer_gateway.fetch(path)
+    if status != 200:
+        raise urllib.error.URLError(f"Explorer returned HTTP {status} for {path}")
+    return json.loads(body.decode())
+
+
+# ============================================
+# DEX ACTIVITY FEED
+# ============================================
+# One background fetcher pulls new DEX contract calls from the explorer and
+# keeps a bounded, de-duplicated history shared by every open tab.
+
+DEX_ACTIVITY_FILE = DATA_DIR / "dex_activity.json"
+DEX_ACTIVITY_MAX_ROWS = 2000
+DEX_ACTIVITY_BACKFILL = 200      # calls requested on the first fetch
+DEX_ACTIVITY_INCREMENTAL = 50    # calls per page on later polls
+DEX_ACTIVITY_MAX_PAGES = DEX_ACTIVITY_MAX_ROWS // DEX_ACTIVITY_INCREMENTAL
+DEX_ACTIVITY_POLL_INTERVAL = 30
+DEX_ACTIVITY_IDLE_TIMEOUT = 600  # stop polling when nobody asked for this long
+
+
+def _explorer_cell(cell):
+    return cell.get("value") if isinstance(cell, dict) and "value" in cell else cell
+
+
+class DexActivityFeed:
+    """Bounded newest-first ring of DEX contract call rows"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows = collections.deque(maxlen=DEX_ACTIVITY_MAX_ROWS)
+        self.keys = set()
+        self.last_height = 0
+        self.last_fetch = 0
+        self.last_request = 0
+        self.sync_error = None
+        self._load()
+
+    def _load(self):
+        try:
+            if DEX_ACTIVITY_FILE.exists():
+                saved = json.loads(DEX_ACTIVITY_FILE.read_text())
+                for row in saved.get("rows", [])[:DEX_ACTIVITY_MAX_ROWS]:
+                    self._remember(row, append=True)
+                self.last_height = saved.get("last_height", 0)
+        except Exception as e:
+            print(f"Warning: Could not load DEX activity: {e}")
+
+    def _save(self):
+        tmp = DEX_ACTIVITY_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"last_height": self.last_height, "rows": list(self.rows)}))
+        tmp.replace(DEX_ACTIVITY_FILE)
+
+    @staticmethod
+    def _key(row):
+        return hashlib.sha1(json.dumps(row, sort_keys=True).encode()).hexdigest()
+
+    def _remember(self, row, append=False):
+        key = self._key(row)
+        if key in self.keys:
+            return False
+        if append:
+            if len(self.rows) == self.rows.maxlen:
+                return False  # older than everything kept
+            self.rows.append(row)
+        else:
+            if len(self.rows) == self.rows.maxlen:
+                self.keys.discard(self._key(self.rows.pop()))
+            self.rows.appendleft(row)
+        self.keys.add(key)
+        return True
+
+    @staticmethod
+    def _flatten(calls_history):
+        """Rows of the explorer 'Calls history' table, header skipped, groups expanded"""
+        rows = []
+        for row in (calls_history or {}).get("value", [])[1:]:
+            if isinstance(row, dict) and row.get("type") == "group":
+                rows.extend(item for item in row.get("value", []) if isinstance(item, list))
+            elif isinstance(row, list):
+                rows.append(row)
+        return rows
+
+    def _fetch_page(self, path):
+        """(flattened rows, number of calls) of one explorer contract page"""
+        calls_history = fetch_explorer_json(path).get("Calls history")
+        return self._flatten(calls_history), len((calls_history or {}).get("value", [])[1:])
+
+    def fetch(self):
+        """Pull calls at or above the last seen height and merge the new ones.
+
+        The explorer returns the newest nMaxTxs calls of a height range, so
+        after a full page the next one ends at the oldest height seen; paging
+        stops at the first short page. Overlapping rows are deduplicated.
+        """
+        base = f"/contract?id={DEX_CONTRACT_ID}&state=0"
+        if self.last_height:
+            rows, h_max = [], None
+            for _ in range(DEX_ACTIVITY_MAX_PAGES):
+                path = f"{base}&nMaxTxs={DEX_ACTIVITY_INCREMENTAL}&hMin={self.last_height}"
+                if h_max is not None:
+                    path += f"&hMax={h_max}"
+                page, calls = self._fetch_page(path)
+                rows.extend(page)
+                if calls < DEX_ACTIVITY_INCREMENTAL or not page:
+                    break
+                oldest = min(int(_explorer_cell(r[0]) or 0) for r in page)
+                if oldest <= self.last_height or oldest == h_max:
+                    break  # reached hMin, or a single height fills a whole page
+                h_max = oldest
+        else:
+            rows, _ = self._fetch_page(f"{base}&nMaxTxs={DEX_ACTIVITY_BACKFILL}")
+
+        # Explorer lists newest first; insert oldest first so the ring stays ordered
+        rows.sort(key=lambda r: _explorer_cell(r[0]) or 0)
+        added = 0
+        with self.lock:
+            for row in rows:
+                if self._remember(row):
+                    added += 1
+                    self.last_height = max(self.last_height, int(_explorer_cell(row[0]) or 0))
+            self.last_fetch = time.time()
+            self.sync_error = None
+            if added:
+                self._save()
+        return added
+
+    def page(self, offset=0, limit=20):
+        with self.lock:
+            rows = list(self.rows)
+        offset = max(0, int(offset))
+        limit = max(1, min(int(limit), 200))
+        return rows[offset:offset + limit], len(rows)
+
+
+dex_activity_feed = DexActivityFeed()
+
+
+def dex_activity_poll_loop():
+    """Background worker polling the explorer while someone is watching the feed"""
+    while True:
+        if time.time() - dex_activity_feed.last_request < DEX_ACTIVITY_IDLE_TIMEOUT:
+            try:
+                added = dex_activity_feed.fetch()
+                if added:
+                    print(f"[dex_activity] {added} new DEX call(s)")
+            except Exception as e:
+                dex_activity_feed.sync_error = str(e)
+        time.sleep(DEX_ACTIVITY_POLL_INTERVAL)
+
+
+# ============================================
+# BLOCK STORE
+# ============================================
+# Finalized explorer blocks kept in SQLite: header rows for the block list,
+# full bodies and their kernels for detail pages. A background prefetcher
+# keeps the newest blocks warm while the explorer pages are in use; older
+# ranges are backfilled when someone pages into them.
+
+BLOCK_STORE_FILE = DATA_DIR / "blocks.db"
+BLOCK_HEADER_COLS = "HTkiofyzdDbp"   # every column the blocks table can show
+BLOCK_HDRS_BATCH = 100
+BLOCK_HEADERS_WARM = 5000
+BLOCK_BODIES_WARM = 500
+BLOCK_PREFETCH_HDRS_BUDGET = 20      # /hdrs requests per prefetch pass
+BLOCK_PREFETCH_BODY_BUDGET = 50      # /block requests per prefetch pass
+BLOCK_PREFETCH_PACE = 0.1            # seconds between body requests
+BLOCK_PREFETCH_INTERVAL = 30
+BLOCK_PREFETCH_IDLE_TIMEOUT = 600
+
+
+class BlockStore:
+    """SQLite cache of finalized blocks, indexed by height, hash and kernel"""
+
+    def __init__(self, path):
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS headers (
+                height INTEGER PRIMARY KEY,
+                row TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blocks (
+                height INTEGER PRIMARY KEY,
+                hash TEXT NOT NULL,
+                prev TEXT,
+                timestamp INTEGER,
+                body TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS blocks_hash ON blocks (hash);
+            CREATE TABLE IF NOT EXISTS kernels (
+                kernel_id TEXT PRIMARY KEY,
+                height INTEGER NOT NULL,
+                idx INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS kernels_height ON kernels (height);
+        """)
+        self.db.commit()
+        self.tip_height = 0
+        self.last_request = 0
+        self.last_prefetch = 0
+        self.sync_error = None
+        self.listeners = []  # called with (height, body) for every stored block
+
+    def final_height(self):
+        return self.tip_height - EXPLORER_FINALITY_DEPTH
+
+    def refresh_tip(self):
+        self.tip_height = int(fetch_explorer_json("/status").get("height", 0))
+        return self.tip_height
+
+    # ---- headers ----
+
+    def _fetch_headers(self, h_max, h_min):
+        """Header rows h_max..h_min from the explorer, newest first"""
+        headers = []
+        while h_max >= h_min:
+            n = min(BLOCK_HDRS_BATCH, h_max - h_min + 1)
+            table = fetch_explorer_json(f"/hdrs?nMax={n}&exp_am=1&cols={BLOCK_HEADER_COLS}&hMax={h_max}")
+            rows = table.get("value") or []
+            if len(rows) < 2:
+                break
+            names = [_explorer_cell(c) for c in rows[0]]
+            batch = [{name: _explorer_cell(cell) for name, cell in zip(names, row)} for row in rows[1:]]
+            headers.extend(h for h in batch if int(h.get("Height", 0)) >= h_min)
+            h_max = min(int(h.get("Height", 0)) for h in batch) - 1
+        return headers
+
+    def _store_headers(self, headers):
+        final = self.final_height()
+        rows = [(int(h["Height"]), json.dumps(h)) for h in headers if int(h["Height"]) <= final]
+        if rows:
+            with self.lock:
+                self.db.executemany("INSERT OR REPLACE INTO headers (height, row) VALUES (?, ?)", rows)
+                self.db.commit()
+
+    def _stored_heights(self, table, h_min, h_max):
+        with self.lock:
+            return {r[0] for r in self.db.execute(
+                f"SELECT height FROM {table} WHERE height BETWEEN ? AND ?", (h_min, h_max))}
+
+    def headers_range(self, h_max=None, n=50):
+        """Up to n header rows ending at h_max (default: tip), newest first"""
+        if not self.tip_height:
+            self.refresh_tip()
+        h_max = min(h_max or self.tip_height, self.tip_height)
+        h_min = max(1, h_max - n + 1)
+        final = self.final_height()
+        rows = {}
+
+        # Blocks near the tip can still be reorganised: always read them live
+        if h_max > final:
+            for h in self._fetch_headers(h_max, max(h_min, final + 1)):
+                rows[int(h["Height"])] = h
+
+        top = min(h_max, final)
+        if top >= h_min:
+            with self.lock:
+                stored = {r["height"]: json.loads(r["row"]) for r in self.db.execute(
+                    "SELECT height, row FROM headers WHERE height BETWEEN ? AND ?", (h_min, top))}
+            if len(stored) < top - h_min + 1:
+                fetched = self._fetch_headers(top, h_min)
+                self._store_headers(fetched)
+                stored.update((int(h["Height"]), h) for h in fetched)
+            rows.update(stored)
+
+        return [rows[h] for h in sorted(rows, reverse=True)]
+
+    # ---- bodies ----
+
+    def store_block(self, body):
+        """Persist a finalized block body and its kernels"""
+        height = int(body.get("height", 0))
+        if not height or height > self.final_height():
+            return False
+        kernels = [(k["id"], height, i) for i, k in enumerate(body.get("kernels") or []) if k.get("id")]
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO blocks (height, hash, prev, timestamp, body) VALUES (?, ?, ?, ?, ?)",
+                (height, body.get("hash", ""), body.get("prev"), body.get("timestamp"), json.dumps(body))
+            )
+            self.db.execute("DELETE FROM kernels WHERE height = ?", (height,))
+            self.db.executemany("INSERT OR REPLACE INTO kernels (kernel_id, height, idx) VALUES (?, ?, ?)", kernels)
+            self.db.commit()
+        for listener in self.listeners:
+            try:
+                listener(height, body)
+            except Exception as e:
+                print(f"Warning: block store listener failed: {e}")
+        return True
+
+    def stored_block(self, height=None, block_hash=None, kernel_id=None):
+        with self.lock:
+            if kernel_id:
+                row = self.db.execute(
+                    "SELECT b.body FROM kernels k JOIN blocks b ON b.height = k.height WHERE k.kernel_id = ?",
+                    (kernel_id,)).fetchone()
+            elif block_hash:
+                row = self.db.execute("SELECT body FROM blocks WHERE hash = ?", (block_hash,)).fetchone()
+            else:
+                row = self.db.execute("SELECT body FROM blocks WHERE height = ?", (height,)).fetchone()
+        return json.loads(row["body"]) if row else None
+
+    def get_block(self, height=None, block_hash=None, kernel_id=None):
+        """Block body from the store, fetched from the explorer (and kept) on a miss"""
+        body = self.stored_block(height, block_hash, kernel_id)
+        if body:
+            return body
+        if kernel_id:
+            path = f"/block?kernel={kernel_id}"
+        elif block_hash:
+            path = f"/block?hash={block_hash}"
+        else:
+            path = f"/block?height={height}"
+        body = fetch_explorer_json(path)
+        if body and body.get("found"):
+            if not self.tip_height:
+                self.refresh_tip()
+            self.store_block(body)
+        return body
+
+    # ---- prefetch ----
+
+    def prefetch(self):
+        """Fill gaps in the warm window, a bounded number of requests per pass"""
+        self.refresh_tip()
+        final = self.final_height()
+        if final < 1:
+            return 0
+
+        low = max(1, final - BLOCK_HEADERS_WARM + 1)
+        have = self._stored_heights("headers", low, final)
+        budget = BLOCK_PREFETCH_HDRS_BUDGET
+        h = final
+        while h >= low and budget > 0:
+            if h in have:
+                h -= 1
+                continue
+            run_end = h
+            while h >= low and h not in have and run_end - h < BLOCK_HDRS_BATCH:
+                h -= 1
+            self._store_headers(self._fetch_headers(run_end, h + 1))
+            budget -= 1
+
+        stored = 0
+        low = max(1, final - BLOCK_BODIES_WARM + 1)
+        have = self._stored_heights("blocks", low, final)
+        for height in range(final, low - 1, -1):
+            if stored >= BLOCK_PREFETCH_BODY_BUDGET:
+                break
+            if height in have:
+                continue
+            body = fetch_explorer_json(f"/block?height={height}")
+            if body and body.get("found") and self.store_block(body):
+                stored += 1
+            time.sleep(BLOCK_PREFETCH_PACE)
+
+        self.last_prefetch = time.time()
+        self.sync_error = None
+        return stored
+
+    def status(self):
+        with self.lock:
+            counts = {t: self.db.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+                      for t in ("headers", "blocks", "kernels")}
+        return {"tip_height": self.tip_height, "final_height": self.final_height(),
+                "last_prefetch": self.last_prefetch, "sync_error": self.sync_error, **counts}
+
+
+block_store = BlockStore(BLOCK_STORE_FILE)
+
+
+def block_prefetch_loop():
+    """Background worker keeping recent blocks warm while the explorer is open"""
+    while True:
+        if time.time() - block_store.last_request < BLOCK_PREFETCH_IDLE_TIMEOUT:
+            try:
+                stored = block_store.prefetch()
+                if stored:
+                    print(f"[blocks] Prefetched {stored} block(s)")
+            except Exception as e:
+                block_store.sync_error = str(e)
+        time.sleep(BLOCK_PREFETCH_INTERVAL)
+
+
+# ============================================
+# BLOCK / KERNEL SEARCH INDEX
+# ============================================
+# Sorted arrays of fixed-width binary records (32-byte key + position),
+# searched by binary search so full ids and hex prefixes both resolve in
+# O(log n) without a database round trip.
+
+SEARCH_HASH_RECORD = struct.Struct(">32sI")     # block hash -> height
+SEARCH_KERNEL_RECORD = struct.Struct(">32sIH")  # kernel id -> height, index in block
+SEARCH_MIN_PREFIX = 6                           # hex chars before prefix search kicks in
+SEARCH_MAX_RESULTS = 20
+SEARCH_MERGE_BATCH = 4096                       # pending records before a merge
+SEARCH_MERGE_INTERVAL = 5                       # seconds a pending record waits at most
+
+
+class PackedKeyIndex:
+    """Sorted fixed-width records in one bytearray, keyed by their first 32 bytes.
+
+    New records collect in a small pending batch that lookups search
+    alongside the sorted array; the batch is folded in by a linear merge
+    once it grows past SEARCH_MERGE_BATCH or gets older than
+    SEARCH_MERGE_INTERVAL, not on every read.
+    """
+
+    def __init__(self, record):
+        self.record = record
+        self.width = record.size
+        self.data = bytearray()
+        self.pending = {}  # key -> packed record, not yet in data
+        self.pending_since = None
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        with self.lock:
+            self._maybe_merge()
+            return len(self.data) // self.width + sum(1 for k in self.pending if not self._contains(k))
+
+    def add(self, *fields):
+        packed = self.record.pack(*fields)
+        with self.lock:
+            if not self.pending:
+                self.pending_since = time.time()
+            self.pending[packed[:32]] = packed
+            self._maybe_merge()
+
+    def _maybe_merge(self):
+        if self.pending and (len(self.pending) >= SEARCH_MERGE_BATCH
+                             or time.time() - self.pending_since >= SEARCH_MERGE_INTERVAL):
+            self._merge()
+
+    def _merge(self):
+        """Fold the pending batch into data: sort the batch, then copy runs between insertion points"""
+        w = self.width
+        out = bytearray()
+        pos = 0
+        for key in sorted(self.pending):
+            i = self._bisect(key) * w
+            out += self.data[pos:i]
+            out += self.pending[key]
+            # A newer record for an existing key replaces it
+            pos = i + w if self.data[i:i + 32] == key else i
+        out += self.data[pos:]
+        self.data = out
+        self.pending = {}
+        self.pending_since = None
+
+    def _bisect(self, key):
+        lo, hi, w = 0, len(self.data) // self.width, self.width
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.data[mid * w:mid * w + 32] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _contains(self, key):
+        i = self._bisect(key) * self.width
+        return self.data[i:i + 32] == key
+
+    def lookup(self, hex_prefix, limit=SEARCH_MAX_RESULTS):
+        """Unpacked records whose key starts with hex_prefix"""
+        low = bytes.fromhex(hex_prefix.ljust(64, "0"))
+        high = bytes.fromhex(hex_prefix.ljust(64, "f"))
+        found = {}
+        with self.lock:
+            self._maybe_merge()
+            w = self.width
+            i = self._bisect(low)
+            while len(found) < limit and (i + 1) * w <= len(self.data):
+                chunk = bytes(self.data[i * w:(i + 1) * w])
+                if chunk[:32] > high:
+                    break
+                found[chunk[:32]] = chunk
+                i += 1
+            found.update((k, v) for k, v in self.pending.items() if low <= k <= high)
+        return [self.record.unpack(found[k]) for k in sorted(found)[:limit]]
+
+
+class BlockSearchIndex:
+    """hash -> height and kernel id -> (height, index) over stored blocks"""
+
+    def __init__(self):
+        self.hashes = PackedKeyIndex(SEARCH_HASH_RECORD)
+        self.kernels = PackedKeyIndex(SEARCH_KERNEL_RECORD)
+        self.loaded = False
+
+    @staticmethod
+    def _key(hex_id):
+        """32-byte key for a hex id, or None (struct would zero-pad anything shorter)"""
+        try:
+            key = bytes.fromhex(hex_id or "")
+        except (TypeError, ValueError):
+            return None
+        return key if len(key) == 32 else None
+
+    def add_block(self, height, body):
+        key = self._key(body.get("hash"))
+        if key:
+            self.hashes.add(key, height)
+        for i, kernel in enumerate(body.get("kernels") or []):
+            key = self._key(kernel.get("id"))
+            if key:
+                try:
+                    self.kernels.add(key, height, i)
+                except struct.error:
+                    continue
+
+    def load(self, store):
+        """Build the index from everything already in the block store"""
+        with store.lock:
+            hashes = store.db.execute("SELECT hash, height FROM blocks").fetchall()
+            kernels = store.db.execute("SELECT kernel_id, height, idx FROM kernels").fetchall()
+        for row in hashes:
+            key = self._key(row[0])
+            if key:
+                self.hashes.add(key, row[1])
+        for row in kernels:
+            key = self._key(row[0])
+            if key:
+                try:
+                    self.kernels.add(key, row[1], row[2])
+                except struct.error:
+                    continue
+        self.loaded = True
+        print(f"[search] Indexed {len(self.hashes)} block hash(es), {len(self.kernels)} kernel(s)")
+
+    def search(self, q):
+        """Resolve a height, block hash or kernel id (or a hex prefix of either)"""
+        q = q.strip().lower()
+        results = []
+        if q.isdigit() and len(q) < 64:
+            # A height, but digits are also a valid hash or kernel prefix
+            results.append({"type": "block", "height": int(q)})
+        if not re.fullmatch(r"[0-9a-f]+", q) or len(q) > 64 or len(q) < SEARCH_MIN_PREFIX:
+            return results
+
+        results += [{"type": "block", "hash": key.hex(), "height": height}
+                    for key, height in self.hashes.lookup(q)]
+        results += [{"type": "kernel", "kernel_id": key.hex(), "height": height, "index": index}
+                    for key, height, index in self.kernels.lookup(q)]
+        if results or len(q) < 64:
+            return results
+
+        # Full id not seen yet: ask the explorer, which ingests it via the block store
+        for kind in ("block_hash", "kernel_id"):
+            block = block_store.get_block(**{kind: q})
+            if block and block.get("found"):
+                self.add_block(int(block["height"]), block)
+                return self.search(q)
+        return []
+
+
+block_search_index = BlockSearchIndex()
+block_store.listeners.append(block_search_index.add_block)
+
+
+# ============================================
+# AIRDROP VOUCHER STATUS CHECKS
+# ============================================
+# Bulk check_voucher: hashes are de-duplicated and fanned out to wallet-api
+# a few at a time. A redeemed voucher can never become available again, so
+# those answers are kept for good; everything else is valid for one block.
+
+AIRDROP_REDEEMED_FILE = DATA_DIR / "airdrop_redeemed.json"
+AIRDROP_CHECK_CONCURRENCY = 3   # leaves a wallet-api slot for interactive calls
+AIRDROP_CHECK_MAX_HASHES = 20000
+
+
+class VoucherStatusCache:
+    """check_voucher results: redeemed ones forever, the rest per block height"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.redeemed = {}  # hash -> result
+        self.current = {}   # hash -> result, valid at self.height only
+        self.height = 0
+        try:
+            if AIRDROP_REDEEMED_FILE.exists():
+                self.redeemed = json.loads(AIRDROP_REDEEMED_FILE.read_text())
+        except Exception as e:
+            print(f"Warning: Could not load redeemed vouchers: {e}")
+
+    def _save(self):
+        tmp = AIRDROP_REDEEMED_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.redeemed))
+        tmp.replace(AIRDROP_REDEEMED_FILE)
+
+    @staticmethod
+    def _query(voucher_hash):
+        params = {"args": f"role=user,action=check_voucher,cid={AIRDROP_CONTRACT_ID},hash={voucher_hash}",
+                  "create_tx": False}
+        if AIRDROP_SHADER:
+            params["contract"] = AIRDROP_SHADER
+        result = call_wallet_api("invoke_contract", params, priority=UPSTREAM_PRIORITY_NORMAL) or {}
+        output = result.get("output", result) if isinstance(result, dict) else result
+        if isinstance(output, str):
+            output = json.loads(output)
+        if not isinstance(output, dict) or output.get("error"):
+            return {"status": "not found"}
+        voucher = output.get("voucher", output)
+        return {
+            "status": "claimed" if voucher.get("redeemed") else "available",
+            "asset_id": voucher.get("asset_id", 0),
+            "value": voucher.get("value", 0),
+        }
+
+    def check(self, hashes):
+        """Status for each unique hash; returns (results, height, queried count)"""
+        unique = list(dict.fromkeys(h.strip().lower() for h in hashes if isinstance(h, str) and h.strip()))
+        status = call_wallet_api("wallet_status", priority=UPSTREAM_PRIORITY_NORMAL) or {}
+        height = int(status.get("current_height") or 0)
+
+        results, missing = {}, []
+        with self.lock:
+            if height != self.height:
+                self.current, self.height = {}, height
+            for h in unique:
+                cached = self.redeemed.get(h) or self.current.get(h)
+                if cached:
+                    results[h] = cached
+                else:
+                    missing.append(h)
+
+        if missing:
+            newly_redeemed = False
+            with concurrent.futures.ThreadPoolExecutor(max_workers=AIRDROP_CHECK_CONCURRENCY) as pool:
+                futures = {pool.submit(self._query, h): h for h in missing}
+                for future in concurrent.futures.as_completed(futures):
+                    h = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        results[h] = {"status": "error", "error": str(e)}
+                        continue
+                    results[h] = result
+                    with self.lock:
+                        if result["status"] == "claimed":
+                            self.redeemed[h] = result
+                            newly_redeemed = True
+                        elif self.height == height:
+                            self.current[h] = result
+            if newly_redeemed:
+                with self.lock:
+                    self._save()
+
+        return results, height, len(missing)
+
+
+voucher_status_cache = VoucherStatusCache()
+
+
+# ============================================
+# AIRDROP VOUCHER BATCH PIPELINE
+# ============================================
+# Large airdrops: codes are generated and hashed here, appended to a CSV
+# export as they are made, and submitted as a sequence of contract-sized
+# create_batch transactions. Progress lives in a JSON file next to the
+# export so a page reload (or a server restart) doesn't lose track of it.
+
+AIRDROP_EXPORT_DIR = DATA_DIR / "airdrop_exports"
+AIRDROP_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"  # no I, O, 0, 1
+AIRDROP_BATCH_CHUNK = 100           # vouchers per create_batch transaction
+AIRDROP_BATCH_MAX_COUNT = 100000
+AIRDROP_SUBMIT_RETRY_DELAY = 15     # seconds; change from earlier chunks may still be locked
+AIRDROP_SUBMIT_MAX_WAIT = 600
+AIRDROP_CONFIRM_POLL = 10
+AIRDROP_CONFIRM_TIMEOUT = 1800
+TX_STATUS_CANCELLED, TX_STATUS_COMPLETED, TX_STATUS_FAILED = 2, 3, 4
+
+
+def generate_voucher_code():
+    """Random XXXX-XXXX-XXXX-XXXX voucher code"""
+    chars = "".join(secrets.choice(AIRDROP_CODE_ALPHABET) for _ in range(16))
+    return "-".join(chars[i:i + 4] for i in range(0, 16, 4))
+
+
+def hash_voucher_code(code):
+    """sha256 of the normalized code, as the contract stores it"""
+    normalized = re.sub(r"[^A-Z0-9]", "", code.strip().upper())
+    return hashlib.sha256(normalized.encode()).digest()
+
+
+class VoucherBatchJob:
+    """Generate and submit one large airdrop as sequential create_batch txs"""
+
+    def __init__(self, asset_id, value, count, chunk_size=AIRDROP_BATCH_CHUNK, job_id=None):
+        self.job_id = job_id or secrets.token_hex(8)
+        self.token = secrets.token_urlsafe(16)  # status, cancel and the codes CSV need it
+        self.asset_id = asset_id
+        self.value = value
+        self.count = count
+        self.chunk_size = chunk_size
+        self.export_path = AIRDROP_EXPORT_DIR / f"{self.job_id}.csv"
+        self.state_path = AIRDROP_EXPORT_DIR / f"{self.job_id}.json"
+        self.state = "queued"
+        self.generated = 0
+        self.chunks = []  # {"count", "txid", "status"}
+        self.error = None
+        self.created_at = time.time()
+        self.cancelled = False
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "asset_id": self.asset_id,
+            "value": self.value,
+            "count": self.count,
+            "chunk_size": self.chunk_size,
+            "state": self.state,
+            "generated": self.generated,
+            "total_chunks": -(-self.count // self.chunk_size),
+            "submitted_chunks": sum(1 for c in self.chunks if c["status"] != "pending"),
+            "confirmed_chunks": sum(1 for c in self.chunks if c["status"] == "confirmed"),
+            "failed_chunks": sum(1 for c in self.chunks if c["status"] == "failed"),
+            "chunks": self.chunks,
+            "error": self.error,
+            "created_at": self.created_at,
+        }
+
+    def _save(self):
+        tmp = self.state_path.with_suffix(".tmp")
+        # Only a digest of the token goes to disk: it still unlocks the job after a restart
+        tmp.write_text(json.dumps({**self.to_dict(), "token_sha256": airdrop_batch_token_digest(self.token)}))
+        tmp.replace(self.state_path)
+
+    def _find_submitted(self, first_hash, since):
+        """After a failed process_invoke_data: the wallet may still have sent the chunk.
+
+        Returns (txid, on_chain); (None, False) means nothing went out and
+        rebuilding the transaction is safe.
+        """
+        known = {c["txid"] for c in self.chunks if c["txid"]}
+        try:
+            txs = call_wallet_api("tx_list", {"count": 50}, priority=UPSTREAM_PRIORITY_NORMAL) or []
+        except RuntimeError:
+            txs = None
+        for tx in txs or []:
+            cids = {inv.get("contract_id") for inv in tx.get("invoke_data") or []}
+            if (AIRDROP_CONTRACT_ID in cids and tx.get("txId") not in known
+                    and int(tx.get("create_time") or 0) >= int(since) - 5
+                    and tx.get("status") not in (TX_STATUS_FAILED, TX_STATUS_CANCELLED)):
+                return tx["txId"], False
+        try:
+            on_chain = VoucherStatusCache._query(first_hash.hex())["status"] != "not found"
+        except (RuntimeError, ValueError):
+            on_chain = False
+        if txs is None and not on_chain:
+            raise RuntimeError("Cannot tell whether the chunk was submitted")
+        return None, on_chain
+
+    def _submit_chunk(self, vouchers_hex, n, first_hash):
+        """create_batch + process_invoke_data; returns the txid, or None if the chunk is already on chain.
+
+        Building the transaction is retried while funds are locked. Once
+        process_invoke_data has been called the chunk may be out, so it is
+        only rebuilt after the tx list and contract state show it is not.
+        """
+        params = {
+            "args": f"role=user,action=create_batch,cid={AIRDROP_CONTRACT_ID},"
+                    f"asset_id={self.asset_id},count={n},vouchers={vouchers_hex}",
+            "create_tx": True,
+        }
+        if AIRDROP_SHADER:
+            params["contract"] = AIRDROP_SHADER
+        deadline = time.time() + AIRDROP_SUBMIT_MAX_WAIT
+        while True:
+            try:
+                result = call_wallet_api("invoke_contract", params, priority=UPSTREAM_PRIORITY_NORMAL) or {}
+            except RuntimeError:
+                if self.cancelled or time.time() > deadline:
+                    raise
+                time.sleep(AIRDROP_SUBMIT_RETRY_DELAY)
+                continue
+            if result.get("txid"):
+                return result["txid"]
+            if not result.get("raw_data"):
+                raise RuntimeError("No transaction data returned")
+
+            submitted_at = time.time()
+            try:
+                submitted = call_wallet_api("process_invoke_data", {"data": result["raw_data"]},
+                                            priority=UPSTREAM_PRIORITY_NORMAL) or {}
+                if submitted.get("txid"):
+                    return submitted["txid"]
+                error = RuntimeError("No txid returned for the chunk")
+            except RuntimeError as e:
+                error = e
+            time.sleep(AIRDROP_SUBMIT_RETRY_DELAY)
+            txid, on_chain = self._find_submitted(first_hash, submitted_at)
+            if txid or on_chain:
+                return txid
+            if self.cancelled or time.time() > deadline:
+                raise error
+
+    def _confirm(self):
+        deadline = time.time() + AIRDROP_CONFIRM_TIMEOUT
+        while time.time() < deadline and not self.cancelled:
+            for chunk in [c for c in self.chunks if c["status"] == "submitted"]:
+                try:
+                    tx = call_wallet_api("tx_status", {"txId": chunk["txid"]},
+                                         priority=UPSTREAM_PRIORITY_BACKGROUND) or {}
+                except RuntimeError:
+                    continue
+                if tx.get("status") == TX_STATUS_COMPLETED:
+                    chunk["status"] = "confirmed"
+                elif tx.get("status") in (TX_STATUS_FAILED, TX_STATUS_CANCELLED):
+                    chunk["status"] = "failed"
+            self._save()
+            if not any(c["status"] == "submitted" for c in self.chunks):
+                return
+            time.sleep(AIRDROP_CONFIRM_POLL)
+
+    def run(self):
+        AIRDROP_EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        self.state = "running"
+        self._save()
+        seen = set()
+        value_le = struct.pack("<Q", self.value)
+        try:
+            with open(self.export_path, "a") as export:
+                if export.tell() == 0:
+                    export.write("code,hash,value,chunk\n")
+                while self.generated < self.count:
+                    if self.cancelled:
+                        self.state = "cancelled"
+                        return
+                    n = min(self.chunk_size, self.count - self.generated)
+                    index = len(self.chunks)
+                    entries = []
+                    while len(entries) < n:
+                        code = generate_voucher_code()
+                        digest = hash_voucher_code(code)
+                        if digest in seen:
+                            continue
+                        seen.add(digest)
+                        entries.append(digest + value_le)
+                        export.write(f"{code},{digest.hex()},{self.value},{index}\n")
+                    # Codes hit the disk before the transaction that makes them claimable
+                    export.flush()
+                    os.fsync(export.fileno())
+
+                    chunk = {"count": n, "txid": None, "status": "pending"}
+                    self.chunks.append(chunk)
+                    self.generated += n
+                    chunk["txid"] = self._submit_chunk(b"".join(entries).hex(), n, entries[0][:32])
+                    chunk["status"] = "submitted" if chunk["txid"] else "confirmed"
+                    self._save()
+
+            self.state = "confirming"
+            self._save()
+            self._confirm()
+            self.state = "failed" if any(c["status"] == "failed" for c in self.chunks) else "done"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+        finally:
+            self._save()
+
 
-        # Check if node started
-        if beam_beam_node_process.poll() is not None:
-            log_content = node_log.read_text() if node_log.exists() else ""
-            print(f"[rescan] Node failed to start: {log_content[:200]}")
-            # Fall back to local node without owner key
-            return start_wallet_api(wallet_name, password, LOCAL_NODE_ADDR)
+airdrop_batch_jobs = {}  # job_id -> VoucherBatchJob (this server run)
 
-        print(f"[rescan] Node started with owner key, PID: {beam_beam_node_process.pid}")
 
-    except Exception as e:
-        print(f"[rescan] Failed to start node: {e}")
-        return start_wallet_api(wallet_name, password, LOCAL_NODE_ADDR)
+def airdrop_batch_token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
 
-    # Step 3: Connect wallet-api to local node
-    print(f"[rescan] Starting wallet-api with local node...")
-    result = start_wallet_api(wallet_name, password, LOCAL_NODE_ADDR)
 
-    if result.get("success"):
-        result["message"] = "Wallet connected to local node. Rescan in progress..."
-        result["rescan"] = True
+def load_airdrop_batch_state(job_id, token):
+    """Job progress from memory, or from its state file after a restart.
 
-    return result
+    None unless token is the one returned when the batch was created, so
+    callers cannot tell another caller's job from an unknown one.
+    """
+    if not token:
+        return None
+    job = airdrop_batch_jobs.get(job_id)
+    if job:
+        return job.to_dict() if secrets.compare_digest(job.token, token) else None
+    if not re.fullmatch(r"[0-9a-f]{16}", job_id):
+        return None
+    state_path = AIRDROP_EXPORT_DIR / f"{job_id}.json"
+    if not state_path.exists():
+        return None
+    state = json.loads(state_path.read_text())
+    if not secrets.compare_digest(state.pop("token_sha256", ""), airdrop_batch_token_digest(token)):
+        return None
+    if state.get("state") in ("queued", "running", "confirming"):
+        state["state"] = "interrupted"
+    return state
 
 
 class WalletProxyHandler(SimpleHTTPRequestHandler):
@@ -979,7 +4853,7 @@ class WalletProxyHandler(SimpleHTTPRequestHandler):
     def send_cors_headers(self):
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, DELETE, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, X-Explorer-Preferred, X-Wallet-Session, X-Job-Token")
 
     def do_GET(self):
         if self.path == "/api/status":
@@ -990,8 +4864,56 @@ class WalletProxyHandler(SimpleHTTPRequestHandler):
             self.handle_heartbeat()
         elif self.path == "/api/node/status":
             self.handle_node_status()
+        elif self.path == "/api/node/priority":
+            self.send_json(node_priority.status(get_beam_node_pid()))
         elif self.path == "/api/price":
             self.handle_price()
+        elif self.path == "/api/tx" or self.path.startswith("/api/tx?"):
+            self.handle_tx_query()
+        elif self.path == "/api/utxo" or self.path.startswith("/api/utxo?"):
+            self.handle_utxo_query()
+        elif self.path == "/api/assets" or self.path.startswith("/api/assets?"):
+            self.handle_assets()
+        elif self.path == "/api/dex/pools":
+            self.handle_dex_pools()
+        elif self.path.startswith("/api/dex/quote"):
+            self.handle_dex_quote()
+        elif self.path.startswith("/api/dex/impact"):
+            self.handle_dex_impact()
+        elif self.path.startswith("/api/dex/history"):
+            self.handle_dex_history()
+        elif self.path.startswith("/api/dex/activity"):
+            self.handle_dex_activity()
+        elif self.path.startswith("/api/blocks/"):
+            self.handle_block_detail()
+        elif self.path == "/api/blocks" or self.path.startswith("/api/blocks?"):
+            self.handle_block_list()
+        elif self.path == "/api/jobs":
+            self.send_json({"jobs": [j.to_dict(with_result=False) for j in list(lifecycle_jobs.jobs.values())]})
+        elif self.path.startswith("/api/jobs/"):
+            self.handle_job_status()
+        elif self.path == "/api/events":
+            self.handle_events()
+        elif self.path == "/api/sessions":
+            self.send_json({"sessions": wallet_sessions.status(), "max": WALLET_SESSION_MAX,
+                            "idle_timeout": WALLET_SESSION_IDLE_TIMEOUT})
+        elif self.path == "/api/airdrop/batches":
+            # Only the caller's own job: ids of other batches unlock nothing, but stay private
+            token = self.headers.get("X-Job-Token")
+            self.send_json({"jobs": [j.to_dict() for j in list(airdrop_batch_jobs.values())
+                                     if token and secrets.compare_digest(j.token, token)]})
+        elif self.path.startswith("/api/airdrop/batches/") and self.path.endswith("/export"):
+            self.handle_airdrop_batch_export()
+        elif self.path.startswith("/api/airdrop/batches/"):
+            self.handle_airdrop_batch_status()
+        elif self.path.startswith("/api/explorer/search"):
+            self.handle_explorer_search()
+        elif self.path == "/api/explorer/_health":
+            self.send_json(explorer_gateway.status())
+        elif self.path.startswith("/api/explorer/"):
+            self.handle_explorer_proxy()
+        elif self.path == "/api/upstream/metrics":
+            self.send_json({**upstream_dispatcher.metrics(), "contract_views": contract_view_cache.metrics()})
         elif self.path.startswith("/api/p2p/orders"):
             self.handle_p2p_get_orders()
         elif self.path.startswith("/api/p2p/trades/") and "/messages" in self.path:
@@ -1118,6 +5040,8 @@ window.APP_ROUTE = {json.dumps(app_route)};
             self.handle_node_start()
         elif self.path == "/api/node/stop":
             self.handle_node_stop()
+        elif self.path == "/api/node/priority":
+            self.handle_node_priority()
         elif self.path == "/api/node/switch":
             self.handle_node_switch()
         elif self.path == "/api/cleanup":
@@ -1126,6 +5050,16 @@ window.APP_ROUTE = {json.dumps(app_route)};
             self.handle_shutdown()
         elif self.path == "/api/update":
             self.handle_update()
+        elif self.path == "/api/sessions":
+            self.handle_session_open()
+        elif self.path == "/api/sessions/close":
+            self.handle_session_close()
+        elif self.path == "/api/airdrop/check":
+            self.handle_airdrop_check()
+        elif self.path == "/api/airdrop/batches":
+            self.handle_airdrop_batch_create()
+        elif self.path.startswith("/api/airdrop/batches/") and self.path.endswith("/cancel"):
+            self.handle_airdrop_batch_cancel()
         elif self.path == "/api/p2p/orders":
             self.handle_p2p_create_order()
         elif self.path == "/api/p2p/trades":
@@ -1190,6 +5124,8 @@ window.APP_ROUTE = {json.dumps(app_route)};
             "node_progress": node_status.get("progress", 0),
             "node_height": node_status.get("height", 0),
             "install_type": install_type,
+            "upstream": upstream_dispatcher.metrics(),
+            "supervisor": service_supervisor.status(),
             "version": "1.0.2"
         })
 
@@ -1199,8 +5135,9 @@ window.APP_ROUTE = {json.dumps(app_route)};
 
     def handle_cleanup(self):
         """Kill stale wallet-api and beam-node for fresh start"""
-        stop_wallet_api()
-        stop_beam_node()
+        with lifecycle_jobs.process_lock:
+            stop_wallet_api()
+            stop_beam_node()
         self.send_json({"success": True})
 
     def handle_shutdown(self):
@@ -1257,13 +5194,480 @@ window.APP_ROUTE = {json.dumps(app_route)};
                 "error": str(e)
             })
 
+    def resolve_indexed_wallet(self, requested=None):
+        """Wallet whose tx / UTXO index this request may read, or None after an error response.
+
+        That is the active wallet while its wallet-api is running, or the
+        session wallet named by the X-Wallet-Session token. Indexes of
+        wallets that are not unlocked are never served.
+        """
+        try:
+            session = wallet_sessions.resolve(self.headers.get("X-Wallet-Session"))
+        except KeyError as e:
+            self.send_json({"error": str(e.args[0])}, 403)
+            return None
+        wallet_name = session.wallet if session else get_active_wallet_name()
+        if requested and requested != wallet_name:
+            self.send_json({"error": f"Wallet '{requested}' needs its X-Wallet-Session token"}, 403)
+            return None
+        if not wallet_name or wallet_api_owner(wallet_name) is None:
+            self.send_json({"error": "No open wallet"}, 409)
+            return None
+        return wallet_name
+
+    def handle_tx_query(self):
+        """Paginated transaction history from the local tx index.
+
+        Query params: wallet, asset, status (comma list), counterparty, cid,
+        from / to (unix time), limit, cursor.
+        """
+        try:
+            from urllib.parse import urlparse, parse_qs
+            query = parse_qs(urlparse(self.path).query)
+            param = lambda name: query.get(name, [None])[0]
+
+            wallet_name = self.resolve_indexed_wallet(param("wallet"))
+            if wallet_name is None:
+                return
+
+            index = get_tx_index(wallet_name)
+            ensure_tx_index_sync()
+            if not index.last_sync:
+                # First request for this wallet: build the index before answering
+                try:
+                    index.sync()
+                except Exception as e:
+                    index.sync_error = str(e)
+
+            status = param("status")
+            txs, next_cursor = index.query(
+                asset=param("asset"),
+                status=[s for s in status.split(",") if s] if status else None,
+                counterparty=param("counterparty"),
+                cid=param("cid"),
+                time_from=param("from"),
+                time_to=param("to"),
+                cursor=param("cursor"),
+                limit=param("limit") or 50
+            )
+            self.send_json({
+                "wallet": wallet_name,
+                "txs": txs,
+                "next_cursor": next_cursor,
+                "aggregates": index.aggregates(),
+                "synced_at": index.last_sync or index.last_synced_at(),
+                "sync_error": index.sync_error
+            })
+        except ValueError as e:
+            self.send_json({"error": f"Invalid parameter: {e}"}, 400)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_utxo_query(self):
+        """Paginated UTXO listing plus per-asset analysis from the UTXO index.
+
+        Query params: wallet, asset, status (comma list), offset, limit.
+        """
+        try:
+            from urllib.parse import urlparse, parse_qs
+            query = parse_qs(urlparse(self.path).query)
+            param = lambda name: query.get(name, [None])[0]
+
+            wallet_name = self.resolve_indexed_wallet(param("wallet"))
+            if wallet_name is None:
+                return
+
+            index = get_utxo_index(wallet_name)
+            ensure_utxo_index_sync()
+            if not index.last_sync:
+                try:
+                    index.sync()
+                except Exception as e:
+                    index.sync_error = str(e)
+
+            status = param("status")
+            utxos, total = index.query(
+                asset=param("asset"),
+                status={int(s) for s in status.split(",") if s} if status else None,
+                offset=param("offset") or 0,
+                limit=param("limit") or 100
+            )
+            self.send_json({
+                "wallet": wallet_name,
+                "utxos": utxos,
+                "total": total,
+                "height": index.height,
+                "analysis": index.analysis(),
+                "synced_at": index.last_sync,
+                "sync_error": index.sync_error
+            })
+        except ValueError as e:
+            self.send_json({"error": f"Invalid parameter: {e}"}, 400)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_assets(self):
+        """Serve the parsed asset catalogue (whole, or ?id=N for one asset) with ETag"""
+        try:
+            from urllib.parse import urlparse, parse_qs
+            query = parse_qs(urlparse(self.path).query)
+            aid = query.get("id", [None])[0]
+            if aid is not None:
+                entry = asset_catalog.get(aid)
+                if entry is None:
+                    self.send_json({"error": f"Unknown asset {aid}"}, 404)
+                else:
+                    self.send_json(entry)
+                return
+
+            payload, etag = asset_catalog.payload, asset_catalog.etag
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.wfile.write(payload)
+        except ValueError as e:
+            self.send_json({"error": f"Invalid parameter: {e}"}, 400)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_dex_pools(self):
+        """Current pools_view snapshot"""
+        try:
+            dex_pool_cache.ensure_fresh()
+            self.send_json({
+                "pools": dex_pool_cache.pools,
+                "height": dex_pool_cache.height,
+                "updated_at": dex_pool_cache.last_refresh,
+                "sync_error": dex_pool_cache.sync_error
+            })
+        except Exception as e:
+            self.send_json({"error": str(e)}, 502)
+
+    def handle_dex_quote(self):
+        """Quote a swap over the cached pools: ?from=AID&to=AID&amount=GROTH[&hops=N]"""
+        try:
+            from urllib.parse import urlparse, parse_qs
+            query = parse_qs(urlparse(self.path).query)
+            try:
+                aid_from = int(query["from"][0])
+                aid_to = int(query["to"][0])
+                amount = int(query["amount"][0])
+                hops = int(query.get("hops", [DEX_QUOTE_DEFAULT_HOPS])[0])
+            except (KeyError, ValueError):
+                self.send_json({"error": "Required: from, to, amount (groth); optional: hops"}, 400)
+                return
+
+            dex_pool_cache.ensure_fresh()
+            result = dex_pool_cache.quote(aid_from, aid_to, amount, hops)
+            if not result["best"]:
+                self.send_json(dict(result, error="No route found"), 404)
+                return
+            self.send_json(result)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_dex_impact(self):
+        """Price-impact curves for all pools over a vector of input sizes.
+
+        Either ?sizes=a,b,c (groth) or ?min=&max=[&points=] for log-spaced sizes;
+        optional ?from=AID&to=AID restricts to one direction of one pair.
+        """
+        try:
+            from urllib.parse import urlparse, parse_qs
+            query = parse_qs(urlparse(self.path).query)
+            param = lambda name: query.get(name, [None])[0]
+            try:
+                sizes_param = param("sizes")
+                sizes = dex_impact_sizes(
+                    sizes=sizes_param.split(",") if sizes_param else None,
+                    size_min=param("min"),
+                    size_max=param("max"),
+                    points=param("points") or DEX_IMPACT_DEFAULT_POINTS
+                )
+                direction = None
+                if param("from") is not None and param("to") is not None:
+                    direction = (int(param("from")), int(param("to")))
+            except (TypeError, ValueError) as e:
+                self.send_json({"error": f"Invalid sizes: {e}. Use sizes=a,b,c or min=&max=&points="}, 400)
+                return
+            if not sizes:
+                self.send_json({"error": "No positive sizes given"}, 400)
+                return
+
+            dex_pool_cache.ensure_fresh()
+            with dex_pool_cache.lock:
+                pools = dex_pool_cache.pools
+            self.send_json({
+                "sizes": [int(s) for s in sizes],
+                "height": dex_pool_cache.height,
+                "curves": dex_impact_curves(pools, sizes, direction)
+            })
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_dex_history(self):
+        """Downsampled pool history: ?aid1=&aid2=&kind=[&bucket=1h|1d][&from=&to=].
+
+        Without aid1/aid2 lists the pools that have recorded history.
+        """
+        try:
+            from urllib.parse import urlparse, parse_qs
+            query = parse_qs(urlparse(self.path).query)
+            param = lambda name, default=None: query.get(name, [default])[0]
+            if param("aid1") is None or param("aid2") is None:
+                self.send_json({"pools": pool_history.pools()})
+                return
+
+            bucket = param("bucket", "1h")
+            if bucket not in DEX_HISTORY_BUCKETS:
+                self.send_json({"error": f"bucket must be one of {', '.join(DEX_HISTORY_BUCKETS)}"}, 400)
+                return
+            now = int(time.time())
+            try:
+                aid1, aid2, kind = int(param("aid1")), int(param("aid2")), int(param("kind", 0))
+                time_to = int(param("to", now))
+                time_from = int(param("from", time_to - 30 * 86400))
+            except ValueError:
+                self.send_json({"error": "aid1, aid2, kind, from and to must be integers"}, 400)
+                return
+
+            self.send_json({
+                "aid1": aid1,
+                "aid2": aid2,
+                "kind": kind,
+                "bucket": bucket,
+                "from": time_from,
+                "to": time_to,
+                "buckets": pool_history.query(aid1, aid2, kind, time_from, time_to,
+                                              DEX_HISTORY_BUCKETS[bucket])
+            })
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_dex_activity(self):
+        """Paginated DEX call history rows, newest first: ?offset=&limit="""
+        try:
+            from urllib.parse import urlparse, parse_qs
+            query = parse_qs(urlparse(self.path).query)
+            dex_activity_feed.last_request = time.time()
+            if not dex_activity_feed.last_fetch:
+                try:
+                    dex_activity_feed.fetch()
+                except Exception as e:
+                    dex_activity_feed.sync_error = str(e)
+
+            try:
+                rows, total = dex_activity_feed.page(query.get("offset", [0])[0],
+                                                     query.get("limit", [20])[0])
+            except ValueError:
+                self.send_json({"error": "offset and limit must be integers"}, 400)
+                return
+            self.send_json({
+                "rows": rows,
+                "total": total,
+                "last_height": dex_activity_feed.last_height,
+                "updated_at": dex_activity_feed.last_fetch,
+                "sync_error": dex_activity_feed.sync_error
+            })
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def block_store_refused(self):
+        """409 when the client uses an explorer the block store is not filled from"""
+        if explorer_gateway.serves(self.headers.get("X-Explorer-Preferred")):
+            return False
+        self.send_json({"error": "Block store does not follow this explorer"}, 409)
+        return True
+
+    def handle_block_list(self):
+        """Block header rows from the local store: ?hMax=&n="""
+        try:
+            if self.block_store_refused():
+                return
+            from urllib.parse import urlparse, parse_qs
+            query = parse_qs(urlparse(self.path).query)
+            try:
+                h_max = int(query.get("hMax", [0])[0]) or None
+                n = max(1, min(int(query.get("n", [50])[0]), 500))
+            except ValueError:
+                self.send_json({"error": "hMax and n must be integers"}, 400)
+                return
+            block_store.last_request = time.time()
+            blocks = block_store.headers_range(h_max, n)
+            self.send_json({"blocks": blocks, "tip_height": block_store.tip_height})
+        except urllib.error.URLError as e:
+            self.send_json({"error": str(e.reason)}, 502)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_block_detail(self):
+        """Block body by height or hash: /api/blocks/<height|hash>"""
+        try:
+            if self.block_store_refused():
+                return
+            key = self.path[len("/api/blocks/"):].split("?")[0]
+            block_store.last_request = time.time()
+            if key.isdigit():
+                block = block_store.get_block(height=int(key))
+            elif re.fullmatch(r"[0-9a-fA-F]{64}", key):
+                block = block_store.get_block(block_hash=key.lower())
+            else:
+                self.send_json({"error": "Expected a block height or hash"}, 400)
+                return
+            self.send_json(block or {"found": False})
+        except urllib.error.URLError as e:
+            self.send_json({"error": str(e.reason)}, 502)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_airdrop_check(self):
+        """Bulk voucher status: {"hashes": [...]} -> {"results": {hash: {...}}}"""
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(content_length).decode() or "{}")
+            hashes = data.get("hashes")
+            if not isinstance(hashes, list) or not hashes:
+                self.send_json({"error": "Missing hashes"}, 400)
+                return
+            if len(hashes) > AIRDROP_CHECK_MAX_HASHES:
+                self.send_json({"error": f"At most {AIRDROP_CHECK_MAX_HASHES} hashes per request"}, 400)
+                return
+            if not is_wallet_api_running():
+                self.send_json({"error": "Wallet API not running"}, 503)
+                return
+            results, height, queried = voucher_status_cache.check(hashes)
+            self.send_json({"results": results, "height": height,
+                            "queried": queried, "cached": len(results) - queried})
+        except json.JSONDecodeError:
+            self.send_json({"error": "Invalid JSON"}, 400)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_airdrop_batch_create(self):
+        """Start a server-side voucher batch: {"asset_id", "value", "count", "chunk_size"?}"""
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(content_length).decode() or "{}")
+            try:
+                asset_id = int(data.get("asset_id", 0))
+                value = int(data.get("value", 0))
+                count = int(data.get("count", 0))
+                chunk_size = int(data.get("chunk_size", AIRDROP_BATCH_CHUNK))
+            except (TypeError, ValueError):
+                self.send_json({"error": "asset_id, value, count and chunk_size must be integers"}, 400)
+                return
+            if value <= 0 or not 1 <= count <= AIRDROP_BATCH_MAX_COUNT:
+                self.send_json({"error": f"value must be positive and count 1-{AIRDROP_BATCH_MAX_COUNT}"}, 400)
+                return
+            if not 1 <= chunk_size <= AIRDROP_BATCH_CHUNK:
+                self.send_json({"error": f"chunk_size must be 1-{AIRDROP_BATCH_CHUNK}"}, 400)
+                return
+            if not is_wallet_api_running():
+                self.send_json({"error": "Wallet API not running"}, 503)
+                return
+
+            job = VoucherBatchJob(asset_id, value, count, chunk_size)
+            airdrop_batch_jobs[job.job_id] = job
+            threading.Thread(target=job.run, daemon=True).start()
+            self.send_json({"success": True, "job_id": job.job_id, "job_token": job.token,
+                            "total_chunks": job.to_dict()["total_chunks"]})
+        except json.JSONDecodeError:
+            self.send_json({"error": "Invalid JSON"}, 400)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_airdrop_batch_status(self):
+        job_id = self.path[len("/api/airdrop/batches/"):].split("?")[0]
+        state = load_airdrop_batch_state(job_id, self.headers.get("X-Job-Token"))
+        if state is None:
+            self.send_json({"error": "Unknown job"}, 404)
+            return
+        self.send_json(state)
+
+    def handle_airdrop_batch_cancel(self):
+        """Stop after the chunk in flight; codes already submitted stay valid"""
+        job_id = self.path[len("/api/airdrop/batches/"):-len("/cancel")]
+        job = airdrop_batch_jobs.get(job_id)
+        token = self.headers.get("X-Job-Token")
+        if not job or not token or not secrets.compare_digest(job.token, token):
+            self.send_json({"error": "Unknown job"}, 404)
+            return
+        job.cancelled = True
+        self.send_json({"success": True, "state": job.state})
+
+    def handle_airdrop_batch_export(self):
+        """Download the generated codes CSV (grows while the job runs)"""
+        job_id = self.path[len("/api/airdrop/batches/"):-len("/export")]
+        if load_airdrop_batch_state(job_id, self.headers.get("X-Job-Token")) is None:
+            self.send_json({"error": "Unknown job"}, 404)
+            return
+        export_path = AIRDROP_EXPORT_DIR / f"{job_id}.csv"
+        if not export_path.exists():
+            self.send_json({"error": "No export for this job"}, 404)
+            return
+        with open(export_path, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Disposition", f'attachment; filename="airdrop_{job_id}.csv"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_explorer_search(self):
+        """Block height / hash / kernel lookup: ?q=<height|hex id or prefix>"""
+        try:
+            from urllib.parse import urlparse, parse_qs
+            q = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+            if not q.strip():
+                self.send_json({"error": "Missing q"}, 400)
+                return
+            self.send_json({"query": q, "results": block_search_index.search(q)})
+        except urllib.error.URLError as e:
+            self.send_json({"error": str(e.reason)}, 502)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_explorer_proxy(self):
+        """Forward /api/explorer/<endpoint>?<query> through the explorer gateway"""
+        path = self.path[len("/api/explorer"):]
+        try:
+            status, body, source = explorer_gateway.fetch(path, self.headers.get("X-Explorer-Preferred"))
+        except ValueError as e:
+            self.send_json({"error": str(e)}, 400)
+            return
+        except urllib.error.URLError as e:
+            self.send_json({"error": str(e.reason)}, 502)
+            return
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Cache", "HIT" if source == "cache" else "MISS")
+        if source != "cache":
+            self.send_header("X-Explorer-Backend", source)
+        self.end_headers()
+        self.wfile.write(body)
+
     def handle_node_start(self):
         """Start local beam-node"""
         try:
             body = self.get_json_body()
             owner_key = body.get("owner_key")
             password = body.get("password")
-            result = start_beam_node(owner_key, password)
+            with lifecycle_jobs.process_lock:
+                result = start_beam_node(owner_key, password)
             self.send_json(result, 200 if "success" in result else 400)
         except Exception as e:
             self.send_json({"error": str(e)}, 500)
@@ -1271,11 +5675,48 @@ window.APP_ROUTE = {json.dumps(app_route)};
     def handle_node_stop(self):
         """Stop local beam-node"""
         try:
-            stop_beam_node()
+            with lifecycle_jobs.process_lock:
+                stop_beam_node()
             self.send_json({"success": True})
         except Exception as e:
             self.send_json({"error": str(e)}, 500)
 
+    def handle_node_priority(self):
+        """Change beam-node scheduling: {"profile": "sync_fast"|"responsive"} or custom
+        {"nice", "io_class", "io_level", "cpus"}; applied to a running node at once.
+        When the OS refuses part of it, answers 409 unless {"restart": true} asks
+        for a node restart job."""
+        try:
+            body = self.get_json_body()
+            try:
+                if body.get("profile") not in (None, "custom"):
+                    node_priority.configure(profile=body["profile"])
+                else:
+                    node_priority.configure(settings={k: body[k] for k in ("nice", "io_class", "io_level", "cpus")
+                                                      if k in body})
+            except ValueError as e:
+                self.send_json({"error": str(e)}, 400)
+                return
+            pid = get_beam_node_pid()
+            applied = node_priority.apply(pid) if pid else None
+            refused = [name for name, outcome in (applied or {}).items() if outcome.startswith("failed")]
+            if refused:
+                # Typically lowering nice without CAP_SYS_NICE: only a fresh node gets the new settings
+                if body.get("restart"):
+                    self.send_job(lifecycle_jobs.submit("node_restart", run_node_restart))
+                    return
+                self.send_json({
+                    "error": f"Could not change {', '.join(refused)} of the running node; "
+                             "restart the node to apply (POST again with \"restart\": true)",
+                    "restart_required": True,
+                    "applied": applied,
+                    **node_priority.status(pid)
+                }, 409)
+                return
+            self.send_json({"success": True, "applied": applied, **node_priority.status(pid)})
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
     def handle_node_switch(self):
         """Switch between public and local node"""
         try:
@@ -1294,17 +5735,8 @@ window.APP_ROUTE = {json.dumps(app_route)};
             if body.get("password"):
                 active_password = body["password"]
 
-            if mode == "local" and is_node_running():
-                # Fast path: local node already running, just restart wallet-api
-                result = fast_switch_node("local")
-            elif mode == "public":
-                # Fast path: just restart wallet-api with public node
-                result = fast_switch_node("public", node_addr)
-            else:
-                # Fallback: full switch (start node from scratch)
-                result = switch_to_local_node(password, wallet_name)
-
-            self.send_json(result, 200 if result.get("success") else 400)
+            self.send_job(lifecycle_jobs.submit(
+                "node_switch", lambda: run_node_switch(mode, password, wallet_name, node_addr)))
         except Exception as e:
             self.send_json({"error": str(e)}, 500)
 
@@ -1316,7 +5748,6 @@ window.APP_ROUTE = {json.dumps(app_route)};
 
     def handle_unlock(self):
         try:
-            global node_mode, active_password, active_owner_key
             body = self.get_json_body()
             wallet_name = body.get("wallet")
             password = body.get("password")
@@ -1329,32 +5760,66 @@ window.APP_ROUTE = {json.dumps(app_route)};
                 self.send_json({"error": "Missing password"}, 400)
                 return
 
-            # If node_mode is local and no explicit node_addr, use switch_to_local_node
-            # which properly exports owner key and starts node with it
-            if node_mode == "local" and not node_addr:
-                print(f"[handle_unlock] Local mode detected, using switch_to_local_node...")
-                result = switch_to_local_node(password, wallet_name)
-                if result.get("success"):
-                    active_password = password
-                status = 401 if "password" in result.get("error", "").lower() else (200 if "success" in result else 500)
-                self.send_json(result, status)
-                return
+            self.send_job(lifecycle_jobs.submit(
+                "unlock", lambda: run_unlock(wallet_name, password, node_addr)))
 
-            result = start_wallet_api(wallet_name, password, node_addr)
-            if result.get("success"):
-                active_password = password
-            status = 401 if "password" in result.get("error", "").lower() else (200 if "success" in result else 500)
-            self.send_json(result, status)
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
+
+    def handle_session_open(self):
+        """Unlock an additional wallet in its own wallet-api: {"wallet", "password", "node"?}"""
+        try:
+            body = self.get_json_body()
+            wallet_name = body.get("wallet")
+            password = body.get("password")
+            if not wallet_name or not password:
+                self.send_json({"error": "Missing wallet name or password"}, 400)
+                return
+            if not (WALLETS_DIR / wallet_name / "wallet.db").exists():
+                self.send_json({"error": f"Wallet '{wallet_name}' not found"}, 404)
+                return
+            with lifecycle_jobs.process_lock:
+                if wallet_name == active_wallet:
+                    # Two wallet-api processes must not share one wallet.db
+                    self.send_json({"error": "Wallet is already active; use it without a session"}, 409)
+                    return
+                try:
+                    session = wallet_sessions.open(wallet_name, password, body.get("node"))
+                except ValueError as e:
+                    status = 401 if "password" in str(e).lower() else 503
+                    self.send_json({"error": str(e)}, status)
+                    return
+            self.send_json({"success": True, "wallet": session.wallet,
+                            "token": session.token, "port": session.port})
+        except Exception as e:
+            self.send_json({"error": str(e)}, 500)
 
+    def handle_session_close(self):
+        """Stop an extra wallet session: {"token"}"""
+        try:
+            body = self.get_json_body()
+            try:
+                session = wallet_sessions.resolve(body.get("token"))
+            except KeyError as e:
+                self.send_json({"error": str(e.args[0])}, 404)
+                return
+            if session is None:
+                self.send_json({"error": "Missing token"}, 400)
+                return
+            with lifecycle_jobs.process_lock:
+                wallet_sessions.close(session.wallet)
+            self.send_json({"success": True, "wallet": session.wallet})
         except Exception as e:
             self.send_json({"error": str(e)}, 500)
 
     def handle_lock(self):
         global active_password, active_owner_key
-        stop_wallet_api()
-        stop_beam_node()
-        active_password = None
-        active_owner_key = None
+        with lifecycle_jobs.process_lock:
+            wallet_sessions.close_all()
+            stop_wallet_api()
+            stop_beam_node()
+            active_password = None
+            active_owner_key = None
         self.send_json({"success": True, "message": "Wallet locked"})
 
     def handle_create(self):
@@ -1375,8 +5840,7 @@ window.APP_ROUTE = {json.dumps(app_route)};
                 self.send_json({"error": "Invalid wallet name. Use only letters, numbers, underscore, hyphen."}, 400)
                 return
 
-            result = create_wallet(wallet_name, password)
-            self.send_json(result, 200 if "success" in result else 400)
+            self.send_job(lifecycle_jobs.submit("create", lambda: run_create(wallet_name, password)))
 
         except Exception as e:
             self.send_json({"error": str(e)}, 500)
@@ -1409,15 +5873,8 @@ window.APP_ROUTE = {json.dumps(app_route)};
                 self.send_json({"error": "Seed phrase must be exactly 12 words"}, 400)
                 return
 
-            result = restore_wallet(wallet_name, password, seed_phrase)
-
-            if result.get("success"):
-                # Don't trigger rescan synchronously - it takes too long
-                # The unlock step will start wallet-api, and user can trigger rescan later
-                result["message"] = "Wallet restored successfully. Use Settings > Rescan if balances appear incorrect."
-                print(f"[restore] Wallet restored: {wallet_name}")
-
-            self.send_json(result, 200 if "success" in result else 400)
+            self.send_job(lifecycle_jobs.submit(
+                "restore", lambda: run_restore(wallet_name, password, seed_phrase)))
 
         except Exception as e:
             self.send_json({"error": str(e)}, 500)
@@ -1436,8 +5893,7 @@ window.APP_ROUTE = {json.dumps(app_route)};
                 self.send_json({"error": "Missing password"}, 400)
                 return
 
-            result = rescan_wallet(wallet_name, password)
-            self.send_json(result, 200 if "success" in result else 400)
+            self.send_job(lifecycle_jobs.submit("rescan", lambda: run_rescan(wallet_name, password)))
 
         except Exception as e:
             self.send_json({"error": str(e)}, 500)
@@ -1514,10 +5970,11 @@ window.APP_ROUTE = {json.dumps(app_route)};
                 self.send_json({"error": "Missing password"}, 400)
                 return
 
-            result = export_owner_key(wallet_name, password)
-            if result.get("success"):
-                active_password = password
-                active_owner_key = result.get("owner_key")
+            with lifecycle_jobs.process_lock:
+                result = export_owner_key(wallet_name, password)
+                if result.get("success"):
+                    active_password = password
+                    active_owner_key = result.get("owner_key")
             self.send_json(result, 200 if "success" in result else 400)
 
         except Exception as e:
@@ -1528,10 +5985,24 @@ window.APP_ROUTE = {json.dumps(app_route)};
             content_length = int(self.headers.get("Content-Length", 0))
             body = self.rfile.read(content_length) if content_length > 0 else b""
 
+            # Extra wallet sessions are addressed by the token issued when they opened
+            try:
+                session = wallet_sessions.resolve(self.headers.get("X-Wallet-Session"))
+            except KeyError as e:
+                self.send_json({
+                    "jsonrpc": "2.0",
+                    "id": None,
+                    "error": {"code": -32001, "message": str(e.args[0])}
+                }, 404)
+                return
+
             # Inject shader for invoke_contract calls (DEX, Minter, BlackHole, P2P)
+            rpc_method, rpc_params = None, {}
             if body:
                 try:
                     data = json.loads(body)
+                    rpc_method = data.get("method")
+                    rpc_params = data.get("params") or {}
                     if (data.get("method") == "invoke_contract" and
                         "contract" not in data.get("params", {})):
                         args = data.get("params", {}).get("args", "")
@@ -1562,20 +6033,56 @@ window.APP_ROUTE = {json.dumps(app_route)};
                 except json.JSONDecodeError:
                     pass
 
-            req = urllib.request.Request(
-                WALLET_API_URL,
-                data=body,
-                headers={"Content-Type": "application/json"},
-                method="POST"
-            )
+            # Serve repeated contract views from the per-block cache
+            view_key = view_height = None
+            contract_call = rpc_method == "invoke_contract" and isinstance(rpc_params, dict)
+            if contract_call:
+                if is_contract_tx_call(rpc_params):
+                    contract_view_cache.invalidate(_contract_args_cid(rpc_params.get("args", "")))
+                else:
+                    try:
+                        view_key = contract_view_cache.key(rpc_params.get("args", ""),
+                                                           session.wallet if session else None)
+                        cached, view_height = contract_view_cache.get(view_key)
+                    except Exception:
+                        view_key = cached = None
+                    if cached is not None:
+                        self.send_json({"jsonrpc": "2.0", "id": data.get("id"), "result": cached})
+                        return
+            elif rpc_method == "process_invoke_data" and isinstance(rpc_params, dict):
+                contract_view_cache.tx_submitted(rpc_params.get("data"))
+
+            # Wait for an upstream slot by priority class, then use the method's timeout
+            priority = classify_upstream_call(rpc_method, rpc_params)
+            timeout = upstream_timeout(rpc_method)
+            if not upstream_dispatcher.acquire(priority, timeout):
+                self.send_json({
+                    "jsonrpc": "2.0",
+                    "id": None,
+                    "error": {"code": -32000, "message": "Wallet API busy, try again"}
+                }, 503)
+                return
 
-            with urllib.request.urlopen(req, timeout=30) as response:
-                result = response.read()
-                self.send_response(200)
-                self.send_header("Content-Type", "application/json")
-                self.send_cors_headers()
-                self.end_headers()
-                self.wfile.write(result)
+            failed = True
+            try:
+                # Pin the current instance for the whole relay so a blue/green
+                # switch drains this call before stopping it
+                with wallet_sessions.use(session) if session else wallet_api_target.use() as url:
+                    req = urllib.request.Request(
+                        url,
+                        data=body,
+                        headers={"Content-Type": "application/json"},
+                        method="POST"
+                    )
+                    with urllib.request.urlopen(req, timeout=timeout) as response:
+                        if contract_call:
+                            self.relay_contract_view(response, _contract_args_cid(rpc_params.get("args", "")),
+                                                     view_key, view_height)
+                        else:
+                            self.relay_upstream_response(response)
+                failed = False
+            finally:
+                upstream_dispatcher.release(priority, error=failed)
 
         except urllib.error.URLError as e:
             self.send_json({
@@ -1591,6 +6098,73 @@ window.APP_ROUTE = {json.dumps(app_route)};
                 "error": {"code": -32603, "message": str(e)}
             }, 500)
 
+    def relay_contract_view(self, response, cid, view_key, view_height):
+        """Relay an invoke_contract response: remember built transactions, cache views"""
+        body = response.read()
+        try:
+            reply = json.loads(body)
+            result = reply.get("result") if isinstance(reply, dict) and "error" not in reply else None
+            if isinstance(result, dict) and "raw_data" in result:
+                contract_view_cache.tx_built(cid, result["raw_data"])
+            elif isinstance(result, dict) and "txid" in result:
+                contract_view_cache.invalidate(cid)  # create_tx: already sent by the wallet
+            elif result is not None and view_key is not None:
+                contract_view_cache.put(view_key, view_height, result)
+        except json.JSONDecodeError:
+            pass
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def relay_upstream_response(self, response):
+        """Stream an upstream wallet-api response to the client in fixed-size chunks.
+
+        Large tx_list / get_utxo / assets_list bodies are never held in memory
+        as a whole. If the client accepts gzip and the body is large enough, it
+        is compressed on the fly; the response is then delimited by connection
+        close since the length is not known up front.
+        """
+        length = response.headers.get("Content-Length")
+        length = int(length) if length and length.isdigit() else None
+        accepts_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        compress = accepts_gzip and (length is None or length >= PROXY_GZIP_MIN_BYTES)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Vary", "Accept-Encoding")
+            self.close_connection = True
+        elif length is not None:
+            self.send_header("Content-Length", str(length))
+        else:
+            self.close_connection = True
+        self.send_cors_headers()
+        self.end_headers()
+
+        # Headers are out: from here on errors can only end the stream
+        compressor = zlib.compressobj(PROXY_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+        try:
+            while True:
+                chunk = response.read(PROXY_STREAM_CHUNK)
+                if not chunk:
+                    break
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                    if not chunk:
+                        continue
+                self.wfile.write(chunk)
+            if compressor:
+                self.wfile.write(compressor.flush())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away mid-stream
+        except Exception as e:
+            print(f"[proxy] Upstream stream aborted: {e}")
+            self.close_connection = True
+
     # ============================================
     # P2P MARKETPLACE HANDLERS
     # ============================================
@@ -2229,6 +6803,39 @@ window.APP_ROUTE = {json.dumps(app_route)};
         except Exception as e:
             print(f"Failed to update reputation: {e}")
 
+    def send_job(self, job):
+        """202 with the queued lifecycle job; the outcome is at /api/jobs/<id> with X-Job-Token"""
+        self.send_json({"job_id": job.id, "job_token": job.token, "job": job.to_dict(with_result=False)}, 202)
+
+    def handle_job_status(self):
+        job = lifecycle_jobs.get(self.path.split("?")[0].rstrip("/").split("/")[-1])
+        if job is None:
+            self.send_json({"error": "Job not found"}, 404)
+            return
+        self.send_json(lifecycle_jobs.read(job, self.headers.get("X-Job-Token")))
+
+    def handle_events(self):
+        """Server-Sent Events: lifecycle job progress (resumes from Last-Event-ID)"""
+        try:
+            last = int(self.headers.get("Last-Event-ID") or 0)
+        except ValueError:
+            last = 0
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            while True:
+                events = event_stream.wait(last, EVENT_STREAM_KEEPALIVE)
+                if not events:
+                    self.wfile.write(b": keepalive\n\n")
+                for seq, kind, data in events:
+                    self.wfile.write(f"id: {seq}\nevent: {kind}\ndata: {json.dumps(data)}\n\n".encode())
+                    last = seq
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
     def send_json(self, data, status=200):
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
@@ -2281,6 +6888,20 @@ def main():
 ║  Management Endpoints:                                           ║
 ║    GET  /api/status              - Server & wallet status        ║
 ║    GET  /api/wallets             - List available wallets        ║
+║    GET  /api/upstream/metrics    - wallet-api queue metrics      ║
+║    GET  /api/tx                  - Indexed transaction history   ║
+║    GET  /api/utxo                - Indexed UTXOs and analysis    ║
+║    GET  /api/assets              - Parsed asset catalogue (ETag) ║
+║    GET  /api/dex/quote           - Swap quote with routing       ║
+║    GET  /api/dex/activity        - Cached DEX activity feed      ║
+║    GET  /api/explorer/*          - Explorer gateway (failover)   ║
+║    GET  /api/blocks[/<h|hash>]   - Local block store             ║
+║    GET  /api/explorer/search     - Block hash / kernel search    ║
+║    POST /api/airdrop/check       - Bulk voucher status           ║
+║    POST /api/airdrop/batches     - Server-side voucher batches   ║
+║    POST /api/sessions            - Extra wallet session (token)  ║
+║    GET  /api/jobs/<id>           - Lifecycle job progress        ║
+║    POST /api/node/priority       - beam-node CPU/IO priority     ║
 ║    POST /api/wallet/create       - Create new wallet             ║
 ║    POST /api/wallet/restore      - Restore from seed + rescan    ║
 ║    POST /api/wallet/rescan       - Rescan wallet for balances    ║
@@ -2292,12 +6913,23 @@ def main():
 ╚══════════════════════════════════════════════════════════════════╝
 """)
 
-    # Allow socket reuse to avoid "Address already in use" errors
-    class ReusableHTTPServer(HTTPServer):
+    # Allow socket reuse to avoid "Address already in use" errors.
+    # Threaded so interactive calls are not stuck behind background polling.
+    class ReusableHTTPServer(ThreadingHTTPServer):
         allow_reuse_address = True
+        daemon_threads = True
 
     server = ReusableHTTPServer(("127.0.0.1", PORT), WalletProxyHandler)
 
+    # Background workers
+    threading.Thread(target=asset_catalog_refresh_loop, daemon=True).start()
+    threading.Thread(target=dex_pool_refresh_loop, daemon=True).start()
+    threading.Thread(target=dex_activity_poll_loop, daemon=True).start()
+    threading.Thread(target=block_search_index.load, args=(block_store,), daemon=True).start()
+    threading.Thread(target=block_prefetch_loop, daemon=True).start()
+    threading.Thread(target=wallet_session_sweep_loop, daemon=True).start()
+    threading.Thread(target=service_supervisor.run, daemon=True).start()
+
     try:
         server.serve_forever()
     except KeyboardInterrupt:
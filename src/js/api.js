@@ -116,6 +116,50 @@ export async function apiCall(method, params = {}) {
     }
 }
 
+// Lifecycle jobs take seconds to a few minutes, plus the time spent queued
+// behind another job; past JOB_MAX_WAIT the client gives up on the job
+const JOB_POLL_INTERVAL = 500;
+const JOB_MAX_WAIT = 10 * 60 * 1000;
+
+/**
+ * Read the outcome of a lifecycle endpoint (unlock, create, restore, node
+ * switch, rescan). These answer 202 with a job id and token; poll
+ * /api/jobs/<id> with the token until done. onStep is called with each new
+ * progress step. A job the server no longer knows, an unreachable server or
+ * an unreadable answer count as a failed job.
+ */
+export async function readJobResult(response, onStep = null) {
+    const started = await response.json();
+    if (response.status !== 202 || !started.job_id) return started;
+
+    const deadline = Date.now() + JOB_MAX_WAIT;
+    let lastStep = null;
+    while (Date.now() < deadline) {
+        await new Promise(r => setTimeout(r, JOB_POLL_INTERVAL));
+        let job;
+        try {
+            const resp = await fetch(`/api/jobs/${started.job_id}`, {
+                headers: { 'X-Job-Token': started.job_token }
+            });
+            if (resp.status === 404) {
+                return { error: 'The server no longer knows this operation (was it restarted?)' };
+            }
+            job = await resp.json();
+        } catch (e) {
+            return { error: `Lost contact with the server: ${e.message}` };
+        }
+        if (job.error && !job.state) return job;
+        if (onStep && job.step && job.step !== lastStep) {
+            lastStep = job.step;
+            onStep(job.step);
+        }
+        if (job.state === 'done' || job.state === 'failed') {
+            return job.result || { error: 'Operation failed' };
+        }
+    }
+    return { error: 'Timed out waiting for the operation to finish' };
+}
+
 /**
  * Check server status (serve.py management endpoints)
  */
@@ -152,7 +196,7 @@ export async function unlockWallet(walletName, password) {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ wallet: walletName, password })
     });
-    return await response.json();
+    return await readJobResult(response);
 }
 
 /**
@@ -172,7 +216,7 @@ export async function createWallet(walletName, password) {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ wallet: walletName, password })
     });
-    return await response.json();
+    return await readJobResult(response);
 }
 
 /**
@@ -184,7 +228,7 @@ export async function restoreWallet(walletName, password, seedPhrase) {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ wallet: walletName, password, seed_phrase: seedPhrase })
     });
-    return await response.json();
+    return await readJobResult(response);
 }
 
 /**
@@ -199,5 +243,5 @@ export async function switchNodeMode(mode, password, walletName = null) {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(body)
     });
-    return await response.json();
+    return await readJobResult(response);
 }
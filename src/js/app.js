@@ -465,6 +465,14 @@ const DEX_CONTRACT_ID = '729fe098d9fd2b57705db1a05a74103dd4b891f535aef2ae69b47bc
 // Password error handling - clean user-facing message
 const PASSWORD_ERROR_MESSAGE = 'Please check your password. If password is lost, restore wallet.db from latest backup or delete it and restore from seed phrase.';
 
+// Lifecycle endpoints (unlock, node switch, create, restore, rescan) answer
+// 202 with a job id; the polling lives in api.js, which this classic script
+// loads on first use
+async function readJobResult(response, onStep = null) {
+    const api = await import('/js/api.js');
+    return api.readJobResult(response, onStep);
+}
+
 // Helper to detect password-related errors
 function isPasswordError(error) {
     if (!error) return false;
@@ -791,10 +799,12 @@ async function loadWalletData() {
         // Update sync status
         updateSyncStatus(status);
 
-        // Try to get UTXOs
+        // UTXOs come from serve.py's index of the active wallet
         try {
-            const utxos = await apiCall('get_utxo', { count: 500 });
-            walletData.utxos = (utxos || []).map(u => ({
+            const utxoResp = await fetch('/api/utxo?limit=1000');
+            const utxoData = await utxoResp.json();
+            if (!utxoResp.ok || utxoData.error) throw new Error(utxoData.error || `HTTP ${utxoResp.status}`);
+            walletData.utxos = (utxoData.utxos || []).map(u => ({
                 asset: u.asset_id || 0,
                 amount: u.amount || 0,
                 maturity: u.maturity || 0,
@@ -808,23 +818,46 @@ async function loadWalletData() {
             walletData.utxoAnalysis = { byAsset: {}, recommendations: [] };
         }
 
-        // Load asset metadata cache for getAssetInfo() to work correctly
+        // Load asset metadata cache for getAssetInfo() to work correctly.
+        // serve.py keeps the parsed catalogue; the browser revalidates it by ETag.
+        let catalogLoaded = false;
         try {
-            const response = await apiCall('assets_list', { refresh: false });
-            const assets = response?.assets || response || [];
-            if (assets.length > 0) {
-                allAssetsCache = assets.map(a => ({
-                    asset_id: a.asset_id,
-                    // Use metadata_pairs if available, otherwise keep raw metadata
-                    metadata: a.metadata_pairs || (typeof a.metadata === 'string' ? parseMetadata(a.metadata) : (a.metadata || {})),
-                    metadata_pairs: a.metadata_pairs,
-                    value: a.emission || 0,
-                    lock_height: a.lockHeight
-                }));
-                console.log(`Loaded ${allAssetsCache.length} asset metadata entries`);
+            const catalogResp = await fetch('/api/assets');
+            if (catalogResp.ok) {
+                const catalog = await catalogResp.json();
+                // height is 0 until serve.py has read assets_list at least once
+                if (catalog.height > 0) {
+                    allAssetsCache = Object.values(catalog.assets || {}).map(a => ({
+                        asset_id: a.asset_id,
+                        metadata: a.metadata || {},
+                        metadata_pairs: a.metadata_pairs,
+                        value: a.emission || 0,
+                        lock_height: a.lockHeight
+                    }));
+                    catalogLoaded = true;
+                }
             }
         } catch (e) {
-            console.log('Assets list not available:', e);
+            console.log('Asset catalogue not available:', e);
+        }
+        if (!catalogLoaded) {
+            try {
+                const response = await apiCall('assets_list', { refresh: false });
+                const assets = response?.assets || response || [];
+                if (assets.length > 0) {
+                    allAssetsCache = assets.map(a => ({
+                        asset_id: a.asset_id,
+                        // Use metadata_pairs if available, otherwise keep raw metadata
+                        metadata: a.metadata_pairs || (typeof a.metadata === 'string' ? parseMetadata(a.metadata) : (a.metadata || {})),
+                        metadata_pairs: a.metadata_pairs,
+                        value: a.emission || 0,
+                        lock_height: a.lockHeight
+                    }));
+                    console.log(`Loaded ${allAssetsCache.length} asset metadata entries`);
+                }
+            } catch (e) {
+                console.log('Assets list not available:', e);
+            }
         }
 
         return true;
@@ -2809,7 +2842,7 @@ async function switchNodeWithoutPassword(nodeAddr, mode) {
             })
         });
 
-        const result = await response.json();
+        const result = await readJobResult(response);
 
         if (result.success) {
             currentNode = nodeAddr;
@@ -2864,7 +2897,7 @@ async function changeNode() {
             })
         });
 
-        const result = await response.json();
+        const result = await readJobResult(response);
 
         if (result.success) {
             currentNode = newNode;
@@ -3016,7 +3049,7 @@ async function switchToLocalAndRescan() {
             body: JSON.stringify({ mode: 'local', password })
         });
 
-        const result = await response.json();
+        const result = await readJobResult(response);
 
         if (result.success) {
             showToastAdvanced('Local Node Started', 'Rescan will begin automatically as node syncs', 'success');
@@ -3108,7 +3141,7 @@ async function performRescan() {
             body: JSON.stringify({ password })
         });
 
-        const result = await response.json();
+        const result = await readJobResult(response);
 
         if (result.success) {
             showToastAdvanced('Rescan Complete', 'Wallet balances updated', 'success');
@@ -3523,6 +3556,18 @@ function filterBalances() {
 // All assets cache for search
 let allAssetsCache = [];
 
+// Asset id -> cache entry, rebuilt whenever allAssetsCache is replaced or grows
+let allAssetsIndex = { source: null, size: 0, byId: new Map() };
+
+function findCachedAsset(aid) {
+    if (allAssetsIndex.source !== allAssetsCache || allAssetsIndex.size !== allAssetsCache.length) {
+        const byId = new Map();
+        allAssetsCache.forEach(a => { if (!byId.has(a.asset_id)) byId.set(a.asset_id, a); });
+        allAssetsIndex = { source: allAssetsCache, size: allAssetsCache.length, byId };
+    }
+    return allAssetsIndex.byId.get(aid);
+}
+
 // Filter all assets
 function filterAllAssets() {
     if (allAssetsCache.length > 0) {
@@ -4407,7 +4452,7 @@ async function seamlessSwitchToLocalNode() {
             body: JSON.stringify({ mode: 'local', password: password, wallet: welcomeSelectedWallet })
         });
 
-        const result = await response.json();
+        const result = await readJobResult(response);
 
         if (result.success) {
             currentNodeType = 'local';
@@ -4542,7 +4587,9 @@ async function welcomeUnlock() {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ wallet: welcomeSelectedWallet, password: password, node: unlockNode })
         });
-        const unlockResult = await unlockRes.json();
+        const unlockResult = await readJobResult(unlockRes, step => {
+            btn.innerHTML = `<div class="welcome-spinner"></div> ${step}...`;
+        });
 
         if (!unlockResult.success) {
             if (isPasswordError(unlockResult.error)) {
@@ -4614,7 +4661,7 @@ async function unlockWithPublicNode(password) {
         });
         clearTimeout(timeoutId);
 
-        const result = await response.json();
+        const result = await readJobResult(response);
 
         if (result.success) {
             hideLockedOverlay();
@@ -4686,7 +4733,7 @@ async function welcomeCreateWallet() {
             body: JSON.stringify({ wallet: name, password: password })
         });
 
-        const result = await response.json();
+        const result = await readJobResult(response);
 
         if (result.success) {
             welcomeCreatedSeed = result.seed_phrase;
@@ -4756,7 +4803,7 @@ async function welcomeSeedContinue() {
         });
         clearTimeout(timeoutId);
 
-        const result = await response.json();
+        const result = await readJobResult(response);
 
         if (result.success) {
             // Store password for background node switching
@@ -4869,7 +4916,7 @@ async function welcomeRestoreWallet() {
         });
         clearTimeout(timeoutId);
 
-        const result = await response.json();
+        const result = await readJobResult(response);
 
         if (result.success) {
             btn.innerHTML = '<div class="welcome-spinner"></div> Unlocking...';
@@ -4886,7 +4933,7 @@ async function welcomeRestoreWallet() {
             });
             clearTimeout(unlockTimeoutId);
 
-            const unlockResult = await unlockResponse.json();
+            const unlockResult = await readJobResult(unlockResponse);
 
             if (unlockResult.success) {
                 // Store password for background node switching
@@ -6490,6 +6537,22 @@ async function loadDexActivity() {
     const status = document.getElementById('activity-status');
     if (!feed) return;
 
+    // serve.py keeps one shared, de-duplicated feed; fall back to the explorer directly
+    try {
+        const resp = await fetch('/api/dex/activity?limit=60');
+        if (resp.ok) {
+            const data = await resp.json();
+            if (Array.isArray(data.rows) && data.rows.length > 0) {
+                dexActivity = data.rows.map(parseActivityRow).filter(Boolean).slice(0, 15);
+                renderActivityFeed();
+                if (status) status.textContent = `${dexActivity.length} recent`;
+                return;
+            }
+        }
+    } catch (e) {
+        console.log('Activity cache not available:', e);
+    }
+
     try {
         // Fetch DEX contract calls history from explorer
         const url = `${EXPLORER_API}/contract?id=${DEX_CID}&state=0&nMaxTxs=20`;
@@ -6944,7 +7007,7 @@ function getAssetInfo(aid) {
     if (config) return { aid, ...config };
 
     // Check allAssetsCache for assets from assets_list
-    const cached = allAssetsCache.find(a => a.asset_id === aid);
+    const cached = findCachedAsset(aid);
     if (cached) {
         // metadata_pairs is an object with keys like {N: "Name", UN: "Symbol", ...}
         // Also check metadata if it's already an object (parsed by assets_list)
@@ -7061,7 +7124,7 @@ function getAssetInfoBasic(aid) {
     const config = ASSET_CONFIG[aid];
     if (config) return { aid, symbol: config.symbol, name: config.name };
 
-    const cached = allAssetsCache.find(a => a.asset_id === aid);
+    const cached = findCachedAsset(aid);
     if (cached) {
         const meta = cached.metadata_pairs || cached.metadata || {};
         const name = meta.N || meta.name || `Asset #${aid}`;
@@ -10257,7 +10320,7 @@ async function syncNewlyCreatedAssets() {
             const aid = asset.aid;
             if (aid && aid > 0) {
                 // Check if we already have this asset in cache
-                const cached = allAssetsCache.find(a => a.asset_id === aid);
+                const cached = findCachedAsset(aid);
                 if (!cached || !cached.metadata_pairs || Object.keys(cached.metadata_pairs).length === 0) {
                     console.log(`Syncing asset ${aid} metadata...`);
                     try {
@@ -11028,19 +11091,34 @@ async function loadExplorerBlocks(startHeight = null) {
         const params = { nMax: 50, exp_am: 1, cols: colCodes };
         if (startHeight) params.hMax = startHeight;
 
-        const blocks = await fetchExplorerAPI('/hdrs', params);
-
-        if (blocks?.value && blocks.value.length > 1) {
-            const headers = blocks.value[0].map(h => h.value || h);
-            const blockList = blocks.value.slice(1).map(row => {
-                const obj = {};
-                headers.forEach((h, i) => {
-                    const cell = row[i];
-                    obj[h] = (cell?.value !== undefined) ? cell.value : cell;
-                });
-                return obj;
+        // Served from the local block store when available (all columns);
+        // serve.py declines when the store isn't filled from the chosen explorer
+        let blockList = null;
+        try {
+            const resp = await fetch(`/api/blocks?n=50${startHeight ? `&hMax=${startHeight}` : ''}`, {
+                headers: { 'X-Explorer-Preferred': EXPLORER_API }
             });
+            if (resp.ok) blockList = (await resp.json()).blocks;
+        } catch (e) {
+            console.warn('Block store unavailable:', e);
+        }
+
+        if (!blockList) {
+            const blocks = await fetchExplorerAPI('/hdrs', params);
+            if (blocks?.value && blocks.value.length > 1) {
+                const headers = blocks.value[0].map(h => h.value || h);
+                blockList = blocks.value.slice(1).map(row => {
+                    const obj = {};
+                    headers.forEach((h, i) => {
+                        const cell = row[i];
+                        obj[h] = (cell?.value !== undefined) ? cell.value : cell;
+                    });
+                    return obj;
+                });
+            }
+        }
 
+        if (blockList?.length) {
             // Store blocks for column updates
             explorerData.blocks = startHeight ? [...(explorerData.blocks || []), ...blockList] : blockList;
 
@@ -11107,8 +11185,17 @@ async function showBlockDetail(height) {
     content.innerHTML = '<div class="loading-state">Loading block...</div>';
 
     try {
-        // Fetch block data
-        const block = await fetchExplorerAPI('/block', { height });
+        // Fetch block data (local block store first)
+        let block = null;
+        try {
+            const resp = await fetch(`/api/blocks/${height}`, {
+                headers: { 'X-Explorer-Preferred': EXPLORER_API }
+            });
+            if (resp.ok) block = await resp.json();
+        } catch (e) {
+            console.warn('Block store unavailable:', e);
+        }
+        if (!block) block = await fetchExplorerAPI('/block', { height });
 
         if (!block || !block.found) {
             content.innerHTML = '<div class="error-state">Block not found</div>';
@@ -12636,6 +12723,21 @@ async function initExplorerSettings() {
 async function fetchExplorerAPI(endpoint, params = {}) {
     const url = new URL(`${EXPLORER_API}${endpoint}`);
     Object.entries(params).forEach(([k, v]) => v != null && url.searchParams.append(k, v));
+
+    // Known explorers go through the server gateway (cache + failover),
+    // preferring the one selected in settings
+    if (EXPLORER_NODES.some(n => n.url === EXPLORER_API)) {
+        try {
+            const gw = await fetch(`/api/explorer${endpoint}${url.search}`, {
+                headers: { 'X-Explorer-Preferred': EXPLORER_API }
+            });
+            if (gw.ok) return gw.json();
+            if (gw.status !== 502) throw new Error(`HTTP ${gw.status}`);
+        } catch (e) {
+            if (e.message.startsWith('HTTP')) throw e;
+        }
+    }
+
     const resp = await fetch(url.toString());
     if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
     return resp.json();
@@ -12663,6 +12765,13 @@ function searchExplorerMain() {
     document.getElementById('explorer-main-search').value = '';
 }
 
+// Query the server-side block hash / kernel index
+async function searchExplorerIndex(query) {
+    const resp = await fetch(`/api/explorer/search?q=${encodeURIComponent(query)}`);
+    if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+    return (await resp.json()).results || [];
+}
+
 // Search for block by hash
 async function searchBlockByHash(hash) {
     try {
@@ -12679,9 +12788,12 @@ async function searchBlockByHash(hash) {
             }
         }
 
-        // If not found locally, we'd need an API endpoint to search by hash
-        // For now, show a message
-        showToast('Block hash search requires checking the blockchain. Try searching by height.', 'warning');
+        const match = (await searchExplorerIndex(hash)).find(r => r.type === 'block');
+        if (match) {
+            showBlockDetail(match.height);
+        } else {
+            showToast('Block not found', 'warning');
+        }
     } catch (e) {
         console.error('Error searching block by hash:', e);
         showToast('Failed to search for block', 'error');
@@ -12693,12 +12805,12 @@ async function searchKernel(kernelId) {
     try {
         showToast('Searching for kernel...', 'info');
 
-        // Kernel search would require an API endpoint
-        // For now, show informative message
-        showToast('Kernel search: ' + kernelId.substring(0, 16) + '...', 'info');
-
-        // TODO: Implement kernel search when API endpoint is available
-        // The explorer API may have a /kernel?id={kernelId} endpoint
+        const match = (await searchExplorerIndex(kernelId)).find(r => r.type === 'kernel');
+        if (match) {
+            showBlockDetail(match.height);
+        } else {
+            showToast('Kernel not found: ' + kernelId.substring(0, 16) + '...', 'warning');
+        }
     } catch (e) {
         console.error('Error searching kernel:', e);
         showToast('Failed to search for kernel', 'error');
@@ -13414,6 +13526,74 @@ async function claimVoucher() {
     }
 }
 
+// Batches above this size are generated and submitted by the server in
+// chunked create_batch transactions; codes go to a CSV export instead of localStorage
+const AIRDROP_CLIENT_BATCH_MAX = 100;
+const AIRDROP_SERVER_BATCH_MAX = 100000;
+
+async function runServerAirdropBatch(assetId, valueGroth, count, progressFill, progressText) {
+    const resp = await fetch('/api/airdrop/batches', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ asset_id: assetId, value: valueGroth, count })
+    });
+    const started = await resp.json();
+    if (!resp.ok) throw new Error(started.error || `HTTP ${resp.status}`);
+
+    const jobId = started.job_id;
+    const headers = { 'X-Job-Token': started.job_token };
+    while (true) {
+        await new Promise(r => setTimeout(r, 2000));
+        const job = await (await fetch(`/api/airdrop/batches/${jobId}`, { headers })).json();
+        const done = job.confirmed_chunks + job.failed_chunks;
+        progressFill.style.width = `${10 + Math.round(90 * (job.submitted_chunks + done) / (2 * job.total_chunks))}%`;
+        progressText.textContent = job.state === 'running'
+            ? `Submitted ${job.submitted_chunks}/${job.total_chunks} chunks (${job.generated.toLocaleString()} codes)...`
+            : `Confirmed ${job.confirmed_chunks}/${job.total_chunks} chunks...`;
+
+        if (['done', 'failed', 'cancelled'].includes(job.state)) {
+            progressText.textContent = `${job.state === 'done' ? 'Batch confirmed' : 'Batch ' + job.state}: ` +
+                `${job.confirmed_chunks}/${job.total_chunks} chunks on chain. `;
+            // The export needs the job token, so it is fetched rather than linked
+            const link = document.createElement('a');
+            link.href = '#';
+            link.textContent = 'Download codes (CSV)';
+            link.addEventListener('click', (e) => {
+                e.preventDefault();
+                downloadServerAirdropExport(jobId, started.job_token)
+                    .catch(err => showToast(err.message || 'Download failed', 'error'));
+            });
+            progressText.appendChild(link);
+            if (job.state === 'done') {
+                showToast(`Batch confirmed! ${count.toLocaleString()} voucher codes ready.`, 'success');
+            } else {
+                showToast(job.error || `Batch ${job.state}`, 'error');
+            }
+            break;
+        }
+    }
+
+    loadMyBatches();
+    loadAirdropTransactions();
+    loadAirdropStats();
+}
+
+async function downloadServerAirdropExport(jobId, jobToken) {
+    const resp = await fetch(`/api/airdrop/batches/${jobId}/export`, {
+        headers: { 'X-Job-Token': jobToken }
+    });
+    if (!resp.ok) {
+        const err = await resp.json().catch(() => ({}));
+        throw new Error(err.error || `HTTP ${resp.status}`);
+    }
+    const url = URL.createObjectURL(await resp.blob());
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = `airdrop_${jobId}.csv`;
+    a.click();
+    URL.revokeObjectURL(url);
+}
+
 // Create airdrop batch
 async function createAirdropBatch() {
     const assetId = parseInt(document.getElementById('airdrop-asset-select').value);
@@ -13424,8 +13604,8 @@ async function createAirdropBatch() {
         showToast('Enter a valid value per voucher', 'error');
         return;
     }
-    if (!count || count < 1 || count > 100) {
-        showToast('Count must be 1-100', 'error');
+    if (!count || count < 1 || count > AIRDROP_SERVER_BATCH_MAX) {
+        showToast(`Count must be 1-${AIRDROP_SERVER_BATCH_MAX}`, 'error');
         return;
     }
 
@@ -13464,6 +13644,18 @@ async function createAirdropBatch() {
     progressText.textContent = 'Generating codes...';
     progressFill.style.width = '10%';
 
+    if (count > AIRDROP_CLIENT_BATCH_MAX) {
+        try {
+            await runServerAirdropBatch(assetId, valueGroth, count, progressFill, progressText);
+        } catch (e) {
+            showToast(e.message || 'Failed to create batch', 'error');
+            progressText.textContent = 'Failed';
+        } finally {
+            btn.disabled = false;
+        }
+        return;
+    }
+
     try {
         // Generate codes and compute hashes
         const codes = [];
@@ -13817,25 +14009,28 @@ async function loadSavedCodes(checkOnChain = false) {
 
     // If checking on-chain, update all statuses first
     if (checkOnChain && AIRDROP_CID) {
+        // One bulk request for every saved code (server de-duplicates and caches)
+        let statuses = {};
+        try {
+            const hashes = batchKeys.flatMap(key => (stored[key].codes || []).map(c => c.hash));
+            const resp = await fetch('/api/airdrop/check', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ hashes })
+            });
+            if (resp.ok) statuses = (await resp.json()).results || {};
+        } catch (e) {
+            console.warn('Voucher status check failed:', e);
+        }
+
         const keysToRemove = [];
         for (const key of batchKeys) {
             const batch = stored[key];
             if (!batch.codes) continue;
             for (const c of batch.codes) {
-                try {
-                    const result = await apiCall('invoke_contract', {
-                        args: `role=user,action=check_voucher,cid=${AIRDROP_CID},hash=${c.hash}`,
-                        create_tx: false
-                    });
-                    const output = typeof result.output === 'string' ? JSON.parse(result.output) : result.output;
-                    if (output.error) {
-                        c.status = 'not found';
-                    } else if (output.voucher && output.voucher.redeemed) {
-                        c.status = 'claimed';
-                    } else {
-                        c.status = 'available';
-                    }
-                } catch (e) { /* keep existing */ }
+                const result = statuses[(c.hash || '').toLowerCase()];
+                // Errors keep the existing status
+                if (result && result.status !== 'error') c.status = result.status;
             }
             // If all codes found on-chain, mark batch as confirmed
             if (batch.txStatus === 'pending') {
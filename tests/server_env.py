@@ -0,0 +1,16 @@
+"""
+Import serve.py for the unit tests without touching the user's wallet data.
+
+serve.py creates its data directory under $HOME and reads the port from
+argv when imported, so both are set aside first.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ["HOME"] = tempfile.mkdtemp(prefix="beam-light-wallet-tests-")
+_argv, sys.argv = sys.argv, sys.argv[:1]
+import serve  # noqa: E402,F401
+sys.argv = _argv
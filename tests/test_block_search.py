@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the block-hash and kernel-id search index.
+
+Run: python3 tests/test_block_search.py
+"""
+
+import hashlib
+import unittest
+
+from server_env import serve
+
+DIGIT_HASH = "123456" + "ab" * 29
+KERNEL_ID = "7" * 8 + "cd" * 28
+
+
+class PackedKeyIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = serve.PackedKeyIndex(serve.SEARCH_HASH_RECORD)
+
+    @staticmethod
+    def key(n):
+        return hashlib.sha256(str(n).encode()).digest()
+
+    def test_lookup_sees_pending_and_merged_records(self):
+        for n in range(10):
+            self.index.add(self.key(n), n)
+        self.assertEqual(len(self.index), 10)
+        self.assertEqual(self.index.lookup(self.key(3).hex()), [(self.key(3), 3)])
+        self.index._merge()
+        self.assertEqual(self.index.lookup(self.key(3).hex()), [(self.key(3), 3)])
+        self.assertEqual(len(self.index.data), 10 * serve.SEARCH_HASH_RECORD.size)
+
+    def test_merge_keeps_records_sorted_and_unique(self):
+        for n in range(3 * serve.SEARCH_MERGE_BATCH):
+            self.index.add(self.key(n % 5000), n % 5000)
+        self.index._merge()
+        w = self.index.width
+        keys = [bytes(self.index.data[i:i + 32]) for i in range(0, len(self.index.data), w)]
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertEqual(len(self.index), 5000)
+
+    def test_re_added_key_replaces_its_record(self):
+        self.index.add(self.key(1), 1)
+        self.index._merge()
+        self.index.add(self.key(1), 7)
+        self.assertEqual(self.index.lookup(self.key(1).hex()), [(self.key(1), 7)])
+        self.index._merge()
+        self.assertEqual(self.index.lookup(self.key(1).hex()), [(self.key(1), 7)])
+        self.assertEqual(len(self.index), 1)
+
+    def test_prefix_lookup_is_ordered_and_limited(self):
+        for n in range(2000):
+            self.index.add(self.key(n), n)
+        prefix = self.key(0).hex()[:1]
+        found = self.index.lookup(prefix, limit=5)
+        self.assertEqual(len(found), 5)
+        self.assertEqual([k for k, _ in found], sorted(k for k, _ in found))
+        self.assertTrue(all(k.hex().startswith(prefix) for k, _ in found))
+
+
+
+class BlockSearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = serve.BlockSearchIndex()
+        self.index.add_block(42, {"hash": DIGIT_HASH, "kernels": [{"id": "ff" * 32}, {"id": KERNEL_ID}]})
+
+    def test_hash_prefix(self):
+        self.assertEqual(self.index.search(DIGIT_HASH[:10].upper()),
+                         [{"type": "block", "hash": DIGIT_HASH, "height": 42}])
+
+    def test_digits_are_a_height_and_a_prefix(self):
+        self.assertEqual(self.index.search("123456"), [
+            {"type": "block", "height": 123456},
+            {"type": "block", "hash": DIGIT_HASH, "height": 42},
+        ])
+        self.assertEqual(self.index.search("77777777")[1:],
+                         [{"type": "kernel", "kernel_id": KERNEL_ID, "height": 42, "index": 1}])
+
+    def test_short_or_invalid_queries(self):
+        self.assertEqual(self.index.search("12"), [{"type": "block", "height": 12}])
+        self.assertEqual(self.index.search("abc"), [])
+        self.assertEqual(self.index.search("xyz123"), [])
+
+    def test_malformed_block_entries_are_skipped(self):
+        self.index.add_block(43, {"hash": "not hex", "kernels": [{"id": "zz"}, {}]})
+        self.assertEqual(len(self.index.hashes), 1)
+        self.assertEqual(len(self.index.kernels), 2)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQLite block store: finality, header ranges, bodies by height/hash/kernel and prefetch.
+
+Run: python3 tests/test_block_store.py
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from server_env import serve
+
+FINALITY = serve.EXPLORER_FINALITY_DEPTH
+
+
+def block(height):
+    return {"found": True, "height": height, "hash": f"{height:064x}", "prev": f"{height - 1:064x}",
+            "timestamp": 1_600_000_000 + height * 60, "kernels": [{"id": f"k{height}a"}, {"id": f"k{height}b"}]}
+
+
+class FakeExplorer:
+    """/status, /hdrs tables and /block bodies of a chain of tip blocks"""
+
+    def __init__(self, tip):
+        self.tip = tip
+        self.paths = []
+
+    def __call__(self, path):
+        self.paths.append(path)
+        url = urlparse(path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/status":
+            return {"height": self.tip}
+        if url.path == "/hdrs":
+            h_max, n = int(query["hMax"]), int(query["nMax"])
+            heights = range(h_max, max(0, h_max - n), -1)
+            return {"value": [["Height", "Hash"]] + [[{"value": h}, f"{h:064x}"] for h in heights]}
+        if "height" in query:
+            height = int(query["height"])
+        elif "hash" in query:
+            height = int(query["hash"], 16)
+        else:
+            height = int(query["kernel"][1:-1])
+        return block(height) if 1 <= height <= self.tip else {"found": False}
+
+
+class BlockStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = serve.BlockStore(Path(self.dir.name) / "blocks.db")
+        self.explorer = FakeExplorer(tip=1000)
+        self.saved = serve.fetch_explorer_json, serve.BLOCK_PREFETCH_PACE
+        serve.fetch_explorer_json = self.explorer
+        serve.BLOCK_PREFETCH_PACE = 0
+
+    def tearDown(self):
+        serve.fetch_explorer_json, serve.BLOCK_PREFETCH_PACE = self.saved
+        self.store.db.close()
+        self.dir.cleanup()
+
+    def test_only_final_blocks_are_stored(self):
+        self.store.refresh_tip()
+        self.assertTrue(self.store.store_block(block(1000 - FINALITY)))
+        self.assertFalse(self.store.store_block(block(1000 - FINALITY + 1)))
+        self.assertEqual(self.store.status()["blocks"], 1)
+
+    def test_block_lookup_by_height_hash_and_kernel(self):
+        self.assertEqual(self.store.get_block(height=500)["hash"], f"{500:064x}")
+        self.explorer.paths.clear()
+        self.assertEqual(self.store.get_block(block_hash=f"{500:064x}")["height"], 500)
+        self.assertEqual(self.store.get_block(kernel_id="k500b")["height"], 500)
+        self.assertEqual(self.explorer.paths, [])
+        self.assertEqual(self.store.status()["kernels"], 2)
+
+    def test_unfinalized_and_missing_blocks_are_always_fetched(self):
+        self.store.get_block(height=999)
+        self.store.get_block(height=999)
+        self.assertEqual(self.explorer.paths.count("/block?height=999"), 2)
+        self.assertFalse(self.store.get_block(height=5000)["found"])
+
+    def test_listeners_see_stored_blocks(self):
+        seen = []
+        self.store.listeners.append(lambda height, body: seen.append(height))
+        self.store.listeners.append(lambda height, body: 1 / 0)  # a failing listener is contained
+        self.store.get_block(height=10)
+        self.assertEqual(seen, [10])
+
+    def test_header_range_reads_the_tip_live_and_caches_final_rows(self):
+        rows = self.store.headers_range(n=30)
+        self.assertEqual([int(r["Height"]) for r in rows], list(range(1000, 970, -1)))
+        self.assertEqual(self.store.status()["headers"], 30 - FINALITY)
+
+        self.explorer.paths.clear()
+        rows = self.store.headers_range(h_max=980, n=10)
+        self.assertEqual([int(r["Height"]) for r in rows], list(range(980, 970, -1)))
+        self.assertEqual(self.explorer.paths, [])
+
+    def test_header_range_fills_gaps_in_batches(self):
+        self.store.refresh_tip()
+        rows = self.store.headers_range(h_max=800, n=250)
+        self.assertEqual(len(rows), 250)
+        self.assertEqual(len({r["Height"] for r in rows}), 250)
+        hdrs = [p for p in self.explorer.paths if p.startswith("/hdrs")]
+        self.assertEqual(len(hdrs), 3)  # 100 + 100 + 50
+
+    def test_prefetch_is_bounded_and_resumes(self):
+        stored = self.store.prefetch()
+        self.assertEqual(stored, serve.BLOCK_PREFETCH_BODY_BUDGET)
+        hdrs = [p for p in self.explorer.paths if p.startswith("/hdrs")]
+        self.assertLessEqual(len(hdrs), serve.BLOCK_PREFETCH_HDRS_BUDGET)
+        final = 1000 - FINALITY
+        self.assertIsNotNone(self.store.stored_block(height=final))
+
+        self.explorer.paths.clear()
+        self.store.prefetch()
+        bodies = [p for p in self.explorer.paths if p.startswith("/block")]
+        # The second pass continues below what the first one stored
+        self.assertEqual(bodies[0], f"/block?height={final - serve.BLOCK_PREFETCH_BODY_BUDGET}")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the block-driven contract view cache.
+
+Run: python3 tests/test_contract_view_cache.py
+"""
+
+import unittest
+
+from server_env import serve
+
+CID_A = "a" * 64
+CID_B = "b" * 64
+
+
+class ContractViewCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = serve.ContractViewCache()
+        self.cache.current_height = lambda: 100
+        self.cache.height = 100
+
+    def view(self, cid, wallet="w1", args="role=user,action=view"):
+        key = self.cache.key(f"{args},cid={cid}", wallet)
+        self.cache.put(key, 100, {"cid": cid})
+        return key
+
+    def test_key_ignores_argument_order_and_separates_wallets(self):
+        a = self.cache.key(f"action=view,cid={CID_A},role=user", "w1")
+        self.assertEqual(a, self.cache.key(f"role=user, action=view,cid={CID_A}", "w1"))
+        self.assertNotEqual(a, self.cache.key(f"action=view,cid={CID_A},role=user", "w2"))
+        self.assertEqual(a[1], CID_A)
+
+    def test_transactions_are_never_cached(self):
+        key = self.cache.key(f"role=user,action=deposit,cid={CID_A}", "w1")
+        self.cache.put(key, 100, {"raw_data": [1, 2, 3]})
+        self.cache.put(key, 100, {"txid": "abc"})
+        self.assertEqual(self.cache.get(key)[0], None)
+
+    def test_tx_calls_are_recognised(self):
+        self.assertTrue(serve.is_contract_tx_call({"args": f"cid={CID_A}", "createTx": True}))
+        self.assertTrue(serve.is_contract_tx_call({"args": f"cid={CID_A}", "create_tx": True}))
+        self.assertTrue(serve.is_contract_tx_call({"args": f"role=manager,action=create_token,cid={CID_A}"}))
+        self.assertFalse(serve.is_contract_tx_call({"args": f"role=manager,action=view,cid={CID_A}"}))
+        self.assertFalse(serve.is_contract_tx_call({"args": f"role=user,action=view_pools,cid={CID_A}"}))
+
+    def test_submitted_tx_invalidates_its_contract_only(self):
+        a, b = self.view(CID_A), self.view(CID_B)
+        self.cache.tx_built(CID_A, [1, 2, 3])
+        self.assertIsNone(self.cache.get(a)[0])
+        a = self.view(CID_A)
+        self.cache.tx_submitted([1, 2, 3])
+        self.assertIsNone(self.cache.get(a)[0])
+        self.assertEqual(self.cache.get(b)[0], {"cid": CID_B})
+
+    def test_unknown_submission_clears_everything(self):
+        a, b = self.view(CID_A), self.view(CID_B)
+        self.cache.tx_submitted([9, 9])
+        self.assertIsNone(self.cache.get(a)[0])
+        self.assertIsNone(self.cache.get(b)[0])
+
+    def test_result_from_an_older_block_is_dropped(self):
+        key = self.cache.key(f"role=user,action=view,cid={CID_A}", "w1")
+        self.cache.put(key, 99, {"stale": True})
+        self.assertIsNone(self.cache.get(key)[0])
+
+
+    def test_entries_are_bounded(self):
+        for n in range(serve.CONTRACT_VIEW_MAX_ENTRIES + 10):
+            self.view(CID_A, args=f"role=user,action=view,n={n}")
+        self.assertEqual(self.cache.metrics()["entries"], serve.CONTRACT_VIEW_MAX_ENTRIES)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
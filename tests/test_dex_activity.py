@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the DEX activity feed: backfill, paged incremental fetches and the bounded ring.
+
+Run: python3 tests/test_dex_activity.py
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from server_env import serve
+
+
+class FakeExplorer:
+    """/contract calls history: the newest nMaxTxs calls within [hMin, hMax]"""
+
+    def __init__(self, calls):
+        self.calls = list(calls)  # (height, name)
+        self.paths = []
+
+    def __call__(self, path):
+        self.paths.append(path)
+        query = {k: int(v[0]) for k, v in parse_qs(urlparse(path).query).items() if k != "id"}
+        hits = sorted((c for c in self.calls
+                       if query.get("hMin", 0) <= c[0] <= query.get("hMax", 10 ** 9)), reverse=True)
+        rows = [[{"value": h}, name] for h, name in hits[:query["nMaxTxs"]]]
+        return {"Calls history": {"value": [["Height", "Call"]] + rows}}
+
+
+class DexActivityFeedTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.file = serve.DEX_ACTIVITY_FILE
+        serve.DEX_ACTIVITY_FILE = Path(self.dir.name) / "dex_activity.json"
+        self.fetch = serve.fetch_explorer_json
+
+    def tearDown(self):
+        serve.fetch_explorer_json = self.fetch
+        serve.DEX_ACTIVITY_FILE = self.file
+        self.dir.cleanup()
+
+    def use_explorer(self, calls):
+        self.explorer = FakeExplorer(calls)
+        serve.fetch_explorer_json = self.explorer
+        return self.explorer
+
+    def heights(self, feed):
+        return [row[0]["value"] for row in feed.rows]
+
+    def test_backfill_then_paged_catch_up(self):
+        explorer = self.use_explorer([(h, f"call{h}") for h in range(1, 11)])
+        feed = serve.DexActivityFeed()
+        self.assertEqual(feed.fetch(), 10)
+        self.assertEqual(feed.last_height, 10)
+
+        # 120 calls since: more than two incremental pages
+        explorer.calls += [(h, f"call{h}") for h in range(11, 131)]
+        explorer.paths.clear()
+        self.assertEqual(feed.fetch(), 120)
+        self.assertEqual(len(explorer.paths), 3)
+        self.assertNotIn("hMax", explorer.paths[0])
+        self.assertEqual(self.heights(feed), list(range(130, 0, -1)))
+        self.assertEqual(feed.last_height, 130)
+
+    def test_short_page_ends_the_poll(self):
+        explorer = self.use_explorer([(1, "a")])
+        feed = serve.DexActivityFeed()
+        feed.fetch()
+        explorer.calls.append((2, "b"))
+        explorer.paths.clear()
+        self.assertEqual(feed.fetch(), 1)
+        self.assertEqual(len(explorer.paths), 1)
+        self.assertEqual(feed.fetch(), 0)  # the last height is asked again; nothing new
+
+    def test_one_crowded_height_does_not_loop(self):
+        explorer = self.use_explorer([(1, "a")])
+        feed = serve.DexActivityFeed()
+        feed.fetch()
+        explorer.calls += [(5, f"x{i}") for i in range(serve.DEX_ACTIVITY_INCREMENTAL + 10)]
+        explorer.paths.clear()
+        feed.fetch()
+        self.assertLessEqual(len(explorer.paths), 2)
+
+    def test_ring_is_persisted_and_paged(self):
+        self.use_explorer([(h, f"call{h}") for h in range(1, serve.DEX_ACTIVITY_BACKFILL + 1)])
+        feed = serve.DexActivityFeed()
+        feed.fetch()
+        reloaded = serve.DexActivityFeed()
+        self.assertEqual(list(reloaded.rows), list(feed.rows))
+        self.assertEqual(reloaded.last_height, serve.DEX_ACTIVITY_BACKFILL)
+        rows, total = reloaded.page(offset=5, limit=3)
+        self.assertEqual(total, serve.DEX_ACTIVITY_BACKFILL)
+        self.assertEqual([r[0]["value"] for r in rows], [195, 194, 193])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
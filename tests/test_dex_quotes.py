@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Unit tests for in-memory DEX math over the pool snapshot: routing quotes and price-impact curves.
+
+Run: python3 tests/test_dex_quotes.py
+"""
+
+import json
+import random
+import unittest
+
+from server_env import serve
+
+
+def pool(aid1, aid2, tok1, tok2, kind=0):
+    return {"aid1": aid1, "aid2": aid2, "tok1": tok1, "tok2": tok2, "ctl": 1, "kind": kind}
+
+
+def snapshot(pools, height=100):
+    """DexPoolCache loaded through refresh() from a fake pools_view"""
+    def fake_api(method, params=None, priority=None, wallet=None):
+        if method == "wallet_status":
+            return {"current_height": height}
+        return {"output": json.dumps({"res": pools})}
+
+    saved, serve.call_wallet_api = serve.call_wallet_api, fake_api
+    try:
+        cache = serve.DexPoolCache()
+        cache.refresh()
+    finally:
+        serve.call_wallet_api = saved
+    return cache
+
+
+def exhaustive_best(cache, aid_from, aid_to, amount, max_hops):
+    """Reference: best output over every simple path, by full depth-first search"""
+    best = 0
+
+    def walk(aid, amount, hops, visited):
+        nonlocal best
+        if aid == aid_to:
+            best = max(best, amount)
+            return
+        if hops == max_hops:
+            return
+        for nxt in cache.neighbors.get(aid, ()):
+            if nxt not in visited:
+                out, _ = cache._best_hop(cache.by_pair[(min(aid, nxt), max(aid, nxt))], aid, amount)
+                if out:
+                    walk(nxt, out, hops + 1, visited | {nxt})
+
+    walk(aid_from, amount, 0, {aid_from})
+    return best
+
+
+class DexQuoteTest(unittest.TestCase):
+    def test_snapshot_skips_empty_pools(self):
+        cache = snapshot([pool(0, 7, 1000, 2000), pool(0, 9, 0, 2000)])
+        self.assertEqual(cache.by_pair, {(0, 7): [pool(0, 7, 1000, 2000)]})
+        self.assertEqual(cache.neighbors, {0: {7}, 7: {0}})
+
+    def test_single_hop_picks_the_best_pool_of_the_pair(self):
+        cache = snapshot([pool(0, 7, 10 ** 9, 2 * 10 ** 9, kind=2), pool(7, 0, 2 * 10 ** 9, 10 ** 9, kind=1)])
+        quote = cache.quote(0, 7, 10 ** 6)
+        expected = serve.dex_amount_out(10 ** 6, 10 ** 9, 2 * 10 ** 9, serve.dex_pool_fee(1))
+        self.assertEqual(quote["amount_out"], expected)
+        self.assertEqual(quote["best"]["route"][0]["kind"], 1)
+        self.assertEqual(quote["best"]["hops"], 1)
+
+    def test_deep_pools_beat_a_thin_direct_pool(self):
+        cache = snapshot([pool(0, 7, 10 ** 4, 10 ** 4), pool(0, 9, 10 ** 10, 10 ** 10),
+                          pool(9, 7, 10 ** 10, 10 ** 10)])
+        quote = cache.quote(0, 7, 10 ** 6)
+        self.assertEqual([h["aid_out"] for h in quote["best"]["route"]], [9, 7])
+        self.assertEqual(quote["alternatives"][0]["hops"], 1)
+        self.assertGreater(quote["best"]["price_impact"], 0)
+        direct_only = cache.quote(0, 7, 10 ** 6, max_hops=1)
+        self.assertEqual(direct_only["best"]["hops"], 1)
+        self.assertEqual(direct_only["alternatives"], [])
+
+    def test_no_route(self):
+        cache = snapshot([pool(0, 7, 1000, 1000), pool(9, 11, 1000, 1000)])
+        quote = cache.quote(0, 11, 100)
+        self.assertIsNone(quote["best"])
+        self.assertEqual(quote["amount_out"], 0)
+        self.assertIsNone(cache.quote(0, 0, 100)["best"])
+
+    def test_matches_exhaustive_search_on_random_graphs(self):
+        rng = random.Random(31)
+        for _ in range(40):
+            assets = list(range(8))
+            pools = [pool(a, b, rng.randint(10 ** 6, 10 ** 10), rng.randint(10 ** 6, 10 ** 10), rng.randint(0, 2))
+                     for a in assets for b in assets if a < b and rng.random() < 0.5]
+            cache = snapshot(pools)
+            for hops in (1, 2, 3):
+                aid_from, aid_to = rng.sample(assets, 2)
+                amount = rng.randint(10 ** 3, 10 ** 8)
+                self.assertEqual(cache.quote(aid_from, aid_to, amount, max_hops=hops)["amount_out"],
+                                 exhaustive_best(cache, aid_from, aid_to, amount, hops))
+
+    def test_expansions_are_capped_on_dense_graphs(self):
+        assets = range(120)
+        cache = snapshot([pool(a, b, 10 ** 9 + a, 10 ** 9 + b) for a in assets for b in assets if a < b])
+        calls = []
+        best_hop = cache._best_hop
+        cache._best_hop = lambda *args: calls.append(1) or best_hop(*args)
+        quote = cache.quote(0, 1, 10 ** 5, max_hops=serve.DEX_QUOTE_MAX_HOPS)
+        self.assertLessEqual(len(calls), serve.DEX_QUOTE_MAX_EXPANSIONS)
+        self.assertIsNotNone(quote["best"])
+
+
+class DexImpactCurvesTest(unittest.TestCase):
+    def test_log_spaced_and_explicit_sizes(self):
+        sizes = serve.dex_impact_sizes(size_min=100, size_max=100000, points=4)
+        self.assertEqual(sizes, [100.0, 1000.0, 10000.0, 100000.0])
+        self.assertEqual(serve.dex_impact_sizes(sizes=["30", "10", "10", "-5"]), [10.0, 30.0])
+        with self.assertRaises(ValueError):
+            serve.dex_impact_sizes(size_min=10, size_max=10)
+
+    def test_curves_match_the_single_trade_formula(self):
+        pools = [pool(0, 7, 10 ** 9, 5 * 10 ** 9), pool(0, 9, 10 ** 8, 10 ** 8, kind=1)]
+        sizes = serve.dex_impact_sizes(size_min=10 ** 6, size_max=10 ** 8, points=8)
+        curves = serve.dex_impact_curves(pools, sizes)
+        self.assertEqual(len(curves), 4)
+        for curve in curves:
+            source = next(p for p in pools if {p["aid1"], p["aid2"]} == {curve["aid_in"], curve["aid_out"]})
+            forward = source["aid1"] == curve["aid_in"]
+            r_in = source["tok1"] if forward else source["tok2"]
+            r_out = source["tok2"] if forward else source["tok1"]
+            fee = serve.dex_pool_fee(source["kind"])
+            self.assertEqual(curve["fee_rate"], fee)
+            for size, out, price, slip in zip(sizes, curve["amount_out"], curve["effective_price"],
+                                              curve["slippage"]):
+                self.assertAlmostEqual(out, serve.dex_amount_out(size, r_in, r_out, fee), delta=1)
+                self.assertAlmostEqual(price, out / size, places=9)
+                self.assertAlmostEqual(slip, 1 - (out / size) / (r_out / r_in), places=7)
+            # Bigger trades never get a better price (above integer rounding)
+            self.assertEqual(curve["slippage"], sorted(curve["slippage"]))
+
+    def test_direction_filter(self):
+        pools = [pool(0, 7, 1000, 2000), pool(0, 9, 1000, 2000)]
+        curves = serve.dex_impact_curves(pools, [10.0, 100.0], aid_filter=(7, 0))
+        self.assertEqual([(c["aid_in"], c["aid_out"]) for c in curves], [(7, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the explorer gateway: failover, hedging, backend ranking and the response cache.
+
+Run: python3 tests/test_explorer_gateway.py
+"""
+
+import json
+import threading
+import time
+import unittest
+import urllib.error
+
+from server_env import serve
+
+A, B, C = "http://a.example", "http://b.example", "http://c.example"
+
+
+class ExplorerGatewayTest(unittest.TestCase):
+    def setUp(self):
+        self.gateway = serve.ExplorerGateway([A, B, C])
+        self.behaviour = {}  # url -> callable(path) -> (status, body), may raise or sleep
+        self.asked = []
+        self.asked_lock = threading.Lock()
+        self.gateway._get = self.fake_get
+
+    def tearDown(self):
+        self.gateway.executor.shutdown(wait=False, cancel_futures=True)
+
+    def fake_get(self, backend, path):
+        with self.asked_lock:
+            self.asked.append(backend.url)
+        started = time.time()
+        try:
+            status, body = self.behaviour.get(backend.url, lambda p: (200, b'{"ok": 1}'))(path)
+        except Exception as e:
+            backend.record(error=e)
+            raise
+        backend.record(latency=time.time() - started)
+        return status, body
+
+    @staticmethod
+    def failing(path):
+        raise urllib.error.URLError("connection refused")
+
+    def test_fails_over_and_ranks_the_failed_backend_last(self):
+        self.behaviour[A] = self.failing
+        status, body, source = self.gateway.fetch("/status")
+        self.assertEqual((status, source), (200, B))
+        self.assertEqual(self.asked, [A, B])
+        self.assertEqual([b.url for b in self.gateway.ranked()][-1], A)
+        self.assertTrue(self.gateway.status()["backends"][-1]["cooling_down"])
+
+    def test_all_backends_failing(self):
+        for url in (A, B, C):
+            self.behaviour[url] = self.failing
+        with self.assertRaises(urllib.error.URLError) as caught:
+            self.gateway.fetch("/status")
+        self.assertIn("All explorer backends failed", str(caught.exception))
+        self.assertEqual(sorted(self.asked), [A, B, C])
+
+    def test_slow_backend_is_hedged(self):
+        for backend in self.gateway.backends:
+            backend.latency = 0.05  # hedge after EXPLORER_HEDGE_MIN
+        release = threading.Event()
+        self.behaviour[A] = lambda path: (release.wait(5), (200, b'"slow"'))[1]
+        self.behaviour[B] = lambda path: (200, b'"fast"')
+        started = time.time()
+        status, body, source = self.gateway.fetch("/block?height=5")
+        release.set()
+        self.assertEqual((body, source), (b'"fast"', B))
+        self.assertLess(time.time() - started, 2)
+
+    def test_preferred_backend_goes_first_unless_cooling_down(self):
+        self.assertEqual(self.gateway.ranked(C + "/")[0].url, C)
+        self.gateway.backends[2].record(error="boom")
+        self.assertNotEqual(self.gateway.ranked(C)[0].url, C)
+        self.assertTrue(self.gateway.serves(C + "/"))
+        self.assertTrue(self.gateway.serves(None))
+        self.assertFalse(self.gateway.serves("http://elsewhere.example"))
+
+    def test_numeric_parameters_are_validated_before_any_request(self):
+        with self.assertRaises(ValueError):
+            self.gateway.fetch("/block?height=12abc")
+        self.assertEqual(self.asked, [])
+
+    def test_cache_hits_and_errors_are_not_cached(self):
+        self.gateway.fetch("/hdrs?hMax=100&nMax=10")
+        self.gateway.fetch("/hdrs?hMax=100&nMax=10")
+        self.assertEqual(len(self.asked), 1)
+        self.assertEqual((self.gateway.hits, self.gateway.misses), (1, 1))
+
+        self.behaviour[A] = self.behaviour[B] = self.behaviour[C] = lambda path: (404, b"{}")
+        self.gateway.fetch("/block?kernel=ff")
+        self.gateway.fetch("/block?kernel=ff")
+        self.assertEqual(len(self.asked), 3)
+
+    def test_finalized_blocks_never_expire(self):
+        self.behaviour[A] = lambda path: (200, json.dumps({"height": 1000}).encode())
+        self.gateway.fetch("/status")
+        self.assertEqual(self.gateway.tip_height, 1000)
+        self.assertIsNone(self.gateway._ttl("/block?height=900", b""))
+        self.assertIsNone(self.gateway._ttl("/hdrs?hMax=990&nMax=50", b""))
+        self.assertEqual(self.gateway._ttl("/block?height=995", b""), serve.EXPLORER_TIP_TTL)
+        self.assertIsNone(self.gateway._ttl("/block?hash=ab", b""))
+        self.assertEqual(self.gateway._ttl("/contracts", b""), serve.EXPLORER_DEFAULT_TTL)
+
+    def test_expired_entries_are_refetched(self):
+        self.gateway._cache_put("/x", 200, b"old", ttl=-1)
+        self.gateway.fetch("/x")
+        self.assertEqual(self.asked, [A])
+        self.assertEqual(self.gateway.cache_bytes, len(b'{"ok": 1}'))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
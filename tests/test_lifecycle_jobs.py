@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the lifecycle job registry: job tokens, secret results and serial execution.
+
+Run: python3 tests/test_lifecycle_jobs.py
+"""
+
+import threading
+import time
+import unittest
+
+from server_env import serve
+
+
+class LifecycleJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.jobs = serve.LifecycleJobs()
+
+    def run_all(self):
+        self.jobs.executor.shutdown(wait=True)
+
+    def test_result_only_for_the_token_holder(self):
+        job = self.jobs.submit("unlock", lambda: ({"success": True, "wallet": "w"}, 200))
+        self.run_all()
+        for token in (None, "", "wrong"):
+            data = self.jobs.read(job, token)
+            self.assertEqual(data["state"], "done")
+            self.assertNotIn("result", data)
+        data = self.jobs.read(job, job.token)
+        self.assertEqual((data["result"], data["status"]), ({"success": True, "wallet": "w"}, 200))
+
+    def test_secret_fields_are_handed_out_once(self):
+        job = self.jobs.submit("create", lambda: ({"success": True, "seed_phrase": "a b c"}, 200))
+        self.run_all()
+        self.assertEqual(self.jobs.read(job, job.token)["result"]["seed_phrase"], "a b c")
+        again = self.jobs.read(job, job.token)["result"]
+        self.assertEqual(again, {"success": True})
+
+    def test_unfinished_job_has_no_result(self):
+        release = threading.Event()
+        job = self.jobs.submit("rescan", lambda: (release.wait(5), ({"success": True}, 200))[1])
+        data = self.jobs.read(job, job.token)
+        self.assertIn(data["state"], ("queued", "running"))
+        self.assertNotIn("result", data)
+        self.assertTrue(self.jobs.busy())
+        release.set()
+        self.run_all()
+        self.assertFalse(self.jobs.busy())
+
+    def test_failures_and_exceptions(self):
+        failed = self.jobs.submit("unlock", lambda: ({"error": "Invalid password"}, 401))
+
+        def boom():
+            raise RuntimeError("node exited")
+
+        crashed = self.jobs.submit("switch", boom)
+        self.run_all()
+        self.assertEqual(failed.state, "failed")
+        self.assertEqual(crashed.state, "failed")
+        self.assertEqual((crashed.result, crashed.status), ({"error": "node exited"}, 500))
+
+    def test_steps_are_recorded_on_the_running_job(self):
+        def target():
+            self.jobs.step("Starting wallet-api")
+            self.jobs.step("Waiting for wallet-api")
+            return {"success": True}, 200
+
+        job = self.jobs.submit("unlock", target)
+        self.run_all()
+        self.assertEqual([s["name"] for s in job.steps], ["Starting wallet-api", "Waiting for wallet-api"])
+        self.assertEqual(job.to_dict()["step"], "Waiting for wallet-api")
+        self.jobs.step("outside any job")  # no-op
+        self.assertEqual(len(job.steps), 2)
+
+    def test_jobs_run_one_at_a_time_under_the_process_lock(self):
+        running, overlaps = [], []
+
+        def target():
+            overlaps.append(bool(running))
+            running.append(1)
+            # A synchronous handler taking the lock has to wait for the job
+            acquired = []
+            t = threading.Thread(target=lambda: acquired.append(self.jobs.process_lock.acquire(timeout=0.05)))
+            t.start()
+            t.join()
+            time.sleep(0.01)
+            running.pop()
+            return {"success": not acquired[0]}, 200
+
+        submitted = [self.jobs.submit("unlock", target) for _ in range(3)]
+        self.run_all()
+        self.assertEqual(overlaps, [False, False, False])
+        self.assertTrue(all(j.state == "done" for j in submitted))
+
+    def test_events_never_carry_the_result(self):
+        after = serve.event_stream.seq
+        self.jobs.submit("create", lambda: ({"success": True, "seed_phrase": "a b c"}, 200))
+        self.run_all()
+        events = serve.event_stream.wait(after, 0)
+        self.assertTrue(events)
+        for _, kind, data in events:
+            self.assertEqual(kind, "job")
+            self.assertNotIn("result", data)
+
+    def test_finished_jobs_are_pruned(self):
+        keep = serve.LIFECYCLE_JOBS_KEEP
+        for _ in range(keep + 5):
+            job = self.jobs.submit("unlock", lambda: ({"success": True}, 200))
+            while job.finished_at is None:
+                time.sleep(0.001)
+        # Pruned on submit: the last job joined the KEEP finished before it
+        self.assertEqual(len(self.jobs.jobs), keep + 1)
+        self.assertIs(self.jobs.get(job.id), job)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for reading beam-node.log: the incremental tailer, startup readiness
+and sync progress.
+
+Run: python3 tests/test_node_log.py
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from server_env import serve
+
+
+class FakeProcess:
+    def __init__(self, exit_code=None):
+        self.exit_code = exit_code
+
+    def poll(self):
+        return self.exit_code
+
+
+class LogTailerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "node.log"
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def append(self, text):
+        with open(self.path, "a") as f:
+            f.write(text)
+
+    def test_returns_only_complete_new_lines(self):
+        tail = serve.LogTailer(self.path)
+        self.assertEqual(tail.read_lines(), [])
+        self.append("one\ntw")
+        self.assertEqual(tail.read_lines(), ["one"])
+        self.append("o\nthree\n")
+        self.assertEqual(tail.read_lines(), ["two", "three"])
+        self.assertEqual(tail.read_lines(), [])
+
+    def test_truncated_file_is_read_from_the_start(self):
+        self.append("old line one\nold line two\n")
+        tail = serve.LogTailer(self.path)
+        tail.read_lines()
+        generation = tail.generation
+        self.path.write_text("new\n")
+        self.assertEqual(tail.read_lines(), ["new"])
+        self.assertEqual(tail.generation, generation + 1)
+
+    def test_from_end_skips_existing_content(self):
+        self.append("history\n")
+        tail = serve.LogTailer(self.path, from_end=True)
+        self.append("fresh\n")
+        self.assertEqual(tail.read_lines(), ["fresh"])
+
+
+
+class WaitForBeamNodeReadyTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.log = Path(self.dir.name) / "beam-node.log"
+        self.log.write_text("I Node 7.3\n")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def wait(self, text, exit_code=None):
+        with open(self.log, "a") as f:
+            f.write(text)
+        return serve.wait_for_beam_node_ready(FakeProcess(exit_code), self.log, timeout=1)
+
+    def test_tip_line_means_ready(self):
+        self.assertEqual(self.wait("I Initial Tip: 100\n"), ("ready", None))
+
+    def test_corruption_is_reported(self):
+        state, detail = self.wait("E database disk image is malformed: Corruption\n")
+        self.assertEqual(state, "corrupt")
+        self.assertIn("Corruption", detail)
+
+    def test_bind_failure(self):
+        state, detail = self.wait("E bind failed: Address already in use\n")
+        self.assertEqual(state, "failed")
+        self.assertIn("could not bind", detail)
+
+    def test_exit_reports_the_last_unterminated_line(self):
+        self.assertEqual(self.wait("E 1row change failed", exit_code=1)[0], "corrupt")
+
+    def test_silent_exit_fails(self):
+        state, detail = self.wait("", exit_code=3)
+        self.assertEqual(state, "failed")
+        self.assertIn("code 3", detail)
+
+
+class NodeSyncTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.log = Path(self.dir.name) / "beam-node.log"
+        self.tracker = serve.NodeSyncTracker(self.log)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def append(self, text):
+        with open(self.log, "a") as f:
+            f.write(text)
+
+    def state(self):
+        with self.tracker.lock:
+            self.tracker.refresh()
+            return self.tracker.height, self.tracker.target, self.tracker.progress, self.tracker.synced
+
+    def test_progress_lines_are_followed(self):
+        self.append("I Initial Tip: 10\n")
+        self.assertEqual(self.state(), (10, 0, 0, False))
+        self.append("I Updating node: 40% (400/1000)\n")
+        self.assertEqual(self.state(), (400, 1000, 40, False))
+        self.append("I Updating node: 100% (1000/1000)\n")
+        self.assertEqual(self.state(), (1000, 1000, 100, True))
+
+    def test_high_tip_counts_as_synced(self):
+        self.append(f"I My Tip: {serve.NODE_SYNCED_HEIGHT + 1}\n")
+        self.assertEqual(self.state()[2:], (100, True))
+
+    def test_restarted_node_resets_the_state(self):
+        self.append("I Updating node: 100% (1000/1000)\n")
+        self.assertTrue(self.state()[3])
+        self.log.write_text("I Initial Tip: 5\n")
+        self.assertEqual(self.state(), (5, 0, 0, False))
+
+    def test_bootstrap_skips_the_cut_first_line(self):
+        self.append("I Updating node: 10% (10/100)\n" * 3)
+        old = serve.NODE_LOG_BOOTSTRAP_BYTES
+        serve.NODE_LOG_BOOTSTRAP_BYTES = len("I Updating node: 10% (10/100)\n") + 5
+        try:
+            self.append("I Updating node: 50% (50/100)\n")
+            self.assertEqual(self.state(), (50, 100, 50, False))
+        finally:
+            serve.NODE_LOG_BOOTSTRAP_BYTES = old
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
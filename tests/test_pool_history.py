@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the append-only DEX pool history files and their range queries.
+
+Run: python3 tests/test_pool_history.py
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from server_env import serve
+
+REC = serve.DEX_HISTORY_RECORD
+
+
+def pool(tok1, tok2, ctl=1000, aid1=0, aid2=7):
+    return {"aid1": aid1, "aid2": aid2, "kind": 0, "tok1": tok1, "tok2": tok2, "ctl": ctl}
+
+
+class PoolHistoryRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.recorder = serve.PoolHistoryRecorder(Path(self.dir.name))
+        self.path = Path(self.dir.name) / serve.PoolHistoryRecorder.pool_name(0, 7, 0)
+        self.time = serve.time.time
+        self.now = 1_000_000
+        serve.time.time = lambda: self.now
+
+    def tearDown(self):
+        serve.time.time = self.time
+        self.dir.cleanup()
+
+    def records(self):
+        data = self.path.read_bytes()
+        return [REC.unpack_from(data, off) for off in range(0, len(data), REC.size)]
+
+    def test_one_record_per_new_height(self):
+        self.recorder.record([pool(100, 200)], 10)
+        self.recorder.record([pool(100, 300)], 10)  # same height: ignored
+        self.recorder.record([pool(100, 300)], 9)
+        self.now += 60
+        self.recorder.record([pool(100, 400)], 11)
+        self.assertEqual(self.records(), [(10, 1_000_000, 100, 200, 1000), (11, 1_000_060, 100, 400, 1000)])
+
+    def test_time_never_goes_backwards(self):
+        self.recorder.record([pool(1, 1)], 1)
+        self.now -= 3600  # clock stepped back
+        self.recorder.record([pool(1, 1)], 2)
+        self.assertEqual([r[1] for r in self.records()], [1_000_000, 1_000_000])
+
+    def test_restart_resumes_after_the_last_height(self):
+        self.recorder.record([pool(1, 1)], 5)
+        again = serve.PoolHistoryRecorder(Path(self.dir.name))
+        again.record([pool(2, 2)], 5)
+        again.record([pool(3, 3)], 6)
+        self.assertEqual([r[0] for r in self.records()], [5, 6])
+
+    def test_torn_tail_is_truncated_before_appending(self):
+        self.recorder.record([pool(1, 1)], 5)
+        with open(self.path, "ab") as f:
+            f.write(REC.pack(6, 1_000_001, 2, 2, 1000)[:7])  # crash mid-append
+        again = serve.PoolHistoryRecorder(Path(self.dir.name))
+        again.record([pool(3, 3)], 6)
+        self.assertEqual(self.path.stat().st_size, 2 * REC.size)
+        self.assertEqual([r[:4] for r in self.records()], [(5, 1_000_000, 1, 1), (6, 1_000_000, 3, 3)])
+
+    def test_pools_lists_sample_counts(self):
+        self.recorder.record([pool(1, 1), pool(5, 5, aid2=9)], 1)
+        self.recorder.record([pool(1, 1)], 2)
+        self.assertEqual(self.recorder.pools(), [
+            {"aid1": 0, "aid2": 7, "kind": 0, "samples": 2},
+            {"aid1": 0, "aid2": 9, "kind": 0, "samples": 1},
+        ])
+
+
+class PoolHistoryQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.recorder = serve.PoolHistoryRecorder(Path(self.dir.name))
+        path = Path(self.dir.name) / serve.PoolHistoryRecorder.pool_name(0, 7, 0)
+        samples = [
+            (1, 3500, 100, 100, 10),   # before the range: the baseline
+            (2, 3600, 100, 200, 10),
+            (3, 3700, 110, 180, 10),
+            (4, 3800, 90, 230, 10),
+            (5, 7200, 90, 250, 12),    # LP supply changed: no volume counted
+            (6, 7300, 100, 240, 12),
+            (7, 20000, 100, 240, 12),  # after the range
+        ]
+        path.write_bytes(b"".join(REC.pack(*s) for s in samples))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_ohlc_buckets(self):
+        buckets = self.recorder.query(0, 7, 0, 3600, 10000, 3600)
+        self.assertEqual([b["time"] for b in buckets], [3600, 7200])
+        first, second = buckets
+        self.assertEqual((first["open"], first["close"]), (2.0, 230 / 90))
+        self.assertEqual((first["high"], first["low"]), (230 / 90, 180 / 110))
+        self.assertEqual((first["samples"], first["height"], first["tok2"]), (3, 4, 230))
+        self.assertEqual(first["volume_aid1_est"], 0 + 10 + 20)
+        self.assertEqual(second["volume_aid1_est"], 10)
+        self.assertEqual(second["ctl"], 12)
+
+    def test_fee_apr_from_sqrt_k_growth(self):
+        first = self.recorder.query(0, 7, 0, 3600, 3999, 3600)[0]
+        g0, g1 = 100 / 10, (90 * 230) ** 0.5 / 10
+        expected = (g1 / g0 - 1) * serve.SECONDS_PER_YEAR / (3800 - 3500)
+        self.assertAlmostEqual(first["fee_apr"], round(expected, 6))
+
+    def test_empty_and_missing(self):
+        self.assertEqual(self.recorder.query(0, 7, 0, 30000, 40000, 3600), [])
+        self.assertEqual(self.recorder.query(0, 8, 0, 0, 40000, 3600), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the process registry and port-listener lookup, with and without /proc.
+
+Run: python3 tests/test_process_registry.py
+"""
+
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from server_env import serve
+
+LISTENER = "import socket, sys, time; s = socket.socket(); s.bind(('127.0.0.1', 0)); s.listen(); " \
+           "print(s.getsockname()[1], flush=True); time.sleep(30)"
+
+
+class ProcessRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.registry = serve.ProcessRegistry(Path(self.dir.name) / "processes.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+@unittest.skipUnless(Path("/proc/net/tcp").exists(), "needs /proc")
+class ProcessRegistryProcTest(ProcessRegistryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.proc = subprocess.Popen([sys.executable, "-c", LISTENER], stdout=subprocess.PIPE, text=True)
+        self.port = int(self.proc.stdout.readline())
+
+    def tearDown(self):
+        self.proc.kill()
+        self.proc.wait()
+        self.proc.stdout.close()
+        super().tearDown()
+
+    def test_listener_found_from_proc(self):
+        self.assertEqual(serve.find_port_listeners(self.port), [self.proc.pid])
+        self.assertEqual(serve.find_port_listeners(self.port, [self.proc.pid]), [self.proc.pid])
+
+    def test_pid_from_handle_record_and_port(self):
+        self.registry.register("svc", self.proc, self.port)
+        self.assertEqual(self.registry.pid("svc"), self.proc.pid)
+
+        # A later server run only has the persisted record
+        again = serve.ProcessRegistry(self.registry.state_file)
+        self.assertEqual(again.pid("svc"), self.proc.pid)
+
+        # Nothing recorded: the port listener, if its command line matches
+        fresh = serve.ProcessRegistry(Path(self.dir.name) / "other.json")
+        self.assertEqual(fresh.pid("svc", self.port, "python"), self.proc.pid)
+        self.assertIsNone(fresh.pid("svc", self.port, "wallet-api"))
+
+    def test_dead_process_is_forgotten(self):
+        self.registry.register("svc", self.proc, self.port)
+        self.proc.kill()
+        self.proc.wait()
+        self.assertIsNone(self.registry.pid("svc"))
+        self.assertNotIn("svc", self.registry.status())
+
+
+class ProcessRegistryWithoutProcTest(ProcessRegistryTestCase):
+    """macOS: no /proc, so lsof finds the listener and ps its command line"""
+
+    def setUp(self):
+        super().setUp()
+        self.proc_root, serve.PROC_ROOT = serve.PROC_ROOT, Path(self.dir.name) / "no-proc"
+        self.run, serve.subprocess.run = serve.subprocess.run, self.fake_run
+        self.commands = []
+
+    def tearDown(self):
+        serve.PROC_ROOT = self.proc_root
+        serve.subprocess.run = self.run
+        super().tearDown()
+
+    def fake_run(self, cmd, **kwargs):
+        self.commands.append(cmd[0])
+        if cmd[0] == "lsof":
+            out, code = ("4242\n", 0) if cmd[2] == "TCP:10000" else ("", 1)
+        else:
+            out, code = ("/opt/beam/wallet-api --port=10000\n", 0) if cmd[-1] == "4242" else ("", 1)
+        return subprocess.CompletedProcess(cmd, code, out, "")
+
+    def test_listener_found_with_lsof(self):
+        self.assertEqual(serve.find_port_listeners(10000), [4242])
+        self.assertEqual(serve.find_port_listeners(10001), [])
+
+    def test_pid_falls_back_to_lsof_and_ps(self):
+        self.assertEqual(self.registry.pid("wallet-api", 10000, "wallet-api"), 4242)
+        self.assertEqual(self.commands, ["lsof", "ps"])
+        self.assertIsNone(self.registry.pid("beam-node", 10000, "beam-node"))
+        self.assertIsNone(self.registry.pid("wallet-api", 10001, "wallet-api"))
+
+    def test_missing_lsof_means_no_listener(self):
+        def missing(cmd, **kwargs):
+            raise FileNotFoundError(cmd[0])
+
+        serve.subprocess.run = missing
+        self.assertEqual(serve.find_port_listeners(10000), [])
+        self.assertEqual(serve.proc_cmdline(4242), "")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the service supervisor: crash detection, exponential backoff and restarts as lifecycle jobs.
+
+Run: python3 tests/test_service_supervisor.py
+"""
+
+import threading
+import time
+import unittest
+
+from server_env import serve
+
+ROLE = "beam-node"
+
+
+class ServiceSupervisorTest(unittest.TestCase):
+    def setUp(self):
+        self.saved_jobs = serve.lifecycle_jobs
+        serve.lifecycle_jobs = serve.LifecycleJobs()
+        self.supervisor = serve.ServiceSupervisor()
+        self.exit_code = None  # what the service looks like: None = alive
+        self.supervisor._check = lambda role: self.exit_code
+        self.supervisor._exit_code = lambda role, port, binary: self.exit_code
+        self.restarts = []
+        self.restart_result = {"success": True}
+
+    def tearDown(self):
+        serve.lifecycle_jobs.executor.shutdown(wait=True)
+        serve.lifecycle_jobs = self.saved_jobs
+
+    def restart(self, *args):
+        self.restarts.append(args)
+        # Restart functions stop the old instance first, which releases the role
+        self.supervisor.release(ROLE)
+        if self.restart_result.get("success"):
+            self.exit_code = None
+        return self.restart_result
+
+    def run_jobs(self):
+        serve.lifecycle_jobs.executor.shutdown(wait=True)
+        serve.lifecycle_jobs.executor = serve.concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    def crash_and_restart(self):
+        """One tick that sees the crash, one after the backoff that restarts"""
+        self.supervisor.tick()
+        self.supervisor.stats[ROLE]["next_restart"] = time.time() - 1
+        self.supervisor.tick()
+        self.run_jobs()
+
+    def test_alive_service_is_left_alone(self):
+        self.supervisor.expect(ROLE, self.restart, "key")
+        self.supervisor.tick()
+        self.assertEqual(self.supervisor.status()[ROLE]["state"], "running")
+        self.assertEqual(self.restarts, [])
+
+    def test_crash_waits_for_the_backoff_then_restarts(self):
+        self.supervisor.expect(ROLE, self.restart, "key")
+        self.exit_code = 1
+        self.supervisor.tick()
+        st = self.supervisor.status()[ROLE]
+        self.assertEqual((st["state"], st["crashes"], st["last_exit_code"]), ("backoff", 1, 1))
+        self.assertAlmostEqual(st["next_restart"], time.time() + serve.SUPERVISOR_BACKOFF_INITIAL, delta=1)
+        self.supervisor.tick()  # still backing off
+        self.run_jobs()
+        self.assertEqual(self.restarts, [])
+
+        self.supervisor.stats[ROLE]["next_restart"] = time.time() - 1
+        self.supervisor.tick()
+        self.run_jobs()
+        self.assertEqual(self.restarts, [("key",)])
+        st = self.supervisor.status()[ROLE]
+        self.assertEqual((st["state"], st["restarts"], st["supervised"]), ("running", 1, True))
+
+    def test_failed_restarts_back_off_exponentially_up_to_the_cap(self):
+        self.supervisor.expect(ROLE, self.restart)
+        self.exit_code = "unknown"
+        self.restart_result = {"error": "port busy"}
+        self.supervisor.tick()
+        backoffs = []
+        for _ in range(12):
+            self.supervisor.stats[ROLE]["next_restart"] = time.time() - 1
+            self.supervisor.tick()
+            self.run_jobs()
+            backoffs.append(self.supervisor.stats[ROLE]["backoff"])
+        self.assertEqual(backoffs[:3], [8, 16, 32])
+        self.assertEqual(backoffs[-1], serve.SUPERVISOR_BACKOFF_MAX)
+        self.assertEqual(self.supervisor.status()[ROLE]["last_error"], "port busy")
+
+    def test_backoff_resets_after_a_stable_run(self):
+        self.supervisor.expect(ROLE, self.restart)
+        self.exit_code = 1
+        self.crash_and_restart()
+        self.assertEqual(self.supervisor.stats[ROLE]["backoff"], 2 * serve.SUPERVISOR_BACKOFF_INITIAL)
+        self.supervisor.stats[ROLE]["started_at"] = time.time() - serve.SUPERVISOR_STABLE_AFTER - 1
+        self.supervisor.tick()
+        self.assertEqual(self.supervisor.stats[ROLE]["backoff"], serve.SUPERVISOR_BACKOFF_INITIAL)
+
+    def test_explicit_release_stops_supervision(self):
+        self.supervisor.expect(ROLE, self.restart)
+        self.supervisor.release(ROLE)
+        self.exit_code = 1
+        self.supervisor.tick()
+        st = self.supervisor.status()[ROLE]
+        self.assertEqual((st["state"], st["supervised"], st["crashes"]), ("stopped", False, 0))
+        self.assertEqual(self.restarts, [])
+
+    def test_no_checks_while_a_lifecycle_job_runs(self):
+        self.supervisor.expect(ROLE, self.restart)
+        self.exit_code = 1
+        release = threading.Event()
+        serve.lifecycle_jobs.submit("unlock", lambda: (release.wait(5), ({"success": True}, 200))[1])
+        self.supervisor.tick()
+        self.assertEqual(self.supervisor.stats[ROLE]["state"], "running")
+        release.set()
+
+    def test_restart_skipped_when_something_else_brought_it_back(self):
+        self.supervisor.expect(ROLE, self.restart)
+        self.exit_code = 1
+        self.supervisor.tick()
+        self.supervisor.stats[ROLE]["next_restart"] = time.time() - 1
+        self.exit_code = None  # e.g. an unlock job queued first started it
+        self.supervisor.tick()
+        self.run_jobs()
+        self.assertEqual(self.restarts, [])
+        self.assertEqual(self.supervisor.stats[ROLE]["state"], "running")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the local transaction index and who may read it.
+
+Run: python3 tests/test_tx_index.py
+"""
+
+import shutil
+import unittest
+
+from server_env import serve
+
+WALLET = "alice"
+
+
+def make_tx(n, status=3, asset_id=0, income=False):
+    return {"txId": f"{n:032x}", "create_time": 1000 + n, "height": n, "status": status,
+            "asset_id": asset_id, "value": 100 * n, "fee": 10, "income": income,
+            "sender": "s", "receiver": "r", "confirmations": 5}
+
+
+class FakeWalletApi:
+    """tx_list / tx_status of one wallet, newest first, like wallet-api"""
+
+    def __init__(self, txs):
+        self.txs = {tx["txId"]: tx for tx in txs}
+        self.calls = []
+
+    def __call__(self, method, params=None, priority=None, wallet=None):
+        self.calls.append((method, dict(params or {}), wallet))
+        if method == "tx_status":
+            return self.txs.get(params["txId"])
+        ordered = sorted(self.txs.values(), key=lambda t: t["create_time"], reverse=True)
+        return ordered[params["skip"]:params["skip"] + params["count"]]
+
+
+class RecordingHandler(serve.WalletProxyHandler):
+    def __init__(self, path="/api/tx", headers=None):
+        self.path = path
+        self.headers = headers or {}
+        self.sent = []
+
+    def send_json(self, data, status=200):
+        self.sent.append((status, data))
+
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self):
+        (serve.WALLETS_DIR / WALLET).mkdir(parents=True, exist_ok=True)
+        self.saved = serve.call_wallet_api, serve.wallet_api_owner, serve.get_active_wallet_name
+        self.owner = ("active", 1)
+        serve.wallet_api_owner = lambda wallet: self.owner if wallet == WALLET else None
+        serve.get_active_wallet_name = lambda: WALLET
+
+    def tearDown(self):
+        serve.call_wallet_api, serve.wallet_api_owner, serve.get_active_wallet_name = self.saved
+        serve.close_tx_index(WALLET)
+        shutil.rmtree(serve.WALLETS_DIR / WALLET)
+
+    def use_api(self, txs):
+        self.api = FakeWalletApi(txs)
+        serve.call_wallet_api = self.api
+        return self.api
+
+
+class TxIndexSyncTest(IndexTestCase):
+    def test_first_sync_walks_every_page(self):
+        self.use_api([make_tx(n) for n in range(250)])
+        index = serve.get_tx_index(WALLET)
+        self.assertEqual(index.sync(), 250)
+        self.assertEqual([p["skip"] for m, p, _ in self.api.calls], [0, 100, 200])
+        self.assertTrue(all(w == WALLET for _, _, w in self.api.calls))
+
+    def test_incremental_sync_stops_at_a_settled_page(self):
+        api = self.use_api([make_tx(n) for n in range(250)])
+        index = serve.get_tx_index(WALLET)
+        index.sync()
+        api.calls.clear()
+        api.txs[make_tx(250)["txId"]] = make_tx(250)
+        self.assertEqual(index.sync(), 1)
+        # The new tx unsettles the first page; the second is all known
+        self.assertEqual([p["skip"] for m, p, _ in api.calls], [0, 100])
+        api.calls.clear()
+        self.assertEqual(index.sync(), 0)
+        self.assertEqual([p["skip"] for m, p, _ in api.calls], [0])
+
+    def test_volatile_fields_do_not_count_as_changes(self):
+        api = self.use_api([make_tx(n) for n in range(5)])
+        index = serve.get_tx_index(WALLET)
+        index.sync()
+        for tx in api.txs.values():
+            tx["confirmations"] += 1
+        self.assertEqual(index.sync(), 0)
+
+    def test_pending_tx_past_the_walk_is_refreshed(self):
+        txs = [make_tx(n) for n in range(250)]
+        txs[0]["status"] = 1  # oldest, beyond the first page
+        api = self.use_api(txs)
+        index = serve.get_tx_index(WALLET)
+        index.sync()
+        api.txs[txs[0]["txId"]] = make_tx(0)
+        self.assertEqual(index.sync(), 1)
+        self.assertIn(("tx_status", {"txId": txs[0]["txId"]}, WALLET), api.calls)
+        self.assertEqual(index.aggregates()["0"]["pending"], 0)
+
+    def test_owner_change_during_sync_rolls_back(self):
+        self.use_api([make_tx(n) for n in range(5)])
+        index = serve.get_tx_index(WALLET)
+        owners = iter([("active", 1), ("active", 2)])
+        serve.wallet_api_owner = lambda wallet: next(owners)
+        with self.assertRaises(RuntimeError):
+            index.sync()
+        self.assertEqual(index.query()[0], [])
+        self.assertEqual(index.last_sync, 0)
+
+    def test_sync_refuses_a_closed_wallet(self):
+        self.use_api([make_tx(1)])
+        index = serve.get_tx_index(WALLET)
+        self.owner = None
+        with self.assertRaises(RuntimeError):
+            index.sync()
+
+
+class TxIndexQueryTest(IndexTestCase):
+    def setUp(self):
+        super().setUp()
+        txs = [make_tx(n, asset_id=n % 2, status=3 if n % 3 else 4) for n in range(120)]
+        for tx in txs[:10]:
+            tx["create_time"] = 5000  # same timestamp: the tx id breaks the tie
+        self.use_api(txs)
+        self.index = serve.get_tx_index(WALLET)
+        self.index.sync()
+
+    def walk(self, **filters):
+        seen, cursor = [], None
+        while True:
+            page, cursor = self.index.query(cursor=cursor, limit=7, **filters)
+            self.assertLessEqual(len(page), 7)
+            seen.extend(page)
+            if cursor is None:
+                return seen
+
+    def test_cursor_pages_cover_everything_once_newest_first(self):
+        seen = self.walk()
+        self.assertEqual(len(seen), 120)
+        self.assertEqual(len({tx["txId"] for tx in seen}), 120)
+        keys = [(tx["create_time"], tx["txId"]) for tx in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_filters(self):
+        self.assertTrue(all(tx["asset_id"] == 1 for tx in self.walk(asset=1)))
+        self.assertEqual(len(self.walk(asset=1)), 60)
+        failed = self.walk(status=["4"])
+        self.assertEqual(len(failed), 40)
+        self.assertEqual(len(self.walk(time_from=1100, time_to=1109)), 10)
+
+    def test_aggregates(self):
+        stats = self.index.aggregates()
+        self.assertEqual(stats["0"]["tx_count"] + stats["1"]["tx_count"], 120)
+        self.assertEqual(stats["0"]["failed"] + stats["1"]["failed"], 40)
+
+    def test_limit_is_capped(self):
+        page, cursor = self.index.query(limit=10 ** 6)
+        self.assertEqual(len(page), 120)
+        self.assertIsNone(cursor)
+
+
+class IndexedWalletAccessTest(IndexTestCase):
+    def test_active_open_wallet(self):
+        handler = RecordingHandler()
+        self.assertEqual(handler.resolve_indexed_wallet(), WALLET)
+        self.assertEqual(handler.resolve_indexed_wallet(WALLET), WALLET)
+        self.assertEqual(handler.sent, [])
+
+    def test_other_wallet_without_session_token_is_refused(self):
+        handler = RecordingHandler()
+        self.assertIsNone(handler.resolve_indexed_wallet("bob"))
+        self.assertEqual(handler.sent[0][0], 403)
+
+    def test_locked_wallet_is_not_served(self):
+        self.use_api([make_tx(1)])
+        serve.get_tx_index(WALLET).sync()
+        self.owner = None
+        handler = RecordingHandler("/api/tx?wallet=" + WALLET)
+        handler.handle_tx_query()
+        self.assertEqual(handler.sent[0][0], 409)
+        self.assertNotIn("txs", handler.sent[0][1])
+
+    def test_session_token_selects_its_wallet(self):
+        class Session:
+            wallet = "bob"
+            token = "tok"
+            proc = type("Proc", (), {"poll": lambda self: None})()
+
+        sessions = serve.wallet_sessions.sessions
+        sessions["bob"] = Session()
+        serve.wallet_api_owner = lambda wallet: sessions.get(wallet)
+        try:
+            handler = RecordingHandler(headers={"X-Wallet-Session": "tok"})
+            self.assertEqual(handler.resolve_indexed_wallet("bob"), "bob")
+            self.assertIsNone(handler.resolve_indexed_wallet(WALLET))
+            bad = RecordingHandler(headers={"X-Wallet-Session": "nope"})
+            self.assertIsNone(bad.resolve_indexed_wallet("bob"))
+            self.assertEqual(bad.sent[0][0], 403)
+        finally:
+            del sessions["bob"]
+
+    def test_query_endpoint(self):
+        self.use_api([make_tx(n) for n in range(3)])
+        handler = RecordingHandler("/api/tx?limit=2")
+        handler.handle_tx_query()
+        status, data = handler.sent[0]
+        self.assertEqual(status, 200)
+        self.assertEqual(data["wallet"], WALLET)
+        self.assertEqual(len(data["txs"]), 2)
+        self.assertIsNotNone(data["next_cursor"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
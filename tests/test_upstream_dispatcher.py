@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Unit tests for wallet-api call classification and the upstream dispatcher.
+
+Run: python3 tests/test_upstream_dispatcher.py
+"""
+
+import threading
+import time
+import unittest
+
+from server_env import serve
+
+
+class ClassifyUpstreamCallTest(unittest.TestCase):
+    def test_contract_transactions_are_interactive(self):
+        for params in ({"args": "action=deposit", "create_tx": True},
+                       {"args": "action=deposit", "createTx": True},
+                       {"args": "role=manager,action=create_token"}):
+            self.assertEqual(serve.classify_upstream_call("invoke_contract", params),
+                             serve.UPSTREAM_PRIORITY_INTERACTIVE, params)
+
+    def test_contract_views_are_normal(self):
+        self.assertEqual(serve.classify_upstream_call("invoke_contract", {"args": "role=user,action=view"}),
+                         serve.UPSTREAM_PRIORITY_NORMAL)
+        self.assertEqual(serve.classify_upstream_call("invoke_contract"), serve.UPSTREAM_PRIORITY_NORMAL)
+
+    def test_method_table(self):
+        self.assertEqual(serve.classify_upstream_call("process_invoke_data"), serve.UPSTREAM_PRIORITY_INTERACTIVE)
+        self.assertEqual(serve.classify_upstream_call("no_such_method"), serve.UPSTREAM_PRIORITY_NORMAL)
+
+
+class UpstreamDispatcherTest(unittest.TestCase):
+    def test_background_never_takes_last_slot(self):
+        d = serve.UpstreamDispatcher(max_inflight=2)
+        self.assertTrue(d.acquire(serve.UPSTREAM_PRIORITY_BACKGROUND, timeout=1))
+        self.assertFalse(d.acquire(serve.UPSTREAM_PRIORITY_BACKGROUND, timeout=0.05))
+        self.assertTrue(d.acquire(serve.UPSTREAM_PRIORITY_INTERACTIVE, timeout=1))
+        self.assertEqual(d.inflight, 2)
+        self.assertEqual(d.metrics()["classes"]["background"]["timeouts"], 1)
+
+    def test_interactive_waiter_is_admitted_first(self):
+        d = serve.UpstreamDispatcher(max_inflight=2)
+        for _ in range(2):
+            d.acquire(serve.UPSTREAM_PRIORITY_INTERACTIVE)
+        order = []
+
+        def wait(priority, name):
+            if d.acquire(priority, timeout=5):
+                order.append(name)
+
+        background = threading.Thread(target=wait, args=(serve.UPSTREAM_PRIORITY_BACKGROUND, "background"))
+        background.start()
+        while d.metrics()["queue_depth"] < 1:
+            time.sleep(0.001)
+        interactive = threading.Thread(target=wait, args=(serve.UPSTREAM_PRIORITY_INTERACTIVE, "interactive"))
+        interactive.start()
+        while d.metrics()["queue_depth"] < 2:
+            time.sleep(0.001)
+
+        d.release(serve.UPSTREAM_PRIORITY_INTERACTIVE)
+        interactive.join(5)
+        self.assertEqual(order, ["interactive"])
+        d.release(serve.UPSTREAM_PRIORITY_INTERACTIVE)
+        d.release(serve.UPSTREAM_PRIORITY_INTERACTIVE)
+        background.join(5)
+        self.assertEqual(order, ["interactive", "background"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the in-memory UTXO index and who may read it.
+
+Run: python3 tests/test_utxo_index.py
+"""
+
+import unittest
+
+from server_env import serve
+
+WALLET = "alice"
+AVAILABLE = serve.UTXO_STATUS_AVAILABLE
+
+
+def make_utxo(n, amount, asset_id=0, status=AVAILABLE, maturity=0):
+    return {"id": f"coin{n}", "asset_id": asset_id, "amount": amount,
+            "status": status, "maturity": maturity}
+
+
+class FakeWalletApi:
+    """wallet_status and paged get_utxo of one wallet"""
+
+    def __init__(self, utxos, height=100):
+        self.utxos = list(utxos)
+        self.height = height
+        self.calls = []
+
+    def __call__(self, method, params=None, priority=None, wallet=None):
+        self.calls.append((method, dict(params or {}), wallet))
+        if method == "wallet_status":
+            return {"current_height": self.height}
+        return self.utxos[params["skip"]:params["skip"] + params["count"]]
+
+
+class RecordingHandler(serve.WalletProxyHandler):
+    def __init__(self, path="/api/utxo", headers=None):
+        self.path = path
+        self.headers = headers or {}
+        self.sent = []
+
+    def send_json(self, data, status=200):
+        self.sent.append((status, data))
+
+
+class UtxoIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.saved = serve.call_wallet_api, serve.wallet_api_owner, serve.get_active_wallet_name
+        self.owner = ("active", 1)
+        serve.wallet_api_owner = lambda wallet: self.owner if wallet == WALLET else None
+        serve.get_active_wallet_name = lambda: WALLET
+
+    def tearDown(self):
+        serve.call_wallet_api, serve.wallet_api_owner, serve.get_active_wallet_name = self.saved
+        serve.utxo_indexes.pop(WALLET, None)
+
+    def use_api(self, utxos, height=100):
+        self.api = FakeWalletApi(utxos, height)
+        serve.call_wallet_api = self.api
+        return self.api
+
+
+class UtxoIndexSyncTest(UtxoIndexTestCase):
+    def test_pages_through_get_utxo(self):
+        page = serve.UTXO_INDEX_PAGE_SIZE
+        api = self.use_api([make_utxo(n, 1000 + n) for n in range(page + 5)])
+        index = serve.UtxoIndex(WALLET)
+        index.sync()
+        skips = [p["skip"] for m, p, _ in api.calls if m == "get_utxo"]
+        self.assertEqual(skips, [0, page])
+        self.assertEqual(index.analysis()["0"]["count"], page + 5)
+
+    def test_same_height_skips_the_reload(self):
+        api = self.use_api([make_utxo(1, 10)])
+        index = serve.UtxoIndex(WALLET)
+        index.sync()
+        api.calls.clear()
+        self.assertEqual(index.sync(), 0)
+        self.assertEqual([m for m, _, _ in api.calls], ["wallet_status"])
+
+    def test_stats_follow_coin_deltas(self):
+        api = self.use_api([make_utxo(1, 50000), make_utxo(2, 5 * 10 ** 8), make_utxo(3, 7, asset_id=5)])
+        index = serve.UtxoIndex(WALLET)
+        index.sync()
+        beam = index.analysis()["0"]
+        self.assertEqual((beam["count"], beam["amount"]), (2, 50000 + 5 * 10 ** 8))
+        self.assertEqual(beam["largest_available"], 5 * 10 ** 8)
+        self.assertEqual(beam["size_histogram"], {"<0.001": 1, "1-10": 1})
+
+        # Next block: coin 2 is spent, coin 4 arrives, asset 5 is gone
+        api.utxos = [make_utxo(1, 50000), make_utxo(2, 5 * 10 ** 8, status=4), make_utxo(4, 2 * 10 ** 6)]
+        api.height = 101
+        self.assertEqual(index.sync(), 2)
+        beam = index.analysis()["0"]
+        self.assertEqual(beam["available_count"], 2)
+        self.assertEqual(beam["available_amount"], 50000 + 2 * 10 ** 6)
+        self.assertEqual(beam["largest_available"], 2 * 10 ** 6)
+        self.assertEqual(beam["by_status"], {str(AVAILABLE): 2, "4": 1})
+        self.assertNotIn("5", index.analysis())
+
+    def test_maturity_buckets(self):
+        self.use_api([make_utxo(1, 10, maturity=90), make_utxo(2, 10, status=2, maturity=130),
+                      make_utxo(3, 10, status=2, maturity=5000)])
+        index = serve.UtxoIndex(WALLET)
+        index.sync()
+        self.assertEqual(index.analysis()["0"]["maturity"], {"mature": 1, "<1h": 1, ">1d": 1})
+
+    def test_owner_change_during_sync_keeps_the_old_set(self):
+        self.use_api([make_utxo(1, 10)])
+        index = serve.UtxoIndex(WALLET)
+        owners = iter([("active", 1), ("active", 2)])
+        serve.wallet_api_owner = lambda wallet: next(owners)
+        with self.assertRaises(RuntimeError):
+            index.sync()
+        self.assertEqual(index.query(), ([], 0))
+
+
+class UtxoIndexQueryTest(UtxoIndexTestCase):
+    def setUp(self):
+        super().setUp()
+        self.use_api([make_utxo(n, n * 10, asset_id=n % 3, status=AVAILABLE if n % 2 else 3)
+                      for n in range(1, 31)])
+        self.index = serve.UtxoIndex(WALLET)
+        self.index.sync()
+
+    def test_largest_first_per_asset(self):
+        coins, total = self.index.query(asset=1)
+        self.assertEqual(total, 10)
+        amounts = [c["amount"] for c in coins]
+        self.assertEqual(amounts, sorted(amounts, reverse=True))
+
+    def test_status_filter_and_paging(self):
+        coins, total = self.index.query(status={AVAILABLE}, offset=5, limit=4)
+        self.assertEqual(total, 15)
+        self.assertEqual(len(coins), 4)
+        self.assertTrue(all(c["status"] == AVAILABLE for c in coins))
+        everything = self.index.query(limit=1000)[0]
+        self.assertEqual(len({c["id"] for c in everything}), 30)
+
+
+class UtxoEndpointAccessTest(UtxoIndexTestCase):
+    def test_active_open_wallet_is_served(self):
+        self.use_api([make_utxo(1, 10), make_utxo(2, 20)])
+        handler = RecordingHandler("/api/utxo?limit=1")
+        handler.handle_utxo_query()
+        status, data = handler.sent[0]
+        self.assertEqual(status, 200)
+        self.assertEqual((len(data["utxos"]), data["total"]), (1, 2))
+
+    def test_other_wallet_is_refused(self):
+        handler = RecordingHandler("/api/utxo?wallet=bob")
+        handler.handle_utxo_query()
+        self.assertEqual(handler.sent[0][0], 403)
+
+    def test_locked_wallet_is_not_served_from_memory(self):
+        self.use_api([make_utxo(1, 10)])
+        serve.get_utxo_index(WALLET).sync()
+        self.owner = None
+        handler = RecordingHandler()
+        handler.handle_utxo_query()
+        self.assertEqual(handler.sent[0][0], 409)
+        self.assertNotIn("utxos", handler.sent[0][1])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for server-side voucher batches: chunk layout and job tokens.
+
+Run: python3 tests/test_voucher_batch.py
+"""
+
+import csv
+import hashlib
+import json
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+from server_env import serve
+
+
+class VoucherBatchLayoutTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.export_dir = serve.AIRDROP_EXPORT_DIR
+        serve.AIRDROP_EXPORT_DIR = Path(self.dir.name)
+
+    def tearDown(self):
+        serve.AIRDROP_EXPORT_DIR = self.export_dir
+        self.dir.cleanup()
+
+    def test_code_format_and_hash_normalization(self):
+        code = serve.generate_voucher_code()
+        self.assertRegex(code, r"^[A-HJ-NP-Z2-9]{4}(-[A-HJ-NP-Z2-9]{4}){3}$")
+        digest = serve.hash_voucher_code(code)
+        self.assertEqual(digest, hashlib.sha256(code.replace("-", "").encode()).digest())
+        self.assertEqual(digest, serve.hash_voucher_code(" " + code.lower().replace("-", " ") + " "))
+
+    def test_chunks_carry_hash_and_value_records(self):
+        job = serve.VoucherBatchJob(asset_id=7, value=12345, count=25, chunk_size=10)
+        submitted = []
+
+        def submit(vouchers_hex, n, first_hash):
+            submitted.append((bytes.fromhex(vouchers_hex), n, first_hash))
+            return None  # already on chain: nothing to confirm
+
+        job._submit_chunk = submit
+        job.run()
+        self.assertEqual(job.state, "done")
+        self.assertEqual([n for _, n, _ in submitted], [10, 10, 5])
+
+        with open(job.export_path) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 25)
+        record = struct.Struct("<32sQ")
+        for index, (blob, n, first_hash) in enumerate(submitted):
+            self.assertEqual(len(blob), n * record.size)
+            entries = [record.unpack_from(blob, i * record.size) for i in range(n)]
+            chunk_rows = [r for r in rows if r["chunk"] == str(index)]
+            self.assertEqual([e[0].hex() for e in entries], [r["hash"] for r in chunk_rows])
+            self.assertEqual(first_hash, entries[0][0])
+            for (digest, value), row in zip(entries, chunk_rows):
+                self.assertEqual(value, 12345)
+                self.assertEqual(digest, serve.hash_voucher_code(row["code"]))
+
+
+
+class VoucherBatchTokenTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.export_dir = serve.AIRDROP_EXPORT_DIR
+        serve.AIRDROP_EXPORT_DIR = Path(self.dir.name)
+        self.job = serve.VoucherBatchJob(asset_id=7, value=1, count=3, chunk_size=3)
+        self.job._submit_chunk = lambda vouchers_hex, n, first_hash: None
+        self.job.run()
+        serve.airdrop_batch_jobs[self.job.job_id] = self.job
+
+    def tearDown(self):
+        serve.airdrop_batch_jobs.pop(self.job.job_id, None)
+        serve.AIRDROP_EXPORT_DIR = self.export_dir
+        self.dir.cleanup()
+
+    def test_state_needs_the_job_token(self):
+        job_id = self.job.job_id
+        self.assertEqual(serve.load_airdrop_batch_state(job_id, self.job.token)["state"], "done")
+        self.assertIsNone(serve.load_airdrop_batch_state(job_id, None))
+        self.assertIsNone(serve.load_airdrop_batch_state(job_id, "wrong"))
+
+    def test_state_file_keeps_only_a_token_digest(self):
+        saved = json.loads(self.job.state_path.read_text())
+        self.assertNotIn(self.job.token, json.dumps(saved))
+        self.assertEqual(saved["token_sha256"], hashlib.sha256(self.job.token.encode()).hexdigest())
+        self.assertNotIn("token", self.job.to_dict())
+
+    def test_token_still_works_after_a_restart(self):
+        job_id = self.job.job_id
+        del serve.airdrop_batch_jobs[job_id]
+        state = serve.load_airdrop_batch_state(job_id, self.job.token)
+        self.assertEqual(state["job_id"], job_id)
+        self.assertNotIn("token_sha256", state)
+        self.assertIsNone(serve.load_airdrop_batch_state(job_id, "wrong"))
+        self.assertIsNone(serve.load_airdrop_batch_state("../" + job_id, self.job.token))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Unit tests for bulk voucher status checks: de-duplication, per-block and permanent caching, bounded fan-out.
+
+Run: python3 tests/test_voucher_status.py
+"""
+
+import json
+import re
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from server_env import serve
+
+
+class FakeWalletApi:
+    """wallet_status plus check_voucher answers from a hash -> voucher table"""
+
+    def __init__(self, vouchers):
+        self.vouchers = vouchers  # hash -> {"redeemed", "asset_id", "value"}, or an Exception
+        self.height = 100
+        self.checked = []
+        self.lock = threading.Lock()
+        self.inflight = self.max_inflight = 0
+
+    def __call__(self, method, params=None, priority=None, wallet=None):
+        if method == "wallet_status":
+            return {"current_height": self.height}
+        voucher_hash = re.search(r"hash=(\w+)", params["args"]).group(1)
+        with self.lock:
+            self.checked.append(voucher_hash)
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+        time.sleep(0.005)
+        with self.lock:
+            self.inflight -= 1
+        voucher = self.vouchers.get(voucher_hash)
+        if isinstance(voucher, Exception):
+            raise voucher
+        if voucher is None:
+            return {"output": json.dumps({"error": "voucher not found"})}
+        return {"output": json.dumps({"voucher": voucher})}
+
+
+class VoucherStatusCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.saved = serve.AIRDROP_REDEEMED_FILE, serve.call_wallet_api
+        serve.AIRDROP_REDEEMED_FILE = Path(self.dir.name) / "airdrop_redeemed.json"
+        self.api = FakeWalletApi({
+            "aa": {"redeemed": False, "asset_id": 7, "value": 5},
+            "bb": {"redeemed": True, "asset_id": 7, "value": 5},
+            "ee": RuntimeError("wallet-api busy"),
+        })
+        serve.call_wallet_api = self.api
+        self.cache = serve.VoucherStatusCache()
+
+    def tearDown(self):
+        serve.AIRDROP_REDEEMED_FILE, serve.call_wallet_api = self.saved
+        self.dir.cleanup()
+
+    def test_statuses_and_deduplication(self):
+        results, height, queried = self.cache.check(["AA", "aa ", "bb", "cc", "", None, "ee"])
+        self.assertEqual((height, queried), (100, 4))
+        self.assertEqual(sorted(self.api.checked), ["aa", "bb", "cc", "ee"])
+        self.assertEqual(results["aa"], {"status": "available", "asset_id": 7, "value": 5})
+        self.assertEqual(results["bb"]["status"], "claimed")
+        self.assertEqual(results["cc"], {"status": "not found"})
+        self.assertEqual(results["ee"]["status"], "error")
+
+    def test_cached_for_the_current_block_only(self):
+        self.cache.check(["aa", "bb", "ee"])
+        self.api.checked.clear()
+        _, _, queried = self.cache.check(["aa", "bb", "ee"])
+        self.assertEqual(self.api.checked, ["ee"])  # errors are never cached
+        self.assertEqual(queried, 1)
+
+        self.api.height = 101
+        self.api.checked.clear()
+        self.cache.check(["aa", "bb"])
+        self.assertEqual(self.api.checked, ["aa"])  # redeemed stays redeemed
+
+    def test_redeemed_results_survive_a_restart(self):
+        self.cache.check(["bb"])
+        self.assertIn("bb", json.loads(serve.AIRDROP_REDEEMED_FILE.read_text()))
+        self.api.checked.clear()
+        results, _, queried = serve.VoucherStatusCache().check(["bb"])
+        self.assertEqual((queried, self.api.checked), (0, []))
+        self.assertEqual(results["bb"]["status"], "claimed")
+
+    def test_fan_out_is_bounded(self):
+        self.api.vouchers.update({f"{i:04x}": {"redeemed": False, "asset_id": 0, "value": 1} for i in range(40)})
+        results, _, queried = self.cache.check([f"{i:04x}" for i in range(40)])
+        self.assertEqual((len(results), queried), (40, 40))
+        self.assertLessEqual(self.api.max_inflight, serve.AIRDROP_CHECK_CONCURRENCY)
+        self.assertGreater(self.api.max_inflight, 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
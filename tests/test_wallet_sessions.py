@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the multi-wallet session pool: tokens, passwords, LRU eviction and idle sweeps.
+
+Run: python3 tests/test_wallet_sessions.py
+"""
+
+import subprocess
+import sys
+import time
+import unittest
+
+from server_env import serve
+
+
+class WalletSessionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = (serve.spawn_wallet_api, serve.wait_for_wallet_api_ready, serve.tcp_port_open,
+                      serve.WALLET_SESSION_MAX)
+        self.spawned = []
+        self.ready_error = None
+        serve.spawn_wallet_api = self.fake_spawn
+        serve.wait_for_wallet_api_ready = lambda proc, port, log_file: self.ready_error
+        serve.tcp_port_open = lambda port: False
+        serve.WALLET_SESSION_MAX = 2
+        self.pool = serve.WalletSessionPool()
+
+    def tearDown(self):
+        self.pool.close_all()
+        (serve.spawn_wallet_api, serve.wait_for_wallet_api_ready, serve.tcp_port_open,
+         serve.WALLET_SESSION_MAX) = self.saved
+
+    def fake_spawn(self, wallet, password, node_addr, port):
+        proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+        self.spawned.append((wallet, port, proc))
+        return proc, None
+
+    def test_open_reuses_the_session_and_checks_the_password(self):
+        session = self.pool.open("alice", "pw")
+        self.assertIs(self.pool.open("alice", "pw"), session)
+        self.assertEqual(len(self.spawned), 1)
+        with self.assertRaises(ValueError):
+            self.pool.open("alice", "wrong")
+        self.assertNotIn("pw", str(vars(session)))
+
+    def test_tokens_resolve_to_their_session(self):
+        alice = self.pool.open("alice", "pw")
+        bob = self.pool.open("bob", "pw")
+        self.assertIsNone(self.pool.resolve(None))
+        self.assertIs(self.pool.resolve(alice.token), alice)
+        self.assertIs(self.pool.resolve(bob.token), bob)
+        self.assertNotEqual(alice.port, bob.port)
+        with self.assertRaises(KeyError):
+            self.pool.resolve("not-a-token")
+        bob.proc.kill()
+        bob.proc.wait()
+        with self.assertRaises(KeyError):
+            self.pool.resolve(bob.token)
+
+    def test_least_recently_used_idle_session_is_evicted(self):
+        alice = self.pool.open("alice", "pw")
+        self.pool.open("bob", "pw")
+        self.pool.touch(alice)
+        self.pool.open("carol", "pw")
+        self.assertEqual(list(self.pool.sessions), ["alice", "carol"])
+        bob_proc = self.spawned[1][2]
+        self.assertIsNotNone(bob_proc.poll())
+
+    def test_busy_sessions_are_not_evicted(self):
+        alice = self.pool.open("alice", "pw")
+        bob = self.pool.open("bob", "pw")
+        with self.pool.use(alice), self.pool.use(bob):
+            with self.assertRaises(ValueError):
+                self.pool.open("carol", "pw")
+        self.assertEqual((alice.inflight, bob.inflight), (0, 0))
+        self.assertEqual(sorted(self.pool.sessions), ["alice", "bob"])
+
+    def test_failed_start_leaves_no_session(self):
+        self.ready_error = "wallet-api exited: bad password"
+        with self.assertRaises(ValueError):
+            self.pool.open("alice", "pw")
+        self.assertEqual(self.pool.sessions, {})
+        self.assertIsNotNone(self.spawned[0][2].poll())
+
+    def test_sweep_closes_idle_and_dead_sessions(self):
+        alice = self.pool.open("alice", "pw")
+        bob = self.pool.open("bob", "pw")
+        alice.last_used = time.time() - serve.WALLET_SESSION_IDLE_TIMEOUT - 1
+        self.assertEqual(self.pool.sweep(), 1)
+        self.assertEqual(list(self.pool.sessions), ["bob"])
+        bob.proc.kill()
+        bob.proc.wait()
+        self.assertEqual(self.pool.sweep(), 1)
+        self.assertEqual(self.pool.status(), [])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)